@@ -0,0 +1,50 @@
+"""Compare two JSON result files written by ``benchmarks.inference`` and flag regressions.
+
+A configuration (stage, batch size, cache mode) regresses when its median
+latency grows by more than ``--threshold`` (relative) and by more than
+``--min-ms`` (absolute, to ignore noise on sub-millisecond stages). The exit
+status is 1 when any configuration regressed.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.15
+"""
+
+import argparse
+import json
+import sys
+
+
+def _load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    return {(r["stage"], r["batch_size"], r["cache"]): r for r in report["results"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--min-ms", type=float, default=0.05)
+    args = parser.parse_args()
+
+    baseline, current = _load(args.baseline), _load(args.current)
+    regressions = 0
+    for key in sorted(baseline.keys() & current.keys(), key=lambda k: (k[1], k[0], k[2])):
+        before, after = baseline[key]["median_ms"], current[key]["median_ms"]
+        change = (after - before) / before if before else 0.0
+        regressed = change > args.threshold and after - before > args.min_ms
+        regressions += regressed
+        stage, batch_size, cache = key
+        print(
+            f"{'REGRESSION' if regressed else 'ok':10s} {stage:17s} batch={batch_size:5d} cache={cache:5s} "
+            f"{before:9.3f}ms -> {after:9.3f}ms ({change:+.1%})"
+        )
+    for key in sorted(baseline.keys() ^ current.keys()):
+        print(f"{'missing':10s} {key} only in {'baseline' if key in baseline else 'current'}")
+
+    print(f"{regressions} regression(s)")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
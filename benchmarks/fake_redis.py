@@ -0,0 +1,194 @@
+"""Minimal in-process Redis server speaking RESP2, for benchmarks.
+
+Supports the commands the service and redis-py use (GET, SET with EX/PX,
+SETEX, MGET, DEL, EXISTS, FLUSHALL/FLUSHDB, DBSIZE, PING, ECHO, SELECT,
+CLIENT, HELLO, INFO). ``latency_ms`` delays every reply to emulate a remote server.
+
+    with FakeRedisServer(latency_ms=0.5) as server:
+        os.environ["REDIS_URL"] = server.url
+"""
+
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class _Store:
+    def __init__(self) -> None:
+        self.values: Dict[bytes, Tuple[bytes, float]] = {}
+        self.lock = threading.Lock()
+        self.commands = 0
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+
+def _encode(reply, resp3: bool = False) -> bytes:
+    if reply is None:
+        return b"_\r\n" if resp3 else b"$-1\r\n"
+    if isinstance(reply, Exception):
+        return b"-ERR " + str(reply).encode() + b"\r\n"
+    if isinstance(reply, bool):
+        return b"+OK\r\n" if reply else _encode(None, resp3)
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, str):
+        return b"+" + reply.encode() + b"\r\n"
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    if isinstance(reply, dict):
+        # RESP3 map, only sent in reply to "HELLO 3".
+        return b"%%%d\r\n" % len(reply) + b"".join(_encode(k, resp3) + _encode(v, resp3) for k, v in reply.items())
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(item, resp3) for item in reply)
+
+
+def _parse_commands(buffer: bytearray) -> List[List[bytes]]:
+    """Pop every complete command from ``buffer``; a partial command is left in place."""
+
+    commands = []
+    pos = 0
+    while pos < len(buffer):
+        end = buffer.find(b"\r\n", pos)
+        if end < 0:
+            break
+        if buffer[pos : pos + 1] != b"*":
+            commands.append(bytes(buffer[pos:end]).split())
+            pos = end + 2
+            continue
+        args, cursor = [], end + 2
+        for _ in range(int(buffer[pos + 1 : end])):
+            header_end = buffer.find(b"\r\n", cursor)
+            if header_end < 0:
+                break
+            length = int(buffer[cursor + 1 : header_end])
+            if header_end + 2 + length + 2 > len(buffer):
+                break
+            args.append(bytes(buffer[header_end + 2 : header_end + 2 + length]))
+            cursor = header_end + 2 + length + 2
+        else:
+            commands.append(args)
+            pos = cursor
+            continue
+        break
+    del buffer[:pos]
+    return commands
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        server: "FakeRedisServer" = self.server.owner  # type: ignore[attr-defined]
+        buffer = bytearray()
+        resp3 = False
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                return
+            buffer += data
+            commands = _parse_commands(buffer)
+            if not commands:
+                continue
+            # Pipelined commands arrive together and are answered in one round trip.
+            replies = []
+            for command in filter(None, commands):
+                if command[0].upper() == b"HELLO" and len(command) > 1:
+                    resp3 = command[1] == b"3"
+                replies.append(_encode(server.execute(command), resp3))
+            replies = b"".join(replies)
+            if server.latency_seconds:
+                time.sleep(server.latency_seconds)
+            self.request.sendall(replies)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class FakeRedisServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0) -> None:
+        self.latency_seconds = latency_ms / 1000.0
+        self._store = _Store()
+        self._server = _TCPServer((host, port), _Handler)
+        self._server.owner = self  # type: ignore[attr-defined]
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    @property
+    def commands(self) -> int:
+        return self._store.commands
+
+    def start(self) -> "FakeRedisServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-redis", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeRedisServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def flush(self) -> None:
+        with self._store.lock:
+            self._store.values.clear()
+
+    def execute(self, command: List[bytes]):
+        name, args = command[0].upper(), command[1:]
+        store = self._store
+        with store.lock:
+            store.commands += 1
+            if name == b"PING":
+                return args[0] if args else "PONG"
+            if name == b"ECHO":
+                return args[0]
+            if name == b"GET":
+                return store.get(args[0])
+            if name == b"MGET":
+                return [store.get(key) for key in args]
+            if name in (b"SET", b"SETEX"):
+                if name == b"SETEX":
+                    key, ttl, value = args
+                    expires_at = time.monotonic() + int(ttl)
+                else:
+                    key, value, options = args[0], args[1], [arg.upper() for arg in args[2:]]
+                    expires_at = 0.0
+                    if b"EX" in options:
+                        expires_at = time.monotonic() + int(options[options.index(b"EX") + 1])
+                    elif b"PX" in options:
+                        expires_at = time.monotonic() + int(options[options.index(b"PX") + 1]) / 1000.0
+                store.values[key] = (value, expires_at)
+                return True
+            if name in (b"DEL", b"UNLINK"):
+                return sum(store.values.pop(key, None) is not None for key in args)
+            if name == b"EXISTS":
+                return sum(store.get(key) is not None for key in args)
+            if name in (b"FLUSHALL", b"FLUSHDB"):
+                store.values.clear()
+                return True
+            if name == b"DBSIZE":
+                return len(store.values)
+            if name in (b"SELECT", b"CLIENT"):
+                return True
+            if name == b"HELLO":
+                protocol = int(args[0]) if args else 2
+                info = {b"server": b"redis", b"version": b"7.0.0", b"proto": protocol, b"mode": b"standalone"}
+                return info if protocol == 3 else [item for pair in info.items() for item in pair]
+            if name == b"INFO":
+                return b"# Server\r\nredis_version:7.0.0-fake\r\n"
+            return ValueError(f"unknown command '{name.decode(errors='replace')}'")
@@ -0,0 +1,136 @@
+"""Latency and allocations of feature building and prediction at large batch sizes.
+
+Paths, all fed from the same warm ``TfidfRowMemo``:
+
+- ``hstack``: the previous ``_prepare_features``: ``memo.transform``,
+  ``scaler.transform`` and ``scipy.sparse.hstack`` (COO), then ``model.predict``;
+- ``csr64``: ``featureBuilder.build_features`` into preallocated float64 CSR
+  buffers, then ``model.predict``;
+- ``csr32``: float32 buffers and ``Float32Neighbors``; the rows it reports as
+  uncertain are rebuilt in float64 and re-predicted, as the service does.
+
+``csr64`` features are checked to equal the ``hstack`` features, and labels of
+every path to equal ``hstack`` labels, on each model given (default: both
+shipped versions). Allocations are tracemalloc peaks above the starting
+point, which covers NumPy and SciPy buffers.
+
+    python -m benchmarks.feature_builder --batch-sizes 1000 10000 50000 --output feature_builder.json
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import scipy.sparse
+
+from benchmarks.workloads import request_batches
+from src.services.featureBuilder import Float32Neighbors, build_features
+from src.services.modelArtifacts import load_model_bundle
+from src.services.tfidfMemo import TfidfRowMemo
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_MODELS = [
+    os.path.join(PROJECT_ROOT, "models/0.214/model_vectorizer_scaler.dump"),
+    os.path.join(PROJECT_ROOT, "models/0.191"),
+]
+
+
+def _measure(call, repeat: int):
+    """Median seconds over ``repeat`` calls and the tracemalloc peak of one more call."""
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = call()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return float(np.median(samples)), peak, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = []
+    for path in args.models:
+        bundle = load_model_bundle(path)
+        model, scaler = bundle.model, bundle.scaler
+        memo = TfidfRowMemo(bundle.vectorizer, max(args.batch_sizes) * 2)
+        model32 = Float32Neighbors(model)
+
+        def hstack_features(wods, weights):
+            return scipy.sparse.hstack([memo.transform(wods), scaler.transform(weights)])
+
+        def csr32_predict(wods, weights):
+            labels, uncertain = model32.predict(build_features(memo, scaler, wods, weights, np.float32))
+            if len(uncertain):
+                exact = build_features(memo, scaler, [wods[i] for i in uncertain], weights[uncertain])
+                labels[uncertain] = model.predict(exact)
+            return labels
+
+        paths = {
+            "hstack": (hstack_features, lambda wods, weights: model.predict(hstack_features(wods, weights))),
+            "csr64": (
+                lambda wods, weights: build_features(memo, scaler, wods, weights),
+                lambda wods, weights: model.predict(build_features(memo, scaler, wods, weights)),
+            ),
+            "csr32": (lambda wods, weights: build_features(memo, scaler, wods, weights, np.float32), csr32_predict),
+        }
+
+        for batch_size in args.batch_sizes:
+            ((wods, weights),) = request_batches(args.seed + batch_size, batch_size, 1)
+            weights = np.asarray(weights, dtype=float).reshape(-1, 1)
+            memo.rows(wods)  # Measure feature assembly, not first-time vectorization.
+
+            expected_features = hstack_features(wods, weights).tocsr()
+            if abs(build_features(memo, scaler, wods, weights) - expected_features).max() != 0:
+                raise AssertionError("build_features differs from the hstack features.")
+            expected_labels = None
+
+            for name, (features, predict) in paths.items():
+                fallback_before = model32.fallback_rows
+                features_s, features_peak, _ = _measure(lambda: features(wods, weights), args.repeat)
+                total_s, total_peak, labels = _measure(lambda: predict(wods, weights), args.repeat)
+                if expected_labels is None:
+                    expected_labels = labels
+                elif not np.array_equal(labels, expected_labels):
+                    raise AssertionError(f"{name} labels differ from hstack on {bundle.version}.")
+                calls = args.repeat + 1
+                result = {
+                    "model": bundle.version,
+                    "path": name,
+                    "batch_size": batch_size,
+                    "features_ms": features_s * 1e3,
+                    "features_peak_mb": features_peak / 2**20,
+                    "total_ms": total_s * 1e3,
+                    "total_peak_mb": total_peak / 2**20,
+                    "fallback_rows": (model32.fallback_rows - fallback_before) // calls if name == "csr32" else 0,
+                }
+                results.append(result)
+                print(
+                    f"{bundle.version:6s} {name:7s} batch={batch_size:6d} "
+                    f"features={result['features_ms']:8.1f}ms/{result['features_peak_mb']:7.1f}MB "
+                    f"total={result['total_ms']:8.1f}ms/{result['total_peak_mb']:7.1f}MB "
+                    f"fallback={result['fallback_rows']}"
+                )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Latency of every inference stage and of the full POST /wod/cluster path.
+
+Requests come from ``benchmarks.workloads.request_batches`` (deterministic for a
+seed) and the Redis tier is a local ``FakeRedisServer``, so runs on the same
+machine are comparable. Each stage is timed at every batch size with:
+
+- ``cold``: local cache, TF-IDF memo and Redis are emptied before each call;
+- ``redis``: only the in-process caches are emptied (Redis hits);
+- ``warm``: the same requests were already answered once.
+
+Stages: ``preprocess``, ``prepare_features``, ``model_predict`` (no caching),
+``predictCluster`` and ``api`` (FastAPI TestClient, in process).
+
+    python -m benchmarks.inference --output baseline.json
+    python -m benchmarks.compare baseline.json current.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import numpy as np
+
+from benchmarks.fake_redis import FakeRedisServer
+from benchmarks.workloads import request_batches
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _versions() -> dict:
+    import fastapi
+    import scipy
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "scikit-learn": sklearn.__version__,
+        "fastapi": fastapi.__version__,
+    }
+
+
+def _measure(call, batches, reset=None, warm_up: bool = False) -> list:
+    if warm_up:
+        for batch in batches:
+            call(*batch)
+    samples = []
+    for batch in batches:
+        if reset is not None:
+            reset()
+        started = time.perf_counter()
+        call(*batch)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _summary(stage: str, batch_size: int, cache: str, samples: list) -> dict:
+    ordered = sorted(samples)
+    median = statistics.median(ordered)
+    return {
+        "stage": stage,
+        "batch_size": batch_size,
+        "cache": cache,
+        "samples": len(ordered),
+        "median_ms": median,
+        "p95_ms": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)],
+        "mean_ms": statistics.fmean(ordered),
+        "rows_per_s": batch_size / (median / 1000) if median else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20, help="Distinct requests timed per configuration.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.0)
+    parser.add_argument("--stages", nargs="+", help="Only run these stages.")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    # The service reads its configuration at import time.
+    os.environ.pop("MLFLOW_TRACKING_URI", None)
+    with FakeRedisServer(latency_ms=args.redis_latency_ms) as redis_server:
+        os.environ["REDIS_URL"] = redis_server.url
+        from fastapi.testclient import TestClient
+
+        from src.main import app
+        from src.services import wodCluster
+
+        model = wodCluster.get_model_bundle().model
+        client = TestClient(app)
+
+        def reset_all():
+            wodCluster.clear_local_caches()
+            redis_server.flush()
+
+        def validated_features(wods, weights):
+            return wodCluster._prepare_features(*wodCluster._validate_inputs(wods, weights))
+
+        def post(wods, weights):
+            response = client.post("/wod/cluster", json={"wods": wods, "weights": weights})
+            response.raise_for_status()
+
+        # (stage, call, [(cache mode, reset before each call, warm up first)])
+        stages = [
+            ("preprocess", wodCluster.preprocess, [("cold", reset_all, False), ("warm", None, True)]),
+            ("prepare_features", validated_features, [("cold", reset_all, False), ("warm", None, True)]),
+            ("model_predict", None, [("none", None, False)]),
+            (
+                "predictCluster",
+                wodCluster.predictCluster,
+                [("cold", reset_all, False), ("redis", wodCluster.clear_local_caches, True), ("warm", None, True)],
+            ),
+            ("api", post, [("cold", reset_all, False), ("warm", None, True)]),
+        ]
+
+        results = []
+        for batch_size in args.batch_sizes:
+            batches = request_batches(args.seed + batch_size, batch_size, args.repeat)
+            for stage, call, modes in stages:
+                if args.stages and stage not in args.stages:
+                    continue
+                stage_batches = batches
+                if stage == "model_predict":
+                    stage_batches = [(validated_features(*batch),) for batch in batches]
+                    call = model.predict
+                for cache, reset, warm_up in modes:
+                    reset_all()
+                    result = _summary(stage, batch_size, cache, _measure(call, stage_batches, reset, warm_up))
+                    results.append(result)
+                    print(
+                        f"{stage:17s} batch={batch_size:5d} cache={cache:5s} "
+                        f"median={result['median_ms']:9.3f}ms p95={result['p95_ms']:9.3f}ms "
+                        f"rows/s={result['rows_per_s']:11.1f}"
+                    )
+
+        report = {
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "model_version": wodCluster.MODEL_VERSION,
+            "versions": _versions(),
+            "settings": vars(args),
+            "results": results,
+        }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Throughput of cache-miss inference in the thread executor vs the process pool.
+
+Concurrent callers each submit ``computeClusterBatch`` for one request batch
+from ``benchmarks.workloads.request_batches``. The calls go to the default
+thread executor (``thread``) or an ``InferencePool`` with ``--workers``
+processes (``process``). Caches are not involved: every call tokenizes and
+predicts, which is the GIL-bound part the process backend is meant to spread
+over cores. Predictions are checked to be identical across backends.
+
+The process backend only pays off with more than one core: tokenization holds
+the GIL, so on one core both backends are bound by the same CPU.
+
+    python -m benchmarks.inference_backends --workers 4 --concurrency 8 --output backends.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.workloads import request_batches
+from src.services import wodCluster
+from src.services.inferencePool import InferencePool
+
+
+async def _drive(executor, batches, concurrency: int) -> tuple:
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(batch):
+        async with slots:
+            return await loop.run_in_executor(executor, wodCluster.computeClusterBatch, [batch])
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(batch) for batch in batches))
+    return time.perf_counter() - started, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requests", type=int, default=200, help="Request batches per configuration.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--start-method", default="spawn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    # Every call must tokenize: the TF-IDF memo would turn repeats into lookups.
+    os.environ["WOD_CLUSTER_TFIDF_MEMO_SIZE"] = "0"
+    wodCluster.TFIDF_MEMO_SIZE = 0
+    wodCluster.get_model_bundle()
+
+    pool = InferencePool(workers=args.workers, start_method=args.start_method)
+    started = time.perf_counter()
+    pool.warm_up()
+    warm_up_s = time.perf_counter() - started
+
+    results = []
+    try:
+        for batch_size in args.batch_sizes:
+            batches = request_batches(args.seed + batch_size, batch_size, args.requests)
+            outputs = {}
+            for backend, executor in (("thread", None), ("process", pool)):
+                asyncio.run(_drive(executor, batches[: args.concurrency], args.concurrency))
+                elapsed, outputs[backend] = asyncio.run(_drive(executor, batches, args.concurrency))
+                result = {
+                    "backend": backend,
+                    "batch_size": batch_size,
+                    "requests": len(batches),
+                    "requests_per_s": len(batches) / elapsed,
+                    "rows_per_s": len(batches) * batch_size / elapsed,
+                }
+                results.append(result)
+                print(
+                    f"{backend:7s} batch={batch_size:4d} requests/s={result['requests_per_s']:9.1f} "
+                    f"rows/s={result['rows_per_s']:10.1f}"
+                )
+            if outputs["thread"] != outputs["process"]:
+                raise AssertionError("Process pool predictions differ from the thread executor.")
+    finally:
+        pool.shutdown()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "cpu_count": os.cpu_count(),
+                    "settings": vars(args),
+                    "warm_up_s": warm_up_s,
+                    "model_version": wodCluster.MODEL_VERSION,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
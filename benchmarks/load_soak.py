@@ -0,0 +1,460 @@
+"""End-to-end load and soak test of POST /wod/cluster against a local uvicorn server.
+
+The app (``src.main:app``) runs under uvicorn in a subprocess with local
+stand-ins for its dependencies:
+
+- Redis is a ``FakeRedisServer`` in this process; ``--redis-latency-ms`` delays
+  every reply, and ``--redis-spike-ms`` raises that delay for
+  ``--redis-spike-seconds`` every ``--redis-spike-every`` seconds;
+- MLflow logs to a file store (``file:<workdir>/mlruns``), so the background
+  prediction logger does the same work as in production;
+- ``--env NAME=VALUE`` passes any other service setting, for example
+  ``WOD_CLUSTER_INFERENCE_BACKEND=process`` or ``WOD_CLUSTER_BATCHING=1``.
+
+Load is open-loop: request ``i`` is due at its arrival time (uniform or
+Poisson at ``--rps``) whether or not earlier requests have been answered, and
+its latency is measured from that time, so a server that falls behind shows it
+in the percentiles instead of slowing the generator down. Bodies come from
+``benchmarks.workloads.request_batches``. Each ``--rps`` stage runs for
+``--duration`` seconds after one unreported warm-up stage, then ``--soak``
+seconds run at the last rate. Every stage reports p50/p95/p99 latency of
+successful responses, error counts by kind and throughput. Requests beyond
+``--max-in-flight`` are not sent and are counted as ``client_overload``.
+
+Memory: the RSS of every process of the server (uvicorn workers and
+inference pool processes) is read from ``/proc`` every ``--sample-interval``
+seconds. The workers run with ``WOD_MEMORY_PROFILE_DIR`` (see
+``src.services.memoryProfiler``), so they also report the memory traced by
+tracemalloc and the allocation sites that grew the most since the checked
+phase (the soak, or all stages without one) began. RSS and traced growth over
+that phase are least-squares slopes times its length, which discounts one-off
+jumps. Tracing slows every allocation; ``--no-tracemalloc`` measures latency
+without it (RSS is still sampled). The run exits with status 1 when growth,
+the error rate or p99 latency exceed ``--max-rss-growth-mb``,
+``--max-traced-growth-mb``, ``--max-error-rate`` or ``--max-p99-ms``.
+
+    python -m benchmarks.load_soak --rps 20 50 100 --duration 30 --output load.json
+    python -m benchmarks.load_soak --rps 50 --soak 3600 --workers 2 --redis-spike-ms 200 --output soak.json
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.fake_redis import FakeRedisServer
+from benchmarks.workloads import request_batches
+from src.services.memoryProfiler import BASELINE_FILE, rss_kb
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CLUSTER_PATH = "/wod/cluster"
+
+
+class _HttpClient:
+    """Minimal keep-alive HTTP/1.1 client; far cheaper per request than a full client on a shared CPU."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, bytes]:
+        reader, writer = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(
+                f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+            status = int((await reader.readuntil(b"\r\n")).split()[1])
+            headers = {}
+            for line in (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n"):
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip().lower()
+            if headers.get("transfer-encoding") == "chunked":
+                chunks = []
+                while True:
+                    size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                    chunks.append((await reader.readexactly(size + 2))[:-2])
+                    if not size:
+                        break
+                payload = b"".join(chunks)
+            else:
+                payload = await reader.readexactly(int(headers.get("content-length", 0)))
+        except BaseException:
+            # Includes cancellation by a timeout: the response may still arrive, so the connection is unusable.
+            writer.close()
+            raise
+        if headers.get("connection") == "close":
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, payload
+
+    def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children", "r", encoding="utf-8") as f:
+                    pids.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def _profiles(directory: str) -> Dict[int, dict]:
+    reports = {}
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        reports[report["pid"]] = report
+    return reports
+
+
+def _growth_mb(points: List[Tuple[float, float]]) -> Optional[float]:
+    """Least-squares growth of ``(seconds, KiB)`` points over their time span, in MiB."""
+
+    if len(points) < 3:
+        return None
+    seconds, kb = np.asarray(points, dtype=float).T
+    if seconds[-1] <= seconds[0]:
+        return None
+    return float(np.polyfit(seconds, kb, 1)[0] * (seconds[-1] - seconds[0]) / 1024)
+
+
+class LoadRun:
+    def __init__(self, args, client: _HttpClient, server_pid: int, profile_dir: str, redis) -> None:
+        self.args = args
+        self.client = client
+        self.server_pid = server_pid
+        self.profile_dir = profile_dir
+        self.redis = redis
+        self.rng = np.random.default_rng(args.seed)
+        self.bodies = [
+            json.dumps({"wods": wods, "weights": weights}).encode()
+            for wods, weights in request_batches(args.seed, args.batch_size, args.bodies, args.pool_size)
+        ]
+        self.sent = 0
+        self.phase = "startup"
+        self.started = time.monotonic()
+        self.memory: List[dict] = []
+
+    async def wait_ready(self) -> None:
+        # The first answered request also waits for the model, which loads in the background.
+        deadline = time.monotonic() + self.args.startup_timeout
+        while True:
+            try:
+                status, _ = await asyncio.wait_for(self.client.request("POST", CLUSTER_PATH, self.bodies[0]), 30)
+                if status == 200:
+                    return
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"server did not answer {CLUSTER_PATH} within {self.args.startup_timeout}s")
+            await asyncio.sleep(0.5)
+
+    async def stage(self, name: str, rps: float, duration: float) -> dict:
+        loop = asyncio.get_running_loop()
+        self.phase = name
+        outcomes: collections.Counter = collections.Counter()
+        latencies: List[float] = []
+        lags: List[float] = []
+        in_flight: set = set()
+
+        async def one(body: bytes, due: float) -> None:
+            try:
+                status, _ = await asyncio.wait_for(self.client.request("POST", CLUSTER_PATH, body), self.args.timeout)
+                outcome = "ok" if 200 <= status < 300 else f"http_{status}"
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                outcome = "connection_error"
+            outcomes[outcome] += 1
+            if outcome == "ok":
+                latencies.append((loop.time() - due) * 1000)
+
+        started = loop.time()
+        due, requests = started, 0
+        while due < started + duration:
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            lags.append((loop.time() - due) * 1000)
+            if len(in_flight) >= self.args.max_in_flight:
+                outcomes["client_overload"] += 1
+            else:
+                task = asyncio.create_task(one(self.bodies[self.sent % len(self.bodies)], due))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                self.sent += 1
+            requests += 1
+            due += self.rng.exponential(1.0 / rps) if self.args.arrivals == "poisson" else 1.0 / rps
+        if in_flight:
+            await asyncio.wait(in_flight)
+        elapsed = loop.time() - started
+
+        ordered = np.sort(latencies) if latencies else np.zeros(1)
+        errors = requests - outcomes["ok"]
+        return {
+            "stage": name,
+            "target_rps": rps,
+            "duration_s": duration,
+            "requests": requests,
+            "ok": outcomes["ok"],
+            "errors": {kind: count for kind, count in sorted(outcomes.items()) if kind != "ok"},
+            "error_rate": errors / requests if requests else 0.0,
+            "throughput_rps": outcomes["ok"] / elapsed,
+            "p50_ms": float(np.percentile(ordered, 50)),
+            "p95_ms": float(np.percentile(ordered, 95)),
+            "p99_ms": float(np.percentile(ordered, 99)),
+            "max_ms": float(ordered[-1]),
+            # Lag of the generator itself; when it is large the client, not the server, is the bottleneck.
+            "generator_lag_p99_ms": float(np.percentile(lags, 99)) if lags else 0.0,
+        }
+
+    async def sample_memory(self) -> None:
+        while True:
+            reports = _profiles(self.profile_dir)
+            self.memory.append(
+                {
+                    "elapsed_s": time.monotonic() - self.started,
+                    "phase": self.phase,
+                    "rss_kb": {pid: rss_kb(str(pid)) for pid in _process_tree(self.server_pid)},
+                    "traced_kb": {pid: report["traced_kb"] for pid, report in reports.items()},
+                }
+            )
+            await asyncio.sleep(self.args.sample_interval)
+
+    async def redis_spikes(self) -> None:
+        base = self.args.redis_latency_ms / 1000.0
+        while True:
+            await asyncio.sleep(self.args.redis_spike_every)
+            self.redis.latency_seconds = self.args.redis_spike_ms / 1000.0
+            await asyncio.sleep(self.args.redis_spike_seconds)
+            self.redis.latency_seconds = base
+
+    def mark_baseline(self) -> None:
+        """Start the checked phase: workers retake their tracemalloc baseline at their next report."""
+
+        with open(os.path.join(self.profile_dir, BASELINE_FILE), "w", encoding="utf-8") as f:
+            f.write(str(time.time()))
+
+    def memory_growth(self, phases: set) -> Dict[str, dict]:
+        samples = [sample for sample in self.memory if sample["phase"] in phases]
+        growth = {}
+        for pid in sorted({pid for sample in samples for pid in sample["rss_kb"]}):
+            rss = [(s["elapsed_s"], s["rss_kb"][pid]) for s in samples if s["rss_kb"].get(pid)]
+            traced = [(s["elapsed_s"], s["traced_kb"][pid]) for s in samples if pid in s["traced_kb"]]
+            growth[str(pid)] = {
+                "rss_start_mb": rss[0][1] / 1024 if rss else None,
+                "rss_end_mb": rss[-1][1] / 1024 if rss else None,
+                "rss_growth_mb": _growth_mb(rss),
+                "traced_growth_mb": _growth_mb(traced),
+            }
+        return growth
+
+
+async def _run(args, port: int, server_pid: int, profile_dir: str, redis) -> dict:
+    client = _HttpClient("127.0.0.1", port)
+    run = LoadRun(args, client, server_pid, profile_dir, redis)
+    background = [asyncio.create_task(run.sample_memory())]
+    try:
+        await run.wait_ready()
+        print(f"server ready after {time.monotonic() - run.started:.1f}s")
+        if args.redis_spike_ms and redis is not None:
+            background.append(asyncio.create_task(run.redis_spikes()))
+        if args.warmup > 0:
+            await run.stage("warmup", args.rps[0], args.warmup)
+
+        stages = [(f"rps_{rps:g}", rps, args.duration) for rps in args.rps]
+        if args.soak > 0:
+            stages.append(("soak", args.rps[-1], args.soak))
+        checked = {"soak"} if args.soak > 0 else {name for name, _, _ in stages}
+        results = []
+        for name, rps, duration in stages:
+            if name in checked and not results or name == "soak":
+                run.mark_baseline()
+            result = await run.stage(name, rps, duration)
+            results.append(result)
+            errors = " ".join(f"{kind}={count}" for kind, count in result["errors"].items()) or "none"
+            print(
+                f"{name:10s} target={rps:7.1f}rps throughput={result['throughput_rps']:7.1f}rps "
+                f"p50={result['p50_ms']:7.1f}ms p95={result['p95_ms']:7.1f}ms p99={result['p99_ms']:7.1f}ms "
+                f"error_rate={result['error_rate']:.4f} errors={errors} lag_p99={result['generator_lag_p99_ms']:.1f}ms"
+            )
+        # One more sample so that the checked phase ends with the final reports.
+        await asyncio.sleep(args.sample_interval)
+        status, payload = await client.request("GET", f"{CLUSTER_PATH}/cache/stats")
+        cache_stats = json.loads(payload) if status == 200 else None
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        client.close()
+    return {
+        "stages": results,
+        "checked_phases": sorted(checked),
+        "memory_growth": run.memory_growth(checked),
+        "memory_samples": run.memory,
+        "cache_stats": cache_stats,
+    }
+
+
+def _check(args, report: dict) -> List[str]:
+    failures = []
+    for stage in report["stages"]:
+        if stage["error_rate"] > args.max_error_rate:
+            failures.append(f"{stage['stage']}: error rate {stage['error_rate']:.4f} > {args.max_error_rate}")
+        if args.max_p99_ms is not None and stage["p99_ms"] > args.max_p99_ms:
+            failures.append(f"{stage['stage']}: p99 {stage['p99_ms']:.1f}ms > {args.max_p99_ms}ms")
+    for pid, growth in report["memory_growth"].items():
+        if growth["rss_growth_mb"] is not None and growth["rss_growth_mb"] > args.max_rss_growth_mb:
+            failures.append(f"pid {pid}: RSS grew {growth['rss_growth_mb']:.1f}MiB > {args.max_rss_growth_mb}MiB")
+        if growth["traced_growth_mb"] is not None and growth["traced_growth_mb"] > args.max_traced_growth_mb:
+            failures.append(
+                f"pid {pid}: traced memory grew {growth['traced_growth_mb']:.1f}MiB > {args.max_traced_growth_mb}MiB"
+            )
+    return failures
+
+
+def _stop(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        # SIGINT runs the app's shutdown hooks (and the profiler's final report).
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, nargs="+", default=[10.0, 25.0, 50.0])
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per --rps stage.")
+    parser.add_argument("--warmup", type=float, default=10.0, help="Unreported seconds at the first rate.")
+    parser.add_argument("--soak", type=float, default=0.0, help="Seconds at the last rate after the stages.")
+    parser.add_argument("--arrivals", choices=["uniform", "poisson"], default="poisson")
+    parser.add_argument("--batch-size", type=int, default=10, help="Workouts per request.")
+    parser.add_argument("--bodies", type=int, default=1000, help="Distinct request bodies, sent in turn.")
+    parser.add_argument("--pool-size", type=int, default=2000, help="Workouts the bodies are drawn from.")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds before a request counts as timed out.")
+    parser.add_argument("--max-in-flight", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes.")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="Server environment.")
+    parser.add_argument("--redis", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.5)
+    parser.add_argument("--redis-spike-ms", type=float, default=0.0)
+    parser.add_argument("--redis-spike-every", type=float, default=60.0)
+    parser.add_argument("--redis-spike-seconds", type=float, default=5.0)
+    parser.add_argument("--mlflow", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--tracemalloc", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="Seconds between memory samples.")
+    parser.add_argument("--startup-timeout", type=float, default=180.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64.0)
+    parser.add_argument("--max-traced-growth-mb", type=float, default=32.0)
+    parser.add_argument("--workdir", help="Keep the server log, MLflow store and memory reports here.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    temporary = None if args.workdir else tempfile.TemporaryDirectory(prefix="wodfit-load-")
+    workdir = args.workdir or temporary.name
+    profile_dir = os.path.join(workdir, "memory")
+    os.makedirs(profile_dir, exist_ok=True)
+    for name in os.listdir(profile_dir):
+        os.remove(os.path.join(profile_dir, name))
+
+    redis = FakeRedisServer(latency_ms=args.redis_latency_ms).start() if args.redis else None
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    for name in ("REDIS_URL", "MLFLOW_TRACKING_URI", "WOD_MEMORY_PROFILE_DIR"):
+        env.pop(name, None)
+    if args.tracemalloc:
+        env["WOD_MEMORY_PROFILE_DIR"] = profile_dir
+        env["WOD_MEMORY_PROFILE_INTERVAL"] = str(args.sample_interval)
+    if redis is not None:
+        env["REDIS_URL"] = redis.url
+    if args.mlflow:
+        env["MLFLOW_TRACKING_URI"] = "file:" + os.path.join(workdir, "mlruns")
+    env.update(setting.split("=", 1) for setting in args.env)
+
+    command = [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port)]
+    # Idle keep-alive connections between stages must outlive uvicorn's 5s default.
+    command += ["--workers", str(args.workers), "--timeout-keep-alive", "600", "--log-level", "warning"]
+    log_path = os.path.join(workdir, "server.log")
+    failures = ["run did not finish"]
+    try:
+        with open(log_path, "w", encoding="utf-8") as log:
+            server = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                report = asyncio.run(_run(args, port, server.pid, profile_dir, redis))
+            finally:
+                _stop(server)
+        report["profiles"] = _profiles(profile_dir)
+        failures = _check(args, report)
+
+        for pid, growth in report["memory_growth"].items():
+            rss, traced = growth["rss_growth_mb"], growth["traced_growth_mb"]
+            print(
+                f"pid {pid:>7s} rss={growth['rss_start_mb'] or 0:7.1f}->{growth['rss_end_mb'] or 0:7.1f}MiB "
+                f"rss_growth={'n/a' if rss is None else f'{rss:.1f}MiB'} "
+                f"traced_growth={'n/a' if traced is None else f'{traced:.1f}MiB'}"
+            )
+        for pid, profile in report["profiles"].items():
+            for site in profile["growth"][:5]:
+                print(f"pid {pid:>7d} grew {site['size_diff_kb']:9.1f}KiB {site['count_diff']:+8d} at {site['site']}")
+        for failure in failures:
+            print(f"FAIL {failure}")
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"settings": vars(args), "cpu_count": os.cpu_count(), "results": report, "failures": failures},
+                    f,
+                    indent=2,
+                )
+    finally:
+        if redis is not None:
+            redis.stop()
+        if failures and os.path.exists(log_path):
+            with open(log_path, "r", encoding="utf-8", errors="replace") as log:
+                print("".join(log.readlines()[-20:]), end="")
+        if temporary is not None:
+            temporary.cleanup()
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Compare startup time and memory of the pickle dump and the mmap bundle.
+
+Each format is loaded by ``--workers`` fresh interpreters at the same time, the
+way uvicorn workers would load it. Every worker reports its load time, RSS and
+PSS (proportional set size, which splits shared pages between the processes
+mapping them). ``--scale`` replicates the training matrix to emulate a model
+trained on a larger crawl.
+
+    python -m benchmarks.model_loading --workers 4 --scale 100 --output model_loading.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import scipy.sparse
+
+from src.services.modelArtifacts import ModelBundle, export_bundle, load_model_bundle
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_SOURCE = os.path.join(PROJECT_ROOT, "models/0.214/model_vectorizer_scaler.dump")
+
+
+def _memory_kb() -> dict:
+    usage = {}
+    for path, fields in (("/proc/self/status", ("VmRSS",)), ("/proc/self/smaps_rollup", ("Pss",))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    name = line.split(":", 1)[0]
+                    if name in fields:
+                        usage[name.lower()] = int(line.split()[1])
+        except OSError:
+            continue
+    return usage
+
+
+def _worker(path: str, start_barrier, done_barrier, results) -> None:
+    baseline = _memory_kb()
+    start_barrier.wait()
+    started = time.perf_counter()
+    bundle = load_model_bundle(path)
+    # Touch every page of the training matrix, as the first prediction does.
+    bundle.model.predict(bundle.model._fit_X[:1])
+    float(np.asarray(bundle.model._fit_X.data).sum())
+    load_seconds = time.perf_counter() - started
+    done_barrier.wait()
+    usage = _memory_kb()
+    results.put(
+        {
+            "load_seconds": load_seconds,
+            "rss_kb": usage.get("vmrss", 0) - baseline.get("vmrss", 0),
+            "pss_kb": usage.get("pss", 0) - baseline.get("pss", 0),
+        }
+    )
+    done_barrier.wait()
+
+
+def _run_workers(path: str, workers: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    start_barrier, done_barrier, results = ctx.Barrier(workers), ctx.Barrier(workers), ctx.Queue()
+    processes = [ctx.Process(target=_worker, args=(path, start_barrier, done_barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        "workers": workers,
+        "load_seconds_median": statistics.median(sample["load_seconds"] for sample in samples),
+        "rss_kb_per_worker": statistics.median(sample["rss_kb"] for sample in samples),
+        "pss_kb_total": sum(sample["pss_kb"] for sample in samples),
+        "samples": samples,
+    }
+
+
+def _scaled_bundle(source: ModelBundle, scale: int) -> ModelBundle:
+    if scale == 1:
+        return source
+    model = source.model
+    fit_X = scipy.sparse.vstack([model._fit_X] * scale, format="csr")
+    labels = np.tile(model.classes_[model._y], scale)
+    model.fit(fit_X, labels)
+    return source
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=DEFAULT_SOURCE)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the training matrix this many times.")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    source = _scaled_bundle(load_model_bundle(args.source), args.scale)
+    with tempfile.TemporaryDirectory() as tmp:
+        dump_path = os.path.join(tmp, "model_vectorizer_scaler.dump")
+        with open(dump_path, "wb") as f:
+            pickle.dump({"model": source.model, "vectorizer": source.vectorizer, "scaler": source.scaler}, f)
+        bundle_path = os.path.join(tmp, "bundle")
+        export_bundle(source, bundle_path)
+
+        results = {
+            "source": args.source,
+            "scale": args.scale,
+            "training_rows": int(source.model._fit_X.shape[0]),
+            "formats": {
+                "pickle": _run_workers(dump_path, args.workers),
+                "mmap_bundle": _run_workers(bundle_path, args.workers),
+            },
+        }
+
+    for name, result in results["formats"].items():
+        print(
+            f"{name:12s} load={result['load_seconds_median'] * 1000:8.1f}ms "
+            f"rss/worker={result['rss_kb_per_worker'] / 1024:7.1f}MiB "
+            f"pss total={result['pss_kb_total'] / 1024:7.1f}MiB"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Compare brute-force KNN predict with SparseNeighborIndex as the corpus grows.
+
+The shipped training matrix is replicated ``scale`` times with jittered TF-IDF
+values, dropped terms and jittered weights to emulate a multi-year crawl, and
+each version is queried with the same batch of synthetic workouts. Labels
+from the index are checked against ``model.predict`` on every run.
+
+    python -m benchmarks.neighbor_index --scales 1 10 100 --output neighbor_index.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import scipy.sparse
+from sklearn.neighbors import KNeighborsClassifier
+
+from src.services.modelArtifacts import load_model_bundle
+from src.services.neighborIndex import SparseNeighborIndex
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_SOURCE = os.path.join(PROJECT_ROOT, "models/0.214/model_vectorizer_scaler.dump")
+
+
+def _grow_corpus(fit_X: scipy.sparse.csr_matrix, labels: np.ndarray, scale: int, rng) -> tuple:
+    if scale == 1:
+        return fit_X, labels
+    blocks = [fit_X]
+    n_terms = fit_X.shape[1] - 1
+    for _ in range(scale - 1):
+        block = fit_X.copy().tocsr()
+        is_term = block.indices < n_terms
+        keep = ~is_term | (rng.random(block.nnz) > 0.15)
+        block.data = np.where(is_term, block.data * rng.uniform(0.8, 1.2, block.nnz), block.data)
+        block.data = np.where(is_term, block.data, block.data + rng.normal(0, 0.05, block.nnz))
+        block.data[~keep] = 0.0
+        block.eliminate_zeros()
+        terms = block[:, :n_terms]
+        norms = np.sqrt(np.asarray(terms.multiply(terms).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        terms = scipy.sparse.diags(1.0 / norms) @ terms
+        blocks.append(scipy.sparse.hstack([terms, block[:, n_terms:]], format="csr"))
+    return scipy.sparse.vstack(blocks, format="csr"), np.tile(labels, scale)
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=DEFAULT_SOURCE)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    source = load_model_bundle(args.source)
+    model = source.model
+    base_X = model._fit_X.tocsr()
+    base_labels = model.classes_[model._y]
+
+    # Half the queries are jittered training rows (re-posted or slightly edited
+    # workouts), half are random vocabulary mixes with no close neighbour.
+    n_random = args.queries // 2
+    near, _ = _grow_corpus(base_X[rng.choice(base_X.shape[0], args.queries - n_random)], base_labels[:0], 2, rng)
+    near = near[args.queries - n_random :]
+    terms = list(source.vectorizer.vocabulary_)
+    texts = [" ".join(rng.choice(terms, rng.integers(3, 15))) for _ in range(n_random)]
+    weights = rng.choice([0, 0, 20, 45, 95, 135, 225], n_random).astype(float).reshape(-1, 1)
+    random_rows = scipy.sparse.hstack(
+        [source.vectorizer.transform(texts), source.scaler.transform(weights)], format="csr"
+    )
+    queries = scipy.sparse.vstack([near, random_rows], format="csr")
+
+    results = []
+    for scale in args.scales:
+        fit_X, labels = _grow_corpus(base_X, base_labels, scale, rng)
+        knn = KNeighborsClassifier(**model.get_params()).fit(fit_X, labels)
+        build_started = time.perf_counter()
+        index = SparseNeighborIndex(knn)
+        build_seconds = time.perf_counter() - build_started
+
+        expected = knn.predict(queries)
+        index.fallback_rows = 0
+        actual = index.predict(queries)
+        if not np.array_equal(expected, actual):
+            raise AssertionError(f"Index labels differ from KNN labels at scale {scale}.")
+        fallback_rate = index.fallback_rows / args.queries
+
+        single = queries[:1]
+        result = {
+            "scale": scale,
+            "training_rows": int(fit_X.shape[0]),
+            "index_build_seconds": build_seconds,
+            "fallback_rate": fallback_rate,
+            "brute_batch_ms": _time(lambda: knn.predict(queries), args.repeat) * 1000,
+            "index_batch_ms": _time(lambda: index.predict(queries), args.repeat) * 1000,
+            "brute_single_ms": _time(lambda: knn.predict(single), args.repeat * 5) * 1000,
+            "index_single_ms": _time(lambda: index.predict(single), args.repeat * 5) * 1000,
+        }
+        results.append(result)
+        print(
+            f"rows={result['training_rows']:>7d} "
+            f"batch({args.queries}) brute={result['brute_batch_ms']:8.1f}ms index={result['index_batch_ms']:8.1f}ms  "
+            f"single brute={result['brute_single_ms']:7.2f}ms index={result['index_single_ms']:7.2f}ms  "
+            f"fallback={fallback_rate:.1%}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"source": args.source, "queries": args.queries, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
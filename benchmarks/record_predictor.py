@@ -0,0 +1,119 @@
+"""Latency and throughput of record-time prediction at several batch sizes.
+
+Workouts and settings come from ``benchmarks.workloads.crawler_rows`` and are
+combined as in the notebook. The model is an export (``--model``) or, by
+default, a randomly initialized ``BertRegressor`` with bert-base dimensions
+built offline by ``recordPredictor.random_model``. Timings depend only on the
+architecture and token counts, not on the weights. Variants:
+
+- ``fp32_padded``: the notebook's inference, every text padded to 512 tokens;
+- ``fp32``: float32 weights with length-sorted, minimally padded batches;
+- ``int8``: the served configuration, with the embedding cache cleared before each call;
+- ``int8_warm``: the same requests again, answered from the embedding cache.
+
+Needs torch and transformers.
+
+    python -m benchmarks.record_predictor --batch-sizes 1 8 32 128 --threads 4 --output record.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.workloads import crawler_rows
+from src.services import recordPredictor
+from src.services.recordPredictor import RecordTimeModel, combine_text, quantize, random_model
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Export directory; default: random bert-base sized model.")
+    parser.add_argument("--hidden-size", type=int, default=768)
+    parser.add_argument("--layers", type=int, default=12)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=recordPredictor.RECORD_TORCH_THREADS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    import torch
+
+    recordPredictor.RECORD_TORCH_THREADS = args.threads
+    rows = crawler_rows(args.seed, 2000, max_comments=0)
+    texts = list(dict.fromkeys(combine_text(row["wod"], row["man_setting"], row["woman_setting"]) for row in rows))
+
+    if args.model:
+        int8 = RecordTimeModel.load(args.model)
+        fp32 = None
+    else:
+        model, tokenizer = random_model(texts=texts, hidden_size=args.hidden_size, layers=args.layers, seed=args.seed)
+        fp32 = RecordTimeModel(model, tokenizer, 512, target_mean=6.0, target_scale=0.5)
+        int8 = RecordTimeModel(quantize(model), tokenizer, 512, target_mean=6.0, target_scale=0.5)
+
+    def padded(batch):
+        encoded = fp32.tokenizer(batch, padding="max_length", truncation=True, max_length=512, return_tensors="pt")
+        with torch.inference_mode():
+            scaled = fp32.model(encoded["input_ids"], encoded["attention_mask"]).numpy().ravel()
+        return np.expm1(scaled * fp32.target_scale + fp32.target_mean)
+
+    variants = [("int8", int8, True), ("int8_warm", int8, False)]
+    if fp32 is not None:
+        variants = [("fp32_padded", None, False), ("fp32", fp32, True)] + variants
+
+    lengths = [len(ids) for ids in int8.tokenizer(texts, truncation=True, max_length=512)["input_ids"]]
+    print(f"{len(texts)} texts, tokens median={np.median(lengths):.0f} max={max(lengths)}, threads={args.threads}")
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    for batch_size in args.batch_sizes:
+        batches = [list(rng.choice(texts, batch_size, replace=False)) for _ in range(args.repeat)]
+        reference = None
+        for name, model, cold in variants:
+            if model is not None and not cold:
+                for batch in batches:
+                    model.predict_seconds(batch)
+            samples = []
+            for batch in batches:
+                if model is not None and cold:
+                    model.embeddings.clear()
+                started = time.perf_counter()
+                predictions = padded(batch) if model is None else model.predict_seconds(batch)
+                samples.append(time.perf_counter() - started)
+            if name == "fp32_padded":
+                reference = predictions
+            elif name == "fp32" and reference is not None and not np.allclose(predictions, reference, rtol=1e-4):
+                raise AssertionError("Minimal padding changed fp32 predictions.")
+            median = float(np.median(samples))
+            result = {
+                "variant": name,
+                "batch_size": batch_size,
+                "median_ms": median * 1e3,
+                "rows_per_s": batch_size / median,
+            }
+            results.append(result)
+            print(
+                f"{name:11s} batch={batch_size:4d} median={result['median_ms']:10.1f}ms "
+                f"rows/s={result['rows_per_s']:8.1f}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "settings": vars(args),
+                    "cpu_count": os.cpu_count(),
+                    "torch": torch.__version__,
+                    "token_lengths": {"median": float(np.median(lengths)), "max": int(max(lengths))},
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
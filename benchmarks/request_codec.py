@@ -0,0 +1,88 @@
+"""Request decoding, validation and response encoding cost of POST /wod/cluster, without the model.
+
+``pydantic`` is the previous handler path: ``WodClusterPostBodyDto`` parsing and
+validators, the service's ``_validate_inputs`` on the parsed lists and a
+``{"labels": [...]}`` dict through ``jsonable_encoder`` and ``JSONResponse``.
+``json`` and ``arrow`` decode the body with ``src.services.requestCodec``,
+validate once with ``_validate_inputs`` and encode with ``LabelEncoder``.
+
+    python -m benchmarks.request_codec --batch-sizes 1 100 1000 10000 --output request_codec.json
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from benchmarks.workloads import request_batches
+from src.routers.wodCluster import WodClusterPostBodyDto
+from src.services.requestCodec import LabelEncoder, decode_arrow, decode_json, encode_arrow_request
+from src.services.wodCluster import CLUSTER_LABELS, _validate_inputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    label_encoder = LabelEncoder(CLUSTER_LABELS)
+
+    def via_pydantic(body, clusters):
+        dto = WodClusterPostBodyDto.parse_raw(body)
+        _validate_inputs(dto.wods, dto.weights)
+        labels = [CLUSTER_LABELS.get(c, "Unknown") for c in clusters]
+        return JSONResponse(jsonable_encoder({"labels": labels})).body
+
+    def via_json(body, clusters):
+        _validate_inputs(*decode_json(body))
+        return label_encoder.encode(clusters)
+
+    def via_arrow(body, clusters):
+        _validate_inputs(*decode_arrow(body))
+        return label_encoder.encode(clusters)
+
+    results = []
+    for batch_size in args.batch_sizes:
+        ((wods, weights),) = request_batches(args.seed + batch_size, batch_size, 1)
+        json_body = json.dumps({"wods": wods, "weights": weights}).encode("utf-8")
+        arrow_body = encode_arrow_request(wods, weights)
+        clusters = np.random.default_rng(args.seed).integers(0, len(CLUSTER_LABELS), batch_size).tolist()
+        expected = json.loads(via_pydantic(json_body, clusters))
+
+        for path, call, body in (
+            ("pydantic", via_pydantic, json_body),
+            ("json", via_json, json_body),
+            ("arrow", via_arrow, arrow_body),
+        ):
+            if json.loads(call(body, clusters)) != expected:
+                raise AssertionError(f"{path} response differs from the pydantic path.")
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                call(body, clusters)
+                samples.append((time.perf_counter() - started) * 1e3)
+            result = {
+                "path": path,
+                "batch_size": batch_size,
+                "body_bytes": len(body),
+                "median_ms": float(np.median(samples)),
+            }
+            results.append(result)
+            print(
+                f"{path:8s} batch={batch_size:6d} body={result['body_bytes']:9d}B "
+                f"median={result['median_ms']:9.3f}ms"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare sklearn ``model.kneighbors`` with SimilarWodIndex for similar-workout queries.
+
+Request batches come from ``benchmarks.workloads.request_batches``. Distances
+from the index are checked against sklearn's brute-force search on every batch;
+neighbour order may differ only between rows at the same distance.
+
+    python -m benchmarks.similar_wods --batch-sizes 1 10 100 --output similar_wods.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import scipy.sparse
+
+from benchmarks.workloads import request_batches
+from src.services.modelArtifacts import load_model_bundle
+from src.services.similarWods import SimilarWodIndex
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_SOURCE = os.path.join(PROJECT_ROOT, "models/0.214/model_vectorizer_scaler.dump")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=DEFAULT_SOURCE)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batches", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    bundle = load_model_bundle(args.source)
+    started = time.perf_counter()
+    index = SimilarWodIndex.from_bundle(bundle)
+    load_ms = (time.perf_counter() - started) * 1e3
+
+    results = []
+    for batch_size in args.batch_sizes:
+        features = []
+        for wods, weights in request_batches(args.seed, batch_size, args.batches):
+            weights = np.asarray(weights, dtype=float).reshape(-1, 1)
+            features.append(
+                scipy.sparse.hstack([bundle.vectorizer.transform(wods), bundle.scaler.transform(weights)]).tocsr()
+            )
+
+        for batch in features:
+            expected, _ = bundle.model.kneighbors(batch, args.k)
+            actual, _ = index.kneighbors(batch, args.k)
+            if not np.allclose(expected, actual, rtol=0, atol=1e-7):
+                raise AssertionError("SimilarWodIndex distances differ from model.kneighbors.")
+
+        timings = {}
+        for name, search in (("sklearn", bundle.model.kneighbors), ("index", index.kneighbors)):
+            started = time.perf_counter()
+            for batch in features:
+                search(batch, args.k)
+            timings[name] = (time.perf_counter() - started) / args.batches * 1e3
+
+        result = {
+            "batch_size": batch_size,
+            "k": args.k,
+            "sklearn_ms_per_batch": timings["sklearn"],
+            "index_ms_per_batch": timings["index"],
+        }
+        results.append(result)
+        print(
+            f"batch={batch_size:4d} sklearn={result['sklearn_ms_per_batch']:7.3f}ms "
+            f"index={result['index_ms_per_batch']:7.3f}ms"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"source": args.source, "rows": int(index.fit_X.shape[0]), "load_ms": load_ms, "results": results},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
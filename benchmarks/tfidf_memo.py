@@ -0,0 +1,101 @@
+"""Compare ``vectorizer.transform`` with TfidfRowMemo on skewed request batches.
+
+Batches are drawn with a Zipf distribution from a pool of synthetic workouts
+(see ``benchmarks.workloads``). Every memo result is checked against
+``vectorizer.transform`` for identical indptr, indices and data.
+
+    python -m benchmarks.tfidf_memo --batch-sizes 1 32 512 --output tfidf_memo.json
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.workloads import skewed_batch, workout_pool
+from src.services.modelArtifacts import load_model_bundle
+from src.services.tfidfMemo import TfidfRowMemo
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_SOURCE = os.path.join(PROJECT_ROOT, "models/0.214/model_vectorizer_scaler.dump")
+
+
+def _assert_identical(expected, actual) -> None:
+    expected, actual = expected.tocsr(), actual.tocsr()
+    if not (
+        expected.shape == actual.shape
+        and np.array_equal(expected.indptr, actual.indptr)
+        and np.array_equal(expected.indices, actual.indices)
+        and expected.data.dtype == actual.data.dtype
+        and np.array_equal(expected.data.view(np.uint64), actual.data.view(np.uint64))
+    ):
+        raise AssertionError("TfidfRowMemo output differs from vectorizer.transform.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=DEFAULT_SOURCE)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 512])
+    parser.add_argument("--pool-size", type=int, default=2000)
+    parser.add_argument("--memo-size", type=int, default=20000)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--zipf", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectorizer = load_model_bundle(args.source).vectorizer
+    pool = workout_pool(rng, args.pool_size)
+
+    results = []
+    for batch_size in args.batch_sizes:
+        batches = [[text for text, _ in skewed_batch(rng, pool, batch_size, args.zipf)] for _ in range(args.batches)]
+        memo = TfidfRowMemo(vectorizer, args.memo_size)
+        for texts in batches:
+            _assert_identical(vectorizer.transform(texts), memo.transform(texts))
+        cold_stats = memo.snapshot()
+
+        started = time.perf_counter()
+        for texts in batches:
+            vectorizer.transform(texts)
+        baseline = time.perf_counter() - started
+
+        dedup_only = TfidfRowMemo(vectorizer, 0)
+        started = time.perf_counter()
+        for texts in batches:
+            dedup_only.transform(texts)
+        dedup = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for texts in batches:
+            memo.transform(texts)
+        warm = time.perf_counter() - started
+
+        rows = batch_size * args.batches
+        result = {
+            "batch_size": batch_size,
+            "batches": args.batches,
+            "distinct_texts": len({text for texts in batches for text in texts}),
+            "first_pass_memo_hit_rate": cold_stats["memo"]["hits"]
+            / max(cold_stats["memo"]["hits"] + cold_stats["memo"]["misses"], 1),
+            "transform_us_per_row": baseline / rows * 1e6,
+            "dedup_only_us_per_row": dedup / rows * 1e6,
+            "warm_memo_us_per_row": warm / rows * 1e6,
+        }
+        results.append(result)
+        print(
+            f"batch={batch_size:4d} transform={result['transform_us_per_row']:7.1f}us/row "
+            f"dedup={result['dedup_only_us_per_row']:7.1f}us/row memo={result['warm_memo_us_per_row']:7.1f}us/row "
+            f"first-pass hit rate={result['first_pass_memo_hit_rate']:.1%}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"source": args.source, "pool_size": args.pool_size, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
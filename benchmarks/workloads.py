@@ -0,0 +1,161 @@
+"""Synthetic CrossFit-style workouts for benchmarks.
+
+Workouts are built from the templates and movements that dominate the crawled
+archive (for-time couplets, round-based chippers, AMRAPs and EMOMs, plus the
+named benchmark WODs). Requests are drawn from a fixed pool with a Zipf
+distribution, because a handful of popular workouts account for most traffic.
+``crawler_rows`` emits the same workouts in the CSV layout written by
+``wodCrawler/functioins.py``; every generator is deterministic for a given seed.
+"""
+
+import csv
+import datetime
+from typing import List, Tuple
+
+import numpy as np
+
+from src.services.wodSettings import mean_setting_weight
+
+CRAWLER_FIELDS = ["date", "wod", "man_setting", "woman_setting", "athlete", "comment", "url"]
+
+MOVEMENTS = [
+    "thrusters", "pull-ups", "chest-to-bar pull-ups", "deadlifts", "power cleans", "squat cleans",
+    "hang power snatches", "overhead squats", "front squats", "back squats", "push presses",
+    "push jerks", "wall-ball shots", "box jumps", "box jump-overs", "burpees", "bar-facing burpees",
+    "double-unders", "toes-to-bars", "handstand push-ups", "ring muscle-ups", "bar muscle-ups",
+    "kettlebell swings", "dumbbell snatches", "dumbbell box step-ups", "walking lunges",
+    "sit-ups", "GHD sit-ups", "rope climbs", "calorie row", "calorie bike", "air squats",
+    "pistols", "ring dips", "shoulder-to-overheads", "clean-and-jerks", "sumo deadlift high pulls",
+]
+LOADED = {
+    "thrusters", "deadlifts", "power cleans", "squat cleans", "hang power snatches", "overhead squats",
+    "front squats", "back squats", "push presses", "push jerks", "kettlebell swings", "dumbbell snatches",
+    "shoulder-to-overheads", "clean-and-jerks", "sumo deadlift high pulls",
+}
+LOADS_LB = [35, 50, 53, 65, 75, 95, 115, 135, 155, 185, 225, 275, 315]
+NAMED_WODS = {
+    "Fran": ("For time: 21-15-9 reps of: Thrusters Pull-ups", 95.0),
+    "Murph": (
+        "For time: 1-mile run 100 pull-ups 200 push-ups 300 squats 1-mile run If you've got a twenty pound "
+        "vest or body armor, wear it.",
+        20.0,
+    ),
+    "Grace": ("For time: 30 clean-and-jerks", 135.0),
+    "Isabel": ("For time: 30 snatches", 135.0),
+    "Helen": ("3 rounds for time of: 400-meter run 21 kettlebell swings 12 pull-ups", 53.0),
+    "Cindy": ("Complete as many rounds as possible in 20 minutes of: 5 pull-ups 10 push-ups 15 squats", 0.0),
+    "Diane": ("For time: 21-15-9 reps of: Deadlifts Handstand push-ups", 225.0),
+    "Karen": ("For time: 150 wall-ball shots", 20.0),
+    "Annie": ("50-40-30-20-10 reps for time of: Double-unders Sit-ups", 0.0),
+    "DT": ("5 rounds for time of: 12 deadlifts 9 hang power cleans 6 push jerks", 155.0),
+}
+
+
+def _movement_line(rng, movement: str) -> str:
+    reps = int(rng.choice([3, 5, 7, 9, 10, 12, 15, 20, 21, 30, 50]))
+    return f"{reps} {movement}"
+
+
+def synthetic_wod(rng) -> Tuple[str, float]:
+    kind = rng.integers(0, 5)
+    movements = list(rng.choice(MOVEMENTS, size=int(rng.integers(2, 5)), replace=False))
+    if kind == 0:
+        scheme = rng.choice(["21-15-9", "15-12-9", "10-8-6-4-2", "5-10-15-20-15-10-5"])
+        text = f"For time: {scheme} reps of: " + " ".join(movements)
+    elif kind == 1:
+        rounds = int(rng.integers(3, 11))
+        text = f"{rounds} rounds for time of: " + " ".join(_movement_line(rng, m) for m in movements)
+    elif kind == 2:
+        minutes = int(rng.choice([7, 10, 12, 15, 20]))
+        text = f"Complete as many rounds as possible in {minutes} minutes of: " + " ".join(
+            _movement_line(rng, m) for m in movements
+        )
+    elif kind == 3:
+        text = f"Every 1:00 for {int(rng.choice([10, 12, 16, 20]))} minutes: " + " ".join(
+            _movement_line(rng, m) for m in movements
+        )
+    else:
+        distance = rng.choice(["400-meter run", "800-meter run", "1-mile run", "500-meter row", "5k run"])
+        text = f"For time: {distance} " + " ".join(_movement_line(rng, m) for m in movements) + f" {distance}"
+    weight = float(rng.choice(LOADS_LB)) if any(m in LOADED for m in movements) else 0.0
+    return text, weight
+
+
+def workout_pool(rng, size: int) -> List[Tuple[str, float]]:
+    pool = list(NAMED_WODS.values())
+    while len(pool) < size:
+        pool.append(synthetic_wod(rng))
+    return pool[:size]
+
+
+def skewed_batch(rng, pool: List[Tuple[str, float]], batch_size: int, zipf_a: float = 1.2) -> List[Tuple[str, float]]:
+    """Draw ``batch_size`` workouts from ``pool``; rank ``r`` is drawn with weight ``r ** -zipf_a``."""
+
+    ranks = np.arange(1, len(pool) + 1)
+    probabilities = ranks ** -zipf_a
+    probabilities /= probabilities.sum()
+    picks = rng.choice(len(pool), size=batch_size, p=probabilities)
+    batch = []
+    for pick in picks:
+        text, weight = pool[pick]
+        # Some users retype the same workout with different case or spacing.
+        if rng.random() < 0.1:
+            text = text.upper() if rng.random() < 0.5 else text.replace(" ", "  ", 1)
+        batch.append((text, weight))
+    return batch
+
+
+def _setting_text(rng, weight: float) -> Tuple[str, str]:
+    if not weight:
+        return "", ""
+    if rng.random() < 0.3:
+        return f"{round(weight / 2.2)}-kg", f"{round(weight / 2.2 * 0.7)}-kg"
+    return f"{weight:g} lb", f"{round(weight * 0.7 / 5) * 5:g} lb"
+
+
+def crawler_rows(seed: int, articles: int, max_comments: int = 5) -> List[dict]:
+    """Rows as written by the crawler: one per Rx comment, repeating the article's workout."""
+
+    rng = np.random.default_rng(seed)
+    pool = workout_pool(rng, max(articles, len(NAMED_WODS)))
+    first_day = datetime.date(2025, 1, 1)
+    rows = []
+    for i in range(articles):
+        day = first_day + datetime.timedelta(days=i)
+        text, weight = pool[i] if rng.random() < 0.8 else pool[int(rng.integers(0, len(pool)))]
+        man_setting, woman_setting = _setting_text(rng, weight)
+        url = f"https://www.crossfit.com/{day:%y%m%d}"
+        comments = int(rng.integers(0, max_comments + 1))
+        for _ in range(comments or 1):
+            minutes, seconds = int(rng.integers(3, 40)), int(rng.integers(0, 60))
+            rows.append(
+                {
+                    "date": day.isoformat(),
+                    "wod": text,
+                    "man_setting": man_setting,
+                    "woman_setting": woman_setting,
+                    "athlete": f"athlete{int(rng.integers(0, 10000))}" if comments else "",
+                    "comment": f"{minutes}:{seconds:02d} rx" if comments else "",
+                    "url": url,
+                }
+            )
+    return rows
+
+
+def write_crawler_csv(path: str, rows: List[dict]) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CRAWLER_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def request_batches(seed: int, batch_size: int, count: int, pool_size: int = 2000) -> List[Tuple[list, list]]:
+    """``count`` (wods, weights) request bodies; weights come from crawler-style settings."""
+
+    rng = np.random.default_rng(seed)
+    pool = [(text, mean_setting_weight(_setting_text(rng, weight)[0])) for text, weight in workout_pool(rng, pool_size)]
+    batches = []
+    for _ in range(count):
+        batch = skewed_batch(rng, pool, batch_size)
+        batches.append(([text for text, _ in batch], [weight for _, weight in batch]))
+    return batches
@@ -1,5 +1,16 @@
+import asyncio
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from src.routers.index import index_router
+from src.services.cacheWarmup import warm_up_from_env
+from src.services.inferencePool import shutdown_inference_pool, start_inference_pool
+from src.services.memoryProfiler import shutdown_memory_profiler, start_memory_profiler
+from src.services.metrics import MetricsMiddleware, render_metrics
+from src.services.microBatcher import shutdown_batcher
+from src.services.shadowInference import configure_shadow, shutdown_shadow
+from src.services.similarWods import get_similar_index
+from src.services.wodCluster import MODEL_VERSION, close_async_cache_client, shutdown_prediction_logger
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(docs_url="/docs", openapi_url="/open-api-docs")
@@ -18,4 +29,37 @@ app.add_middleware(
     allow_headers=["*"],                # Authorization, Content-Type 등
 )
 
-app.include_router(index_router, prefix="")
\ No newline at end of file
+app.add_middleware(MetricsMiddleware)
+
+app.include_router(index_router, prefix="")
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("startup")
+async def load_model_in_background():
+    # Load and soak tests only (WOD_MEMORY_PROFILE_DIR); started first so model loading is traced too.
+    start_memory_profiler()
+    # Start loading the model (and the similar-workout index built from it)
+    # without holding up startup; the first request waits on the same lock if
+    # it arrives before loading finishes.
+    asyncio.get_event_loop().run_in_executor(None, get_similar_index)
+    # Pin the precomputed labels of historical workouts (WOD_CLUSTER_WARM_CACHE_PATH).
+    asyncio.get_event_loop().run_in_executor(None, warm_up_from_env)
+    # Candidate model version re-run on a sample of answered rows (WOD_CLUSTER_SHADOW_MODEL_PATH).
+    configure_shadow(MODEL_VERSION)
+    # With the process backend, workers load their own copy of the model.
+    asyncio.get_event_loop().create_task(start_inference_pool())
+
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    await shutdown_batcher()
+    await shutdown_inference_pool()
+    await close_async_cache_client()
+    shutdown_prediction_logger()
+    shutdown_shadow()
+    shutdown_memory_profiler()
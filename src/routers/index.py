@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 from src.routers.wodCluster import wod_cluster_router
+from src.routers.wodRecord import wod_record_router
 
 index_router = router = APIRouter()
 
 router.include_router(wod_cluster_router, prefix="/wod")
-
+router.include_router(wod_record_router, prefix="/wod")
@@ -1,64 +1,192 @@
 import asyncio
-import math
-from typing import List
+import functools
+import json
+import threading
+import time
+from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel, Field, root_validator, validator
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
 
-from src.services.wodCluster import predictCluster
+from src.services.bulkCluster import DEFAULT_CHUNK_SIZE, classify_lines, spool_upload
+from src.services.inferencePool import get_inference_pool
+from src.services.metrics import observe_since_request_start, observe_stage, register_collector
+from src.services.microBatcher import BATCHING_ENABLED, get_batcher, get_compute_batcher
+from src.services.requestCodec import ARROW_CONTENT_TYPE, JSON_CONTENT_TYPE, LabelEncoder, decode_cluster_request
+from src.services.shadowInference import get_shadow_stats
+from src.services.similarWods import DEFAULT_K, MAX_K, findSimilarWods
+from src.services.wodCluster import (
+    ASYNC_CACHE_ENABLED,
+    CLUSTER_LABELS,
+    computeCluster,
+    get_cache_stats,
+    predictCluster,
+    predictClusterAsync,
+)
 
 wod_cluster_router = router = APIRouter()
 
+# Predictions submitted to the default executor that have not finished yet.
+_executor_jobs = {"queued": 0, "running": 0}
+_executor_jobs_lock = threading.Lock()
+
+
+def _count_job(state: str, delta: int) -> None:
+    with _executor_jobs_lock:
+        _executor_jobs[state] += delta
+
+
+async def _run_in_executor(fn, *args):
+    submitted = time.perf_counter()
+
+    def run():
+        observe_stage("executor_wait", time.perf_counter() - submitted)
+        _count_job("queued", -1)
+        _count_job("running", 1)
+        try:
+            return fn(*args)
+        finally:
+            _count_job("running", -1)
+
+    _count_job("queued", 1)
+    return await asyncio.get_event_loop().run_in_executor(None, run)
+
+
+async def _run_inference(fn, *args):
+    # Worker processes when WOD_CLUSTER_INFERENCE_BACKEND=process, else the thread executor.
+    pool = get_inference_pool()
+    if pool is not None:
+        return await pool.run(fn, *args)
+    return await _run_in_executor(fn, *args)
+
+
+register_collector(
+    "wodfit_executor_jobs",
+    "gauge",
+    "Cluster predictions waiting for or running in the executor.",
+    lambda: (("wodfit_executor_jobs", {"state": state}, count) for state, count in list(_executor_jobs.items())),
+)
+
 
 class WodClusterPostBodyDto(BaseModel):
+    # Types only: values are checked once, by the service (wodCluster._validate_inputs), whose
+    # InvalidInputError becomes the same 422 on every endpoint (see _invalid_request).
     wods: List[str] = Field(..., min_items=1, description="List of workout descriptions")
     weights: List[float] = Field(..., min_items=1, description="List of weights corresponding to each workout")
 
-    @validator("wods")
-    def validate_wods(cls, value: List[str]) -> List[str]:
-        cleaned: List[str] = []
-        for idx, wod in enumerate(value):
-            if not isinstance(wod, str):
-                raise ValueError(f"wods[{idx}] must be a string.")
-            stripped = wod.strip()
-            if not stripped:
-                raise ValueError("Workout descriptions cannot be empty strings.")
-            cleaned.append(stripped)
-        return cleaned
-
-    @validator("weights")
-    def validate_weights(cls, value: List[float]) -> List[float]:
-        for idx, weight in enumerate(value):
-            if weight is None:
-                raise ValueError(f"weights[{idx}] cannot be null.")
-            if not math.isfinite(weight):
-                raise ValueError("Weights must be finite numbers.")
-        return value
-
-    @root_validator
-    def validate_lengths(cls, values):
-        wods = values.get("wods", [])
-        weights = values.get("weights", [])
-        if wods and weights and len(wods) != len(weights):
-            raise ValueError("The number of wods must match the number of weights.")
-        return values
-
-
-@router.post("/cluster")
-async def getWodClusterPrediction(body: WodClusterPostBodyDto):
-    loop = asyncio.get_event_loop()
+
+_label_encoder = LabelEncoder(CLUSTER_LABELS)
+
+
+def _invalid_request(exc: ValueError) -> HTTPException:
+    # Same status and shape as a pydantic validation error; InvalidInputError names the field, e.g. ["body", "wods", 0].
+    loc = ["body", *getattr(exc, "loc", ())]
+    return HTTPException(status_code=422, detail=[{"loc": loc, "msg": str(exc), "type": "value_error"}])
+
+
+@router.post(
+    "/cluster",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                JSON_CONTENT_TYPE: {"schema": WodClusterPostBodyDto.schema()},
+                ARROW_CONTENT_TYPE: {
+                    "schema": {"type": "string", "format": "binary"},
+                    "description": "Arrow IPC stream with a 'wod' string column and a 'weight' float column.",
+                },
+            },
+        }
+    },
+)
+async def getWodClusterPrediction(request: Request):
+    # The body is decoded here and validated once, by the service; see src.services.requestCodec.
+    try:
+        wods, weights = decode_cluster_request(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as exc:
+        raise _invalid_request(exc) from exc
+    observe_since_request_start(request.scope, "request_validation")
     try:
-        clusters = await loop.run_in_executor(None, predictCluster, body.wods, body.weights)
+        if ASYNC_CACHE_ENABLED:
+            # Cache hits are answered on the event loop; only misses reach the executor or batcher.
+            if BATCHING_ENABLED:
+                compute = get_compute_batcher().submit
+            else:
+                compute = functools.partial(_run_inference, computeCluster)
+            clusters = await predictClusterAsync(wods, weights, compute)
+        elif BATCHING_ENABLED:
+            clusters = await get_batcher().submit(wods, weights)
+        else:
+            # Caching and logging stay in this process; with the process backend only misses go to a worker.
+            pool = get_inference_pool()
+            clusters = await _run_in_executor(predictCluster, wods, weights, pool.compute if pool else None)
     except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+        raise _invalid_request(exc) from exc
+
+    return Response(_label_encoder.encode(clusters), media_type=JSON_CONTENT_TYPE)
+
+
+class WodSimilarPostBodyDto(WodClusterPostBodyDto):
+    k: int = Field(DEFAULT_K, ge=1, le=MAX_K, description="Number of similar training workouts per input")
+
+
+@router.post("/cluster/similar")
+async def getSimilarWods(body: WodSimilarPostBodyDto, request: Request):
+    """Return the ``k`` nearest training workouts (text, weight, cluster, distance) for each input."""
+
+    observe_since_request_start(request.scope, "request_validation")
+    try:
+        results = await _run_in_executor(findSimilarWods, body.wods, body.weights, body.k)
+    except ValueError as exc:
+        raise _invalid_request(exc) from exc
+
+    return {"results": results}
+
+
+@router.post("/cluster/stream")
+async def streamWodClusterPrediction(
+    request: Request,
+    format: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    unique_urls: bool = False,
+):
+    """Label an NDJSON or CSV upload chunk by chunk and stream NDJSON results back.
+
+    ``unique_urls`` skips records whose URL is among the last
+    ``WOD_CLUSTER_STREAM_UNIQUE_URLS`` distinct URLs, so dedup memory is bounded too.
+    """
+
+    content_type = request.headers.get("content-type", "")
+    fmt = format or ("csv" if "csv" in content_type else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'.")
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive.")
+
+    upload = await spool_upload(request.stream())
+
+    def results():
+        # Runs in the threadpool: StreamingResponse iterates sync generators there.
+        try:
+            for result in classify_lines(upload, fmt=fmt, chunk_size=chunk_size, unique_urls=unique_urls):
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        except ValueError as exc:
+            yield json.dumps({"error": str(exc)}, ensure_ascii=False) + "\n"
+        finally:
+            upload.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 
-    cluster_labels = {
-        0: "Endurance",
-        1: "Cardio",
-        2: "Strength",
-        3: "Volume",
-    }
+@router.get("/cluster/cache/stats")
+async def getWodClusterCacheStats():
+    return get_cache_stats()
 
-    labels = [cluster_labels.get(c, "Unknown") for c in clusters]
 
-    return {"labels": labels}
+@router.get("/cluster/shadow/stats")
+async def getWodClusterShadowStats():
+    stats = get_shadow_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Shadow inference is not configured.")
+    return stats
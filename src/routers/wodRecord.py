@@ -0,0 +1,31 @@
+import asyncio
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from src.services.recordPredictor import MAX_TEXTS, predictRecordSeconds
+
+wod_record_router = router = APIRouter()
+
+
+class WodRecordPostBodyDto(BaseModel):
+    wods: List[str] = Field(..., min_items=1, max_items=MAX_TEXTS, description="List of workout descriptions")
+    man_settings: Optional[List[Optional[str]]] = Field(None, description="Men's prescribed loads, one per workout")
+    woman_settings: Optional[List[Optional[str]]] = Field(None, description="Women's prescribed loads, one per workout")
+
+
+@router.post("/record")
+async def getWodRecordPrediction(body: WodRecordPostBodyDto):
+    """Predicted median finishing time in seconds for each workout (int8 BertRegressor)."""
+
+    try:
+        seconds = await asyncio.get_event_loop().run_in_executor(
+            None, predictRecordSeconds, body.wods, body.man_settings, body.woman_settings
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except RuntimeError as exc:  # torch/transformers or the exported model missing
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+    return {"seconds": seconds}
@@ -0,0 +1,231 @@
+"""Chunked, constant-memory cluster labelling for NDJSON and CSV inputs.
+
+Records are parsed one line (or one CSV record) at a time, grouped into chunks
+of ``chunk_size`` rows and sent through the cache, ``_prepare_features`` and
+the model together; results come back as one JSON object per input record.
+
+Each record needs a workout text (``wod``) and a weight: ``weight``, then
+``mean_weight``, and otherwise the mean load parsed from ``man_setting`` as in
+the training notebook, so crawler CSVs (``wodCrawler``) can be labelled as-is.
+Invalid records produce ``{"row": n, "error": ...}`` instead of stopping the stream.
+With ``unique_urls``, a record whose ``url`` is among the last
+``WOD_CLUSTER_STREAM_UNIQUE_URLS`` distinct URLs is skipped. Crawler CSVs
+repeat an article on consecutive rows, so the bounded window catches them
+while memory stays constant; repeats further apart are labelled again.
+
+    python -m src.services.bulkCluster wod_data2025.csv --unique-urls -o labels.ndjson
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import tempfile
+from collections import OrderedDict
+from typing import AsyncIterable, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from src.services.config import env_int
+from src.services.wodCluster import CLUSTER_LABELS, _log_prediction_event, _predict_validated, _validate_inputs
+from src.services.wodSettings import mean_setting_weight
+
+DEFAULT_CHUNK_SIZE = env_int("WOD_CLUSTER_STREAM_CHUNK_SIZE", 512, minimum=1)
+SPOOL_MAX_MEMORY = env_int("WOD_CLUSTER_STREAM_SPOOL_BYTES", 8 * 1024 * 1024)
+UNIQUE_URL_WINDOW = env_int("WOD_CLUSTER_STREAM_UNIQUE_URLS", 100_000, minimum=1)
+# Columns copied from the input record into every result line.
+PASSTHROUGH_FIELDS = ("id", "url", "date")
+
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+def _record_weight(record: dict) -> float:
+    for field in ("weight", "mean_weight"):
+        value = record.get(field)
+        if value not in (None, ""):
+            return float(value)
+    return mean_setting_weight(record.get("man_setting"))
+
+
+def _parse_record(row: int, record) -> Record:
+    if not isinstance(record, dict):
+        return row, None, "Each record must be a JSON object."
+    try:
+        wods, weights = _validate_inputs([record.get("wod")], [_record_weight(record)])
+    except (TypeError, ValueError) as exc:
+        return row, None, str(exc)
+    parsed = {field: record[field] for field in PASSTHROUGH_FIELDS if record.get(field) not in (None, "")}
+    parsed["wod"] = wods[0]
+    parsed["weight"] = float(weights[0, 0])
+    return row, parsed, None
+
+
+class RecordParser:
+    """Turn input lines into records without holding more than one record in memory.
+
+    CSV records may span several physical lines when a quoted field contains a
+    newline, so lines are buffered until the quote count is balanced.
+    """
+
+    def __init__(self, fmt: str = "ndjson", unique_urls: bool = False, url_window: int = UNIQUE_URL_WINDOW) -> None:
+        if fmt not in ("ndjson", "csv"):
+            raise ValueError("Stream format must be 'ndjson' or 'csv'.")
+        self.fmt = fmt
+        self.unique_urls = unique_urls
+        self.url_window = max(url_window, 1)
+        # The most recently seen distinct URLs, least recent first.
+        self._seen_urls: "OrderedDict[str, None]" = OrderedDict()
+        self._header: Optional[list] = None
+        self._pending = ""
+        self._row = 0
+
+    def _emit(self, record) -> Iterator[Record]:
+        if self.unique_urls and isinstance(record, dict) and record.get("url"):
+            if record["url"] in self._seen_urls:
+                self._seen_urls.move_to_end(record["url"])
+                return
+            self._seen_urls[record["url"]] = None
+            if len(self._seen_urls) > self.url_window:
+                self._seen_urls.popitem(last=False)
+        self._row += 1
+        yield _parse_record(self._row, record)
+
+    def feed(self, line: str) -> Iterator[Record]:
+        if self.fmt == "ndjson":
+            line = line.strip()
+            if not line:
+                return
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                self._row += 1
+                yield self._row, None, f"Invalid JSON: {exc}"
+                return
+            yield from self._emit(record)
+            return
+
+        self._pending += line
+        if self._pending.count('"') % 2:
+            return
+        text, self._pending = self._pending, ""
+        if not text.strip():
+            return
+        values = next(csv.reader([text]))
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            if "wod" not in self._header:
+                raise ValueError("CSV input must have a 'wod' column.")
+            return
+        yield from self._emit(dict(zip(self._header, values)))
+
+    def close(self) -> Iterator[Record]:
+        if self._pending:
+            pending, self._pending = self._pending, ""
+            self._row += 1
+            yield self._row, None, f"Unterminated CSV record: {pending[:80]!r}"
+
+
+def classify_chunk(chunk: list) -> list:
+    valid = [(row, record) for row, record, _ in chunk if record is not None]
+    predictions = {}
+    if valid:
+        wods = [record["wod"] for _, record in valid]
+        weights = np.array([[record["weight"]] for _, record in valid], dtype=float)
+        preds, cached = _predict_validated(wods, weights)
+        _log_prediction_event(wods, weights.reshape(-1).tolist(), preds, cache_hit=all(cached))
+        predictions = {row: pred for (row, _), pred in zip(valid, preds)}
+
+    results = []
+    for row, record, error in chunk:
+        if record is None:
+            results.append({"row": row, "error": error})
+            continue
+        result = {"row": row}
+        result.update((field, record[field]) for field in PASSTHROUGH_FIELDS if field in record)
+        cluster = predictions[row]
+        result["cluster"] = cluster
+        result["label"] = CLUSTER_LABELS.get(cluster, "Unknown")
+        results.append(result)
+    return results
+
+
+def _chunks(records: Iterable[Record], chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def classify_lines(
+    lines: Iterable[str],
+    fmt: str = "ndjson",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    unique_urls: bool = False,
+) -> Iterator[dict]:
+    """Yield one result per input record, classifying ``chunk_size`` records at a time."""
+
+    parser = RecordParser(fmt, unique_urls=unique_urls)
+
+    def records():
+        for line in lines:
+            yield from parser.feed(line)
+        yield from parser.close()
+
+    for chunk in _chunks(records(), chunk_size):
+        yield from classify_chunk(chunk)
+
+
+async def spool_upload(body: AsyncIterable[bytes], max_memory: int = SPOOL_MAX_MEMORY):
+    """Copy an upload into a spooled temporary file and return it as text.
+
+    The body has to be read completely before a StreamingResponse starts, because
+    the response listens for client disconnects on the same receive channel.
+    Spooling keeps memory bounded: bodies larger than ``max_memory`` go to disk.
+    """
+
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    async for data in body:
+        spool.write(data)
+    spool.seek(0)
+    return io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", default=["-"], help="CSV or NDJSON files ('-' reads stdin).")
+    parser.add_argument("-o", "--output", help="Write NDJSON results here instead of stdout.")
+    parser.add_argument("--format", choices=("csv", "ndjson"), help="Input format (default: from file extension).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--unique-urls",
+        action="store_true",
+        help=(
+            "Label each crawled article once; crawler CSVs repeat the workout for every comment. "
+            "Remembers the last WOD_CLUSTER_STREAM_UNIQUE_URLS distinct URLs."
+        ),
+    )
+    args = parser.parse_args()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for path in args.inputs:
+            fmt = args.format or ("csv" if path.lower().endswith(".csv") else "ndjson")
+            source = sys.stdin if path == "-" else open(path, "r", encoding="utf-8-sig", newline="")
+            try:
+                for result in classify_lines(source, fmt, max(args.chunk_size, 1), args.unique_urls):
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
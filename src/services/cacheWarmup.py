@@ -0,0 +1,148 @@
+"""Precompute cluster labels for every distinct historical workout and pin them at startup.
+
+``build`` reads the crawler CSVs, derives each article's weight from
+``man_setting`` the way the notebook does (kg converted to lb, see
+``wodPreprocessing.mean_weights``), collapses workouts that the vectorizer
+cannot tell apart (``wodCanonical``) and writes their labels:
+
+    python -m src.services.cacheWarmup build wod_data2024.csv wod_data2025.csv -o models/warm_cache.json
+
+At startup, ``WOD_CLUSTER_WARM_CACHE_PATH`` names that file; its predictions
+are pinned in process memory (``wodCluster.pin_predictions``) and optionally
+written to Redis, so benchmark workouts such as Fran or Murph are never
+computed cold. A file built with another model version is relabelled with the
+served model before it is pinned.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src.services import wodCluster
+from src.services.config import env_bool, env_int
+from src.services.wodPreprocessing import DEFAULT_CHUNK_SIZE, mean_weights
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+
+WARM_CACHE_PATH = os.getenv("WOD_CLUSTER_WARM_CACHE_PATH")
+WARM_CACHE_REDIS = env_bool("WOD_CLUSTER_WARM_CACHE_REDIS", False)
+WARM_CACHE_BATCH_SIZE = env_int("WOD_CLUSTER_WARM_CACHE_BATCH_SIZE", 1000, minimum=1)
+
+
+def read_workouts(
+    paths: Union[str, Iterable[str]], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> list[tuple[str, float]]:
+    """Distinct ``(wod, weight)`` pairs of the given crawler CSVs, in first-seen order."""
+
+    if isinstance(paths, str):
+        paths = [paths]
+    seen: dict[tuple[str, float], None] = {}
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=["wod", "man_setting"], chunksize=chunk_size):
+            chunk = chunk.dropna(subset=["wod"])
+            wods = chunk["wod"].astype(str).str.strip()
+            keep = wods != ""
+            pairs = zip(wods[keep].tolist(), mean_weights(chunk.loc[keep, "man_setting"]).astype(float).tolist())
+            seen.update(dict.fromkeys(pairs))
+    return list(seen)
+
+
+def label_workouts(
+    workouts: list[tuple[str, float]], batch_size: int = WARM_CACHE_BATCH_SIZE
+) -> list[tuple[str, float, int]]:
+    """``(canonical wod, weight, cluster)`` for each workout the served model tells apart."""
+
+    canonicalizer = wodCluster.get_canonicalizer()
+    unique = list(dict.fromkeys((canonicalizer.text(wod), weight) for wod, weight in workouts))
+    labelled = []
+    for start in range(0, len(unique), batch_size):
+        batch = unique[start : start + batch_size]
+        # Not validated: a canonical text may be empty ("!!!"), which the vectorizer handles like the original.
+        weights = np.asarray([weight for _, weight in batch], dtype=float).reshape(-1, 1)
+        labels = wodCluster._compute_predictions([wod for wod, _ in batch], weights)
+        labelled.extend((wod, weight, int(label)) for (wod, weight), label in zip(batch, labels))
+    return labelled
+
+
+def build(paths: list[str], output: str, batch_size: int = WARM_CACHE_BATCH_SIZE) -> dict:
+    started = time.perf_counter()
+    workouts = read_workouts(paths)
+    rows = label_workouts(workouts, batch_size)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"model_version": wodCluster.MODEL_VERSION, "rows": rows}, f, ensure_ascii=False)
+    return {
+        "workouts": len(workouts),
+        "rows": len(rows),
+        "model_version": wodCluster.MODEL_VERSION,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def load(path: str, write_redis: bool = WARM_CACHE_REDIS) -> int:
+    """Pin the predictions of a ``build`` file; returns the number of pinned keys."""
+
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    rows = payload["rows"]
+    if payload.get("model_version") != wodCluster.MODEL_VERSION:
+        logger.info(
+            "Warm cache %s was built for model %s; relabelling %d rows with %s",
+            path,
+            payload.get("model_version"),
+            len(rows),
+            wodCluster.MODEL_VERSION,
+        )
+        rows = label_workouts([(wod, weight) for wod, weight, _ in rows])
+    keys = wodCluster._build_cache_keys([wod for wod, _, _ in rows], [weight for _, weight, _ in rows])
+    predictions = {key: label for key, (_, _, label) in zip(keys, rows)}
+    wodCluster.pin_predictions(predictions)
+    if write_redis:
+        # Shares the warm set with processes that have not pinned it yet; entries follow the usual TTL.
+        wodCluster._store_cached_predictions(predictions)
+    return len(predictions)
+
+
+def warm_up_from_env() -> Optional[int]:
+    """Startup hook: load ``WOD_CLUSTER_WARM_CACHE_PATH`` when it is set."""
+
+    if not WARM_CACHE_PATH:
+        return None
+    path = os.path.join(PROJECT_ROOT, WARM_CACHE_PATH)
+    if not os.path.exists(path):
+        logger.warning("Warm cache %s does not exist; starting cold.", path)
+        return None
+    started = time.perf_counter()
+    pinned = load(path)
+    logger.info("Pinned %d warm predictions from %s in %.2fs", pinned, path, time.perf_counter() - started)
+    return pinned
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="Label the distinct workouts of crawler CSVs.")
+    build_parser.add_argument("csv", nargs="+")
+    build_parser.add_argument("-o", "--output", default="models/warm_cache.json")
+    build_parser.add_argument("--batch-size", type=int, default=WARM_CACHE_BATCH_SIZE)
+    load_parser = commands.add_parser("load", help="Write a warm cache file to Redis.")
+    load_parser.add_argument("path")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "build":
+        print(json.dumps(build(args.csv, args.output, args.batch_size), indent=2))
+    else:
+        print(json.dumps({"pinned": load(args.path, write_redis=True)}))
+
+
+if __name__ == "__main__":
+    main()
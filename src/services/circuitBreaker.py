@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Callable, Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Skip a failing dependency for ``reset_timeout`` seconds after ``failure_threshold`` consecutive failures.
+
+    Once the timeout has passed one caller is let through as a trial (half-open);
+    its success closes the circuit and its failure opens it again. A trial that
+    reports neither (cancelled, or failed with an unexpected error) expires after
+    another ``reset_timeout`` and the next caller becomes the trial. Thread-safe,
+    so the executor and event-loop cache paths can share one breaker.
+    """
+
+    def __init__(
+        self, failure_threshold: int = 3, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._trial_started = 0.0
+        self._counts = {"rejected": 0, "opened": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return whether the caller may use the dependency now."""
+
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._trial_running = False
+            if self._state == HALF_OPEN and (
+                not self._trial_running or self._clock() - self._trial_started >= self.reset_timeout
+            ):
+                self._trial_running = True
+                self._trial_started = self._clock()
+                return True
+            self._counts["rejected"] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._counts["opened"] += 1
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._trial_running = False
+
+    def snapshot(self) -> Dict[str, object]:
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures, **self._counts}
@@ -0,0 +1,157 @@
+"""Model feature rows written straight into CSR buffers.
+
+The model's rows are ``[tfidf terms..., scaled weight]``. Building them as
+``scipy.sparse.hstack([tfidf, scaler.transform(weights)])`` allocates the
+TF-IDF CSR, a dense weight column, a COO result and, inside sklearn, the CSR
+it is converted back to. ``build_features`` writes each distinct workout's
+memoized TF-IDF row plus a weight slot into presized CSR buffers (one
+``np.concatenate(..., out=...)`` per array), gathers those rows into the
+batch order when workouts repeat, and scatters the scaled weights into the
+weight slots. TF-IDF values and the scaled weight are the same floats as before,
+and the only layout difference is an explicit zero when a scaled weight is
+exactly 0, which no distance sees.
+
+``WOD_CLUSTER_FEATURE_DTYPE=float32`` builds float32 rows and predicts them
+with ``Float32Neighbors``: a float32 copy of the KNN training matrix, so that
+sklearn does not upcast the query, plus a guard that reports every row whose
+label rounding could change so that it is re-predicted from float64 rows.
+Labels are therefore always the float64 model's; ``benchmarks.feature_builder``
+asserts this on the shipped models.
+"""
+
+import copy
+from typing import Sequence, Tuple
+
+import numpy as np
+import scipy.sparse
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+
+from src.services.metrics import stage_timer
+from src.services.neighborIndex import CLEAR_DISTANCE, NEAR_ZERO_DISTANCE
+from src.services.tfidfMemo import TfidfRowMemo
+
+_ZERO = np.zeros(1)
+# Distances and vote totals closer than this (relative) may order differently
+# in float32 and float64; float32 rounding of unit-scale features is ~1e-7.
+TIE_TOLERANCE = 1e-5
+# Extra neighbours fetched to see whether a tie at the k-th neighbour ends.
+TIE_LOOKAHEAD = 4
+
+
+def scale_weights(scaler, weights: np.ndarray) -> np.ndarray:
+    """``scaler.transform(weights).ravel()``; a fitted ``StandardScaler`` skips sklearn's input checks."""
+
+    if isinstance(scaler, StandardScaler) and scaler.n_features_in_ == 1:
+        scaled = np.asarray(weights, dtype=np.float64).reshape(-1)
+        if scaler.with_mean:
+            scaled = scaled - scaler.mean_[0]
+        if scaler.with_std:
+            scaled = scaled / scaler.scale_[0]
+        return scaled
+    return scaler.transform(np.asarray(weights, dtype=np.float64).reshape(-1, 1)).ravel()
+
+
+def build_features(
+    memo: TfidfRowMemo, scaler, wods: Sequence[str], weights: np.ndarray, dtype=np.float64
+) -> scipy.sparse.csr_matrix:
+    """Equivalent of ``hstack([memo.transform(wods), scaler.transform(weights)]).tocsr()``."""
+
+    with stage_timer("tfidf_transform"):
+        rows, inverse = memo.rows(wods)
+    with stage_timer("scaler_transform"):
+        scaled = scale_weights(scaler, weights)
+
+    with stage_timer("feature_stack"):
+        n_columns = memo.n_features + 1
+        weight_column = np.array([memo.n_features], dtype=np.int32)
+
+        # One block row per distinct workout: its TF-IDF entries plus a weight slot.
+        indptr = np.empty(len(rows) + 1, dtype=np.int32)
+        indptr[0] = 0
+        np.cumsum([len(indices) + 1 for indices, _ in rows], out=indptr[1:])
+        indices = np.empty(int(indptr[-1]), dtype=np.int32)
+        data = np.empty(int(indptr[-1]), dtype=dtype)
+        if rows:
+            np.concatenate([part for row_indices, _ in rows for part in (row_indices, weight_column)], out=indices)
+            np.concatenate([part for _, row_data in rows for part in (row_data, _ZERO)], out=data, casting="same_kind")
+        features = scipy.sparse.csr_matrix((data, indices, indptr), shape=(len(rows), n_columns), copy=False)
+        if len(rows) != len(inverse):
+            # Repeated workouts: scipy gathers the block rows into the final buffers in one C pass.
+            features = features[inverse]
+        features.data[features.indptr[1:] - 1] = scaled
+    return features
+
+
+class Float32Neighbors:
+    """Labels of a sparse KNN model computed from float32 rows, identical to the float64 model's.
+
+    The training matrix is copied to float32 so that sklearn does not upcast
+    the query. Neighbours are fetched in float32, ``TIE_LOOKAHEAD`` beyond
+    ``n_neighbors``, and voted here. ``predict`` also returns the rows whose
+    label float32 rounding could change, which the caller re-predicts from
+    float64 features:
+    - rows tied with the k-th neighbour carry different labels, or the tie
+      reaches past the fetched neighbours;
+    - the nearest row is a near-duplicate whose close neighbours disagree;
+    - the two best vote totals are within ``TIE_TOLERANCE``.
+    Duplicate training rows make ties at the k-th neighbour common; ties
+    inside one label cannot change the vote and are kept.
+    """
+
+    def __init__(self, model: KNeighborsClassifier) -> None:
+        if not self.supports(model):
+            raise ValueError("Float32Neighbors only supports euclidean KNN classifiers on sparse rows.")
+        self.model32 = copy.copy(model)
+        self.model32._fit_X = model._fit_X.tocsr().astype(np.float32)
+        self.weights = model.weights
+        self.n_neighbors = int(model.n_neighbors)
+        self.n_fetch = min(self.n_neighbors + TIE_LOOKAHEAD, model._fit_X.shape[0])
+        self.classes_ = model.classes_
+        self._y = np.asarray(model._y)
+        self.fallback_rows = 0
+
+    @staticmethod
+    def supports(model) -> bool:
+        return (
+            isinstance(model, KNeighborsClassifier)
+            and getattr(model, "effective_metric_", None) == "euclidean"
+            and model.weights in ("uniform", "distance")
+            and not model.outputs_2d_
+            and scipy.sparse.issparse(getattr(model, "_fit_X", None))
+        )
+
+    def predict(self, X: scipy.sparse.csr_matrix) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(labels, uncertain rows)``; labels of uncertain rows are placeholders."""
+
+        X = scipy.sparse.csr_matrix(X, dtype=np.float32)
+        k = self.n_neighbors
+        distances, indices = self.model32.kneighbors(X, self.n_fetch)
+        distances, labels = distances.astype(np.float64), self._y[indices]
+
+        kth = distances[:, k - 1 : k]
+        tied = np.abs(distances - kth) <= TIE_TOLERANCE * np.maximum(kth, 1.0)
+        uncertain = (tied & (labels != labels[:, k - 1 : k])).any(axis=1)
+        if self.n_fetch < self.model32._fit_X.shape[0]:
+            uncertain |= tied[:, -1]
+        distances, labels = distances[:, :k], labels[:, :k]
+
+        if self.weights == "distance":
+            # Near-duplicates of a training row dominate the 1 / d vote; like
+            # SparseNeighborIndex, only trust them when the close rows agree.
+            near = distances[:, 0] <= NEAR_ZERO_DISTANCE
+            close = distances <= CLEAR_DISTANCE
+            uncertain |= near & (close & (labels != labels[:, :1])).any(axis=1)
+            weights = 1.0 / np.maximum(distances, NEAR_ZERO_DISTANCE)
+            weights[near] = close[near]
+        else:
+            weights = np.ones_like(distances)
+        votes = np.zeros((X.shape[0], len(self.classes_)))
+        np.add.at(votes, (np.arange(X.shape[0])[:, None], labels), weights)
+        if votes.shape[1] > 1:
+            second, best = np.partition(votes, -2, axis=1)[:, -2:].T
+            uncertain |= best - second <= TIE_TOLERANCE * np.maximum(best, 1.0)
+
+        rows = np.flatnonzero(uncertain)
+        self.fallback_rows += len(rows)
+        return self.classes_[np.argmax(votes, axis=1)], rows
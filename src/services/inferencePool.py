@@ -0,0 +1,279 @@
+"""Process-pool inference backend for ``/wod/cluster``.
+
+TF-IDF tokenization is pure Python and holds the GIL, so predictions running
+in the default thread executor serialize within one server process. With
+``WOD_CLUSTER_INFERENCE_BACKEND=process``, feature preparation and KNN predict
+run in ``WOD_CLUSTER_INFERENCE_WORKERS`` worker processes instead. Only
+``computeCluster`` (no caching or logging) runs in a worker: the asyncio path
+awaits it with ``run``, and the synchronous and batched paths pass ``compute``
+to ``predictClusterBatch``. Caching, single-flight, prediction logging and
+shadow sampling stay in the server process.
+
+Each worker loads the model once in its initializer and predicts one row so the
+vectorizer and index are warm before the first request. Memory-mappable bundles
+(``src.services.modelArtifacts``) share their arrays between workers through
+the page cache. ``InferencePool`` is a ``concurrent.futures.Executor``; the
+compute batcher of the asyncio path uses it to send whole miss batches to a
+worker. When a worker dies the pool is rebuilt and the tasks it lost are submitted again
+once; a periodic health check restarts a pool that broke, lost a worker, or
+stopped answering while it had no work queued.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, InvalidStateError, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.services import wodCluster
+from src.services.config import env_float, env_int
+from src.services.metrics import register_collector, stage_timer
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKEND = os.getenv("WOD_CLUSTER_INFERENCE_BACKEND", "thread").strip().lower()
+INFERENCE_WORKERS = env_int("WOD_CLUSTER_INFERENCE_WORKERS", os.cpu_count() or 1, minimum=1)
+# "spawn" keeps workers independent of the server's threads (MLflow logger, executor);
+# "fork" or "forkserver" start faster.
+INFERENCE_START_METHOD = os.getenv("WOD_CLUSTER_INFERENCE_START_METHOD", "spawn")
+HEALTH_CHECK_INTERVAL = env_float("WOD_CLUSTER_INFERENCE_HEALTH_INTERVAL", 10.0)
+HEALTH_CHECK_TIMEOUT = env_float("WOD_CLUSTER_INFERENCE_HEALTH_TIMEOUT", 5.0)
+
+
+def _init_worker() -> None:
+    wodCluster.get_model_bundle()
+    wodCluster.computeCluster(["warm up"], [0.0])
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class InferencePool(Executor):
+    """``ProcessPoolExecutor`` with warmed-up workers that is rebuilt when it breaks.
+
+    A task whose worker died (or that was cancelled by a restart) is submitted
+    once more to the new pool before its future fails.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, start_method: str = INFERENCE_START_METHOD) -> None:
+        self.workers = workers
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._warm = False
+        self._lock = threading.Lock()
+        self._closed = False
+        self._pending = 0
+        self.counts = {"tasks": 0, "failures": 0, "restarts": 0}
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is not broken or self._closed:
+                return
+            logger.warning("Restarting inference pool of %d workers.", self.workers)
+            self.counts["restarts"] += 1
+            self._pool = self._new_pool()
+            self._warm = False
+        # Hung workers do not exit on shutdown; terminate whatever is still running.
+        processes = list((getattr(broken, "_processes", None) or {}).values())
+        broken.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _current(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The inference pool has been shut down.")
+            if self._pool is None:
+                self._pool = self._new_pool()
+            return self._pool
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        outer: Future = Future()
+        with self._lock:
+            self.counts["tasks"] += 1
+            self._pending += 1
+        outer.add_done_callback(self._task_done)
+        self._submit(outer, fn, args, kwargs, retries=1)
+        return outer
+
+    def _task_done(self, outer: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, outer: Future, fn: Callable, args: tuple, kwargs: dict, retries: int) -> None:
+        pool = self._current()
+        try:
+            inner = pool.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            self._restart(pool)
+            pool = self._current()
+            inner = pool.submit(fn, *args, **kwargs)
+
+        def done(inner: Future) -> None:
+            if outer.cancelled():
+                return
+            lost = inner.cancelled() or isinstance(inner.exception(), BrokenProcessPool)
+            if lost:
+                self.counts["failures"] += 1
+                self._restart(pool)
+                if retries and not self._closed:
+                    self._submit(outer, fn, args, kwargs, retries - 1)
+                    return
+            try:
+                if inner.cancelled():
+                    # Cancelled by a second restart: fail like a lost worker, not with CancelledError.
+                    outer.set_exception(BrokenProcessPool("The task was cancelled by an inference pool restart."))
+                elif inner.exception() is not None:
+                    outer.set_exception(inner.exception())
+                else:
+                    outer.set_result(inner.result())
+            except InvalidStateError:  # cancelled by the caller meanwhile
+                pass
+
+        inner.add_done_callback(done)
+
+    async def run(self, fn: Callable, *args):
+        """Await ``fn(*args)`` in a worker process."""
+
+        with stage_timer("inference_pool"):
+            return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def compute(self, wods: list, weights) -> list[int]:
+        """Blocking ``computeCluster`` in a worker; the ``compute`` hook of ``predictClusterBatch``."""
+
+        weights = [float(weight) for weight in np.asarray(weights, dtype=float).reshape(-1)]
+        with stage_timer("inference_pool"):
+            return self.submit(wodCluster.computeCluster, list(wods), weights).result()
+
+    def warm_up(self, timeout: float = 120.0) -> list[int]:
+        """Start every worker (loading the model) and return their pids."""
+
+        futures = [self.submit(_ping) for _ in range(self.workers)]
+        pids = sorted({future.result(timeout) for future in futures})
+        self._warm = True
+        return pids
+
+    def _dead_workers(self, pool: ProcessPoolExecutor) -> int:
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        return sum(not process.is_alive() for process in processes)
+
+    def check(self, timeout: float = HEALTH_CHECK_TIMEOUT) -> bool:
+        """Rebuild the pool when it is broken or a worker died; returns whether it was healthy.
+
+        The ping shares the task queue with inference, so under load it waits
+        behind real work: it is only sent, and a late answer only treated as a
+        hung worker, while no task is pending. A pool that was just (re)built is
+        warmed up first, so that model loading is not mistaken for a hang.
+        """
+
+        pool = self._current()
+        try:
+            if not self._warm:
+                self.warm_up()
+                return True
+            if getattr(pool, "_broken", False) or self._dead_workers(pool):
+                raise BrokenProcessPool("An inference worker process died.")
+            if self._pending:
+                return True
+            try:
+                pool.submit(_ping).result(timeout)
+            except TimeoutError:
+                if self._pending:
+                    # Work arrived while the ping was queued; the ping is just late.
+                    return True
+                raise
+        except Exception as exc:  # BrokenProcessPool, TimeoutError
+            logger.warning("Inference pool health check failed: %r", exc)
+            self._restart(pool)
+            return False
+        return True
+
+    def alive_workers(self) -> int:
+        with self._lock:
+            processes = (getattr(self._pool, "_processes", None) or {}) if self._pool is not None else {}
+            return sum(process.is_alive() for process in list(processes.values()))
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            pool, self._pool, self._closed = self._pool, None, True
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+_inference_pool: Optional[InferencePool] = None
+_health_task: Optional[asyncio.Task] = None
+
+
+def process_backend_enabled() -> bool:
+    return INFERENCE_BACKEND == "process"
+
+
+def get_inference_pool() -> Optional[InferencePool]:
+    """The shared pool when the process backend is configured, else ``None`` (default executor)."""
+
+    global _inference_pool
+    if not process_backend_enabled():
+        return None
+    if _inference_pool is None:
+        _inference_pool = InferencePool()
+    return _inference_pool
+
+
+async def _health_loop(pool: InferencePool) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+        await loop.run_in_executor(None, pool.check)
+
+
+async def start_inference_pool() -> None:
+    """Warm up the workers and start the health check; no-op for the thread backend."""
+
+    global _health_task
+    pool = get_inference_pool()
+    if pool is None:
+        return
+    pids = await asyncio.get_running_loop().run_in_executor(None, pool.warm_up)
+    logger.info("Inference pool ready with %d workers (%s).", len(pids), pool.start_method)
+    if HEALTH_CHECK_INTERVAL > 0 and _health_task is None:
+        _health_task = asyncio.get_running_loop().create_task(_health_loop(pool))
+
+
+async def shutdown_inference_pool() -> None:
+    global _inference_pool, _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        _health_task = None
+    if _inference_pool is not None:
+        _inference_pool.shutdown(wait=False, cancel_futures=True)
+        _inference_pool = None
+
+
+def _collect_pool_metrics():
+    if _inference_pool is None:
+        return
+    yield "wodfit_inference_pool", {"state": "workers_alive"}, _inference_pool.alive_workers()
+    for name, value in dict(_inference_pool.counts).items():
+        yield "wodfit_inference_pool", {"state": name}, value
+
+
+register_collector(
+    "wodfit_inference_pool",
+    "gauge",
+    "Inference worker processes alive and pool task, failure and restart counters.",
+    _collect_pool_metrics,
+)
@@ -0,0 +1,157 @@
+"""Periodic RSS and tracemalloc reports of a worker process, for load and soak tests.
+
+With ``WOD_MEMORY_PROFILE_DIR`` set, every worker starts ``tracemalloc`` at
+startup and a daemon thread writes ``<dir>/<pid>.json`` every
+``WOD_MEMORY_PROFILE_INTERVAL`` seconds with the worker's RSS, the memory
+traced by Python and its ``WOD_MEMORY_PROFILE_TOP`` largest allocation sites:
+
+- ``top``: the sites holding the most memory now;
+- ``growth``: the sites that grew the most since the baseline snapshot.
+
+The baseline is taken at the first report and retaken whenever
+``<dir>/baseline`` is touched, so a load test can exclude model loading and
+warm-up from the growth it checks (``benchmarks.load_soak`` does). Tracing
+costs CPU and memory on every allocation; never enable it in production.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+from src.services.config import env_float, env_int
+
+logger = logging.getLogger(__name__)
+
+MEMORY_PROFILE_DIR = os.getenv("WOD_MEMORY_PROFILE_DIR")
+BASELINE_FILE = "baseline"
+
+
+def rss_kb(pid: str = "self") -> int:
+    """``VmRSS`` of a process in KiB; 0 when ``/proc`` is unavailable or the process is gone."""
+
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _site(stat) -> str:
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+class MemoryProfiler:
+    """Write this process's memory report to ``directory`` every ``interval`` seconds."""
+
+    def __init__(self, directory: str, interval: float = 10.0, top: int = 10) -> None:
+        self.directory = directory
+        self.interval = interval
+        self.top = max(top, 1)
+        self.path = os.path.join(directory, f"{os.getpid()}.json")
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._baseline_marker = 0.0
+        self._baseline_time = 0.0
+        self._started = time.time()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._thread = threading.Thread(target=self._run, name="memory-profiler", daemon=True)
+        self._thread.start()
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        # The profiler's own bookkeeping would otherwise show up as growth.
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def _baseline_requested(self) -> bool:
+        try:
+            marker = os.stat(os.path.join(self.directory, BASELINE_FILE)).st_mtime
+        except OSError:
+            return False
+        if marker <= self._baseline_marker:
+            return False
+        self._baseline_marker = marker
+        return True
+
+    def report(self) -> dict:
+        snapshot = self._snapshot()
+        if self._baseline is None or self._baseline_requested():
+            self._baseline, self._baseline_time = snapshot, time.time()
+        traced, peak = tracemalloc.get_traced_memory()
+        top = snapshot.statistics("lineno")[: self.top]
+        growth = [stat for stat in snapshot.compare_to(self._baseline, "lineno") if stat.size_diff > 0][: self.top]
+        return {
+            "pid": os.getpid(),
+            "time": time.time(),
+            "uptime_seconds": time.time() - self._started,
+            "baseline_time": self._baseline_time,
+            "rss_kb": rss_kb(),
+            "traced_kb": traced // 1024,
+            "traced_peak_kb": peak // 1024,
+            "top": [{"site": _site(stat), "size_kb": stat.size / 1024, "count": stat.count} for stat in top],
+            "growth": [
+                {"site": _site(stat), "size_diff_kb": stat.size_diff / 1024, "count_diff": stat.count_diff}
+                for stat in growth
+            ],
+        }
+
+    def write(self) -> None:
+        report = self.report()
+        # Readers poll the file; replace it atomically so they never see a partial report.
+        partial = f"{self.path}.tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(report, f)
+        os.replace(partial, self.path)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.write()
+            except Exception as exc:  # pragma: no cover - profiling must not take the worker down
+                logger.warning("Memory profile report failed: %s", exc)
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        try:
+            self.write()
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Final memory profile report failed: %s", exc)
+        tracemalloc.stop()
+
+
+_profiler: Optional[MemoryProfiler] = None
+
+
+def start_memory_profiler() -> Optional[MemoryProfiler]:
+    """Startup hook: start profiling when ``WOD_MEMORY_PROFILE_DIR`` is set."""
+
+    global _profiler
+    if not MEMORY_PROFILE_DIR or _profiler is not None:
+        return _profiler
+    _profiler = MemoryProfiler(
+        MEMORY_PROFILE_DIR,
+        interval=env_float("WOD_MEMORY_PROFILE_INTERVAL", 10.0, minimum=0.1),
+        top=env_int("WOD_MEMORY_PROFILE_TOP", 10, minimum=1),
+    )
+    _profiler.start()
+    logger.warning("tracemalloc memory profiling is on; reports go to %s", _profiler.path)
+    return _profiler
+
+
+def shutdown_memory_profiler() -> None:
+    if _profiler is not None:
+        _profiler.shutdown()
@@ -0,0 +1,215 @@
+"""In-process Prometheus metrics without a client-library dependency.
+
+``stage_timer("tfidf_transform")`` records into the ``wodfit_stage_seconds``
+histogram. With ``WOD_CLUSTER_METRICS=0`` every helper returns immediately
+(``stage_timer`` hands back a shared no-op context manager), so instrumented
+code pays one attribute lookup and one function call.
+
+Values owned by other components (cache tier counters, MLflow logger queue,
+executor backlog) are read at scrape time through ``register_collector``
+instead of being counted twice.
+"""
+
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.services.config import env_bool
+
+METRICS_ENABLED = env_bool("WOD_CLUSTER_METRICS", True)
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+Labels = Tuple[Tuple[str, str], ...]
+# (metric name, labels, value) triples produced by collectors at scrape time.
+Sample = Tuple[str, Dict[str, object], float]
+
+
+def _format_labels(labels: Iterable[Tuple[str, object]]) -> str:
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(counts)) for key, counts in self._values.items())
+        for key, counts in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = key + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(labels)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(cumulative)}")
+        return lines
+
+
+stage_seconds = Histogram("wodfit_stage_seconds", "Time spent in each inference stage.", LATENCY_BUCKETS)
+batch_rows = Histogram("wodfit_batch_rows", "Rows per prediction batch.", SIZE_BUCKETS)
+http_request_seconds = Histogram("wodfit_http_request_seconds", "HTTP request latency.", LATENCY_BUCKETS)
+http_requests_total = Counter("wodfit_http_requests_total", "HTTP requests by path and status.")
+model_seconds = Histogram("wodfit_model_seconds", "Feature building and prediction time per model version.", LATENCY_BUCKETS)
+
+_metrics = [stage_seconds, batch_rows, http_request_seconds, http_requests_total, model_seconds]
+# name -> (type, documentation, collector)
+_collectors: Dict[str, Tuple[str, str, Callable[[], Iterable[Sample]]]] = {}
+
+
+def register_collector(name: str, metric_type: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> None:
+    """Add a metric family whose samples are produced by ``collect()`` at scrape time."""
+
+    _collectors[name] = (metric_type, documentation, collect)
+
+
+class _StageTimer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+
+    def __enter__(self) -> "_StageTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        stage_seconds.observe(time.perf_counter() - self.started, stage=self.stage)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def stage_timer(stage: str):
+    if not METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _StageTimer(stage)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        stage_seconds.observe(seconds, stage=stage)
+
+
+def observe_batch(rows: int) -> None:
+    if METRICS_ENABLED:
+        batch_rows.observe(rows)
+
+
+def observe_model(version: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        model_seconds.observe(seconds, version=version)
+
+
+def render_metrics() -> str:
+    if not METRICS_ENABLED:
+        return "# wodfit metrics are disabled (WOD_CLUSTER_METRICS=0)\n"
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for name, (metric_type, documentation, collect) in sorted(_collectors.items()):
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for sample_name, labels, value in collect():
+            lines.append(f"{sample_name}{_format_labels(sorted(labels.items()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per route path.
+
+    The start time is stored in the scope so that handlers can report how long
+    request parsing and validation took before they were called.
+    """
+
+    SCOPE_KEY = "wodfit.request_started"
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        started = scope[self.SCOPE_KEY] = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot blow up cardinality.
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_seconds.observe(time.perf_counter() - started, path=path)
+            http_requests_total.inc(path=path, status=str(status["code"]))
+
+
+def observe_since_request_start(scope, stage: str) -> None:
+    started: Optional[float] = scope.get(MetricsMiddleware.SCOPE_KEY)
+    if started is not None:
+        observe_stage(stage, time.perf_counter() - started)
@@ -0,0 +1,182 @@
+import asyncio
+import functools
+import logging
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Tuple
+
+from src.services.config import env_bool, env_int
+from src.services.inferencePool import get_inference_pool
+from src.services.metrics import observe_stage, register_collector
+from src.services.wodCluster import _validate_inputs, computeClusterBatch, predictClusterBatch
+
+logger = logging.getLogger(__name__)
+
+BATCHING_ENABLED = env_bool("WOD_CLUSTER_BATCHING", False)
+BATCH_MAX_WAIT_MS = env_int("WOD_CLUSTER_BATCH_MAX_WAIT_MS", 5)
+BATCH_MAX_ROWS = env_int("WOD_CLUSTER_BATCH_MAX_ROWS", 512, minimum=1)
+BATCH_MAX_CONCURRENCY = env_int("WOD_CLUSTER_BATCH_MAX_CONCURRENCY", 2, minimum=1)
+
+BatchPredictFn = Callable[[Sequence[Tuple[list, list]]], list]
+
+
+@dataclass
+class _PendingRequest:
+    wods: list
+    weights: list
+    future: asyncio.Future
+    queued_at: float = 0.0
+
+
+class MicroBatcher:
+    """Coalesce concurrent ``/wod/cluster`` requests into shared predict calls.
+
+    Requests are collected until ``max_wait_ms`` elapses after the first one or
+    ``max_batch_rows`` rows are waiting, then the whole batch is sent to
+    ``predict_batch`` in the executor and each caller receives its own slice.
+    At most ``max_concurrency`` batches run at the same time.
+    """
+
+    def __init__(
+        self,
+        predict_batch: BatchPredictFn = predictClusterBatch,
+        max_wait_ms: int = BATCH_MAX_WAIT_MS,
+        max_batch_rows: int = BATCH_MAX_ROWS,
+        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+        executor=None,
+        validate: bool = True,
+    ) -> None:
+        self.predict_batch = predict_batch
+        self.validate = validate
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self.executor = executor
+        self._queue: "asyncio.Queue[_PendingRequest]" = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Batcher stopped before the request was processed."))
+
+    async def submit(self, wods: list, weights: list) -> list:
+        # Validate up front so that one malformed request cannot fail the batch it lands in.
+        if self.validate:
+            _validate_inputs(wods, weights)
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_PendingRequest(wods, weights, future, asyncio.get_running_loop().time()))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            batch = [first]
+            rows = len(first.wods)
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(pending)
+                rows += len(pending.wods)
+
+            await self._slots.acquire()
+            now = loop.time()
+            for pending in batch:
+                observe_stage("batch_wait", now - pending.queued_at)
+            task = loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list) -> None:
+        try:
+            batch = [pending for pending in batch if not pending.future.done()]
+            if not batch:
+                return
+            loop = asyncio.get_running_loop()
+            requests = [(pending.wods, pending.weights) for pending in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.predict_batch, requests)
+            except Exception as exc:
+                logger.warning("Batched prediction failed for %d requests: %s", len(batch), exc)
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(exc)
+                return
+            for pending, result in zip(batch, results):
+                if not pending.future.done():
+                    pending.future.set_result(result)
+        finally:
+            self._slots.release()
+
+
+_batcher: Optional[MicroBatcher] = None
+
+
+# Batches only the cache misses of predictClusterAsync, which does the caching itself.
+_compute_batcher: Optional[MicroBatcher] = None
+
+
+def get_batcher() -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        pool = get_inference_pool()
+        # Batches are cached and logged here; only their misses go to a worker process.
+        compute = pool.compute if pool is not None else None
+        _batcher = MicroBatcher(predict_batch=functools.partial(predictClusterBatch, compute=compute))
+    return _batcher
+
+
+def get_compute_batcher() -> MicroBatcher:
+    global _compute_batcher
+    if _compute_batcher is None:
+        _compute_batcher = MicroBatcher(
+            predict_batch=computeClusterBatch, executor=get_inference_pool(), validate=False
+        )
+    return _compute_batcher
+
+
+async def shutdown_batcher() -> None:
+    global _batcher, _compute_batcher
+    for batcher in (_batcher, _compute_batcher):
+        if batcher is not None:
+            await batcher.stop()
+    _batcher = _compute_batcher = None
+
+
+def _collect_batcher_metrics():
+    for batcher in (_batcher, _compute_batcher):
+        if batcher is None:
+            continue
+        kind = "predict" if batcher is _batcher else "compute"
+        yield "wodfit_batcher_queue_depth", {"batcher": kind, "state": "queued"}, batcher._queue.qsize()
+        yield "wodfit_batcher_queue_depth", {"batcher": kind, "state": "dispatching"}, len(batcher._inflight)
+
+
+register_collector(
+    "wodfit_batcher_queue_depth",
+    "gauge",
+    "Requests waiting in the micro-batcher and batches in flight.",
+    _collect_batcher_metrics,
+)
@@ -0,0 +1,284 @@
+"""Load WOD cluster model artifacts and convert them to a memory-mappable bundle.
+
+Three artifact layouts are supported:
+
+* ``models/0.214/model_vectorizer_scaler.dump`` - one pickle holding a
+  ``{"model", "vectorizer", "scaler"}`` dict.
+* ``models/0.191/`` - a directory with ``wod_cluster.pkl``,
+  ``wod_cluster_vectorizer.pkl`` and ``wod_cluster_weight_scaler.pkl``.
+* A bundle directory written by ``export_bundle``: every array is a raw
+  ``.npy`` file opened with ``np.load(mmap_mode="r")`` so that uvicorn workers
+  share the page cache instead of each holding an unpickled copy, plus a
+  ``manifest.json`` describing the estimators.
+
+Usage::
+
+    python -m src.services.modelArtifacts export models/0.214/model_vectorizer_scaler.dump models/0.214/bundle
+    python -m src.services.modelArtifacts verify models/0.214/model_vectorizer_scaler.dump models/0.214/bundle
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import scipy.sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+
+MANIFEST_NAME = "manifest.json"
+BUNDLE_FORMAT_VERSION = 1
+
+LEGACY_MODEL_FILES = {
+    "model": "wod_cluster.pkl",
+    "vectorizer": "wod_cluster_vectorizer.pkl",
+    "scaler": "wod_cluster_weight_scaler.pkl",
+}
+
+_KNN_PARAMS = ("n_neighbors", "weights", "algorithm", "leaf_size", "metric", "p", "metric_params", "n_jobs")
+_VECTORIZER_PARAMS = (
+    "input",
+    "encoding",
+    "decode_error",
+    "strip_accents",
+    "lowercase",
+    "token_pattern",
+    "stop_words",
+    "ngram_range",
+    "max_df",
+    "min_df",
+    "max_features",
+    "binary",
+    "norm",
+    "use_idf",
+    "smooth_idf",
+    "sublinear_tf",
+    "analyzer",
+)
+
+
+@dataclass
+class ModelBundle:
+    model: KNeighborsClassifier
+    vectorizer: TfidfVectorizer
+    scaler: StandardScaler
+    path: str
+    version: str
+
+
+def _is_bundle_dir(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def model_version(path: str) -> str:
+    """Return the model version for ``path`` without loading the estimators."""
+
+    if os.path.isdir(path) and _is_bundle_dir(path):
+        with open(os.path.join(path, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)["version"]
+    directory = path if os.path.isdir(path) else os.path.dirname(path)
+    return os.path.basename(os.path.normpath(directory))
+
+
+def _load_pickle(path: str):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def load_model_bundle(path: str) -> ModelBundle:
+    if os.path.isdir(path):
+        if _is_bundle_dir(path):
+            return load_bundle(path)
+        parts = {name: _load_pickle(os.path.join(path, filename)) for name, filename in LEGACY_MODEL_FILES.items()}
+    else:
+        parts = _load_pickle(path)
+    return ModelBundle(
+        model=parts["model"],
+        vectorizer=parts["vectorizer"],
+        scaler=parts["scaler"],
+        path=path,
+        version=model_version(path),
+    )
+
+
+def _save_array(output_dir: str, name: str, array: np.ndarray) -> dict:
+    array = np.ascontiguousarray(array)
+    filename = f"{name}.npy"
+    np.save(os.path.join(output_dir, filename), array, allow_pickle=False)
+    with open(os.path.join(output_dir, filename), "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"file": filename, "dtype": array.dtype.str, "shape": list(array.shape), "sha256": digest}
+
+
+def export_bundle(bundle: ModelBundle, output_dir: str) -> dict:
+    model, vectorizer, scaler = bundle.model, bundle.vectorizer, bundle.scaler
+    if getattr(model, "_fit_method", None) != "brute" or not scipy.sparse.issparse(model._fit_X):
+        raise ValueError("Only brute-force KNN models fitted on sparse matrices can be exported.")
+    if model.outputs_2d_:
+        raise ValueError("Multi-output KNN models are not supported.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    fit_X = model._fit_X.tocsr()
+    terms = [""] * len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+    with open(os.path.join(output_dir, "vocabulary.json"), "w", encoding="utf-8") as f:
+        json.dump(terms, f, ensure_ascii=False)
+
+    vectorizer_params = {name: getattr(vectorizer, name) for name in _VECTORIZER_PARAMS}
+    vectorizer_params["ngram_range"] = list(vectorizer_params["ngram_range"])
+    if not isinstance(vectorizer_params["stop_words"], (str, type(None))):
+        vectorizer_params["stop_words"] = sorted(vectorizer_params["stop_words"])
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "version": bundle.version,
+        "source": os.path.relpath(bundle.path, output_dir),
+        "model": {
+            "class": model.__class__.__name__,
+            "params": {name: getattr(model, name) for name in _KNN_PARAMS},
+            "n_features_in": int(model.n_features_in_),
+            "fit_shape": list(fit_X.shape),
+            "fit_sorted_indices": bool(fit_X.has_sorted_indices),
+        },
+        "vectorizer": {
+            "params": vectorizer_params,
+            "dtype": np.dtype(vectorizer.dtype).name,
+            "vocabulary": "vocabulary.json",
+        },
+        "scaler": {
+            "with_mean": scaler.with_mean,
+            "with_std": scaler.with_std,
+            "n_samples_seen": int(np.asarray(scaler.n_samples_seen_).item()),
+        },
+        "arrays": {
+            "fit_data": _save_array(output_dir, "fit_data", fit_X.data),
+            "fit_indices": _save_array(output_dir, "fit_indices", fit_X.indices),
+            "fit_indptr": _save_array(output_dir, "fit_indptr", fit_X.indptr),
+            "fit_y": _save_array(output_dir, "fit_y", model._y),
+            "classes": _save_array(output_dir, "classes", model.classes_),
+            "idf": _save_array(output_dir, "idf", vectorizer.idf_),
+            "scaler_mean": _save_array(output_dir, "scaler_mean", scaler.mean_),
+            "scaler_var": _save_array(output_dir, "scaler_var", scaler.var_),
+            "scaler_scale": _save_array(output_dir, "scaler_scale", scaler.scale_),
+        },
+    }
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _load_array(bundle_dir: str, spec: dict) -> np.ndarray:
+    array = np.load(os.path.join(bundle_dir, spec["file"]), mmap_mode="r", allow_pickle=False)
+    if array.dtype.str != spec["dtype"] or list(array.shape) != spec["shape"]:
+        raise ValueError(f"Bundle array {spec['file']} does not match the manifest.")
+    return array
+
+
+def load_bundle(bundle_dir: str) -> ModelBundle:
+    with open(os.path.join(bundle_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model bundle format: {manifest.get('format_version')}")
+    arrays = {name: _load_array(bundle_dir, spec) for name, spec in manifest["arrays"].items()}
+
+    model_spec = manifest["model"]
+    fit_X = scipy.sparse.csr_matrix(
+        (arrays["fit_data"], arrays["fit_indices"], arrays["fit_indptr"]),
+        shape=tuple(model_spec["fit_shape"]),
+        copy=False,
+    )
+    fit_X.has_sorted_indices = model_spec["fit_sorted_indices"]
+    classes = np.asarray(arrays["classes"])
+    fit_y = arrays["fit_y"]
+    # fit() validates its input into a private copy, which would defeat the
+    # shared mapping. Fit on one row per class to set up the estimator, then
+    # attach the mapped training matrix and labels.
+    _, first_rows = np.unique(fit_y, return_index=True)
+    model = KNeighborsClassifier(**model_spec["params"])
+    model.fit(fit_X[np.sort(first_rows)], classes[fit_y[np.sort(first_rows)]])
+    if model._fit_method != "brute" or not np.array_equal(model.classes_, classes):
+        raise ValueError("Bundle model could not be restored with brute-force search.")
+    model._fit_X = fit_X
+    model._y = fit_y
+    model.n_samples_fit_ = fit_X.shape[0]
+
+    vectorizer_spec = manifest["vectorizer"]
+    with open(os.path.join(bundle_dir, vectorizer_spec["vocabulary"]), "r", encoding="utf-8") as f:
+        terms = json.load(f)
+    params = dict(vectorizer_spec["params"])
+    params["ngram_range"] = tuple(params["ngram_range"])
+    if isinstance(params["stop_words"], list):
+        params["stop_words"] = frozenset(params["stop_words"])
+    vectorizer = TfidfVectorizer(dtype=np.dtype(vectorizer_spec["dtype"]).type, **params)
+    vectorizer.vocabulary_ = {term: index for index, term in enumerate(terms)}
+    vectorizer.fixed_vocabulary_ = False
+    vectorizer.idf_ = arrays["idf"]
+
+    scaler_spec = manifest["scaler"]
+    scaler = StandardScaler(with_mean=scaler_spec["with_mean"], with_std=scaler_spec["with_std"])
+    scaler.mean_ = np.asarray(arrays["scaler_mean"])
+    scaler.var_ = np.asarray(arrays["scaler_var"])
+    scaler.scale_ = np.asarray(arrays["scaler_scale"])
+    scaler.n_samples_seen_ = np.int64(scaler_spec["n_samples_seen"])
+    scaler.n_features_in_ = scaler.mean_.shape[0]
+
+    return ModelBundle(model=model, vectorizer=vectorizer, scaler=scaler, path=bundle_dir, version=manifest["version"])
+
+
+def _check(condition, message: str) -> None:
+    if not condition:
+        raise AssertionError(f"Exported bundle does not match its source: {message}")
+
+
+def verify_bundle(source: ModelBundle, exported: ModelBundle, sample_texts: Optional[list] = None) -> None:
+    """Raise ``AssertionError`` unless ``exported`` reproduces ``source`` exactly.
+
+    The checks raise explicitly rather than with ``assert``, so they also run under ``python -O``.
+    """
+
+    src_X, dst_X = source.model._fit_X.tocsr(), exported.model._fit_X
+    _check(src_X.shape == dst_X.shape, "training matrix shape differs")
+    _check((src_X != dst_X).nnz == 0, "training matrix values differ")
+    _check(np.array_equal(source.model.classes_, exported.model.classes_), "classes differ")
+    _check(np.array_equal(source.model._y, exported.model._y), "training labels differ")
+    _check(source.vectorizer.vocabulary_ == exported.vectorizer.vocabulary_, "vocabulary differs")
+    _check(np.array_equal(source.vectorizer.idf_, exported.vectorizer.idf_), "idf differs")
+    for attr in ("mean_", "var_", "scale_"):
+        _check(np.array_equal(getattr(source.scaler, attr), getattr(exported.scaler, attr)), f"scaler {attr} differs")
+
+    texts = sample_texts or list(source.vectorizer.vocabulary_)
+    src_tfidf = source.vectorizer.transform(texts)
+    dst_tfidf = exported.vectorizer.transform(texts)
+    _check((src_tfidf != dst_tfidf).nnz == 0, "TF-IDF output differs")
+    _check(np.array_equal(source.model.predict(src_X), exported.model.predict(src_X)), "predictions differ")
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Convert WOD cluster model artifacts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write a memory-mappable bundle.")
+    export_parser.add_argument("source", help="Pickle dump or legacy model directory.")
+    export_parser.add_argument("output", help="Bundle directory to create.")
+    verify_parser = subparsers.add_parser("verify", help="Check that a bundle matches its source.")
+    verify_parser.add_argument("source")
+    verify_parser.add_argument("bundle")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        source = load_model_bundle(args.source)
+        manifest = export_bundle(source, args.output)
+        verify_bundle(source, load_bundle(args.output))
+        print(f"Exported model {manifest['version']} to {args.output}")
+    else:
+        verify_bundle(load_model_bundle(args.source), load_bundle(args.bundle))
+        print(f"{args.bundle} matches {args.source}")
+
+
+if __name__ == "__main__":
+    main()
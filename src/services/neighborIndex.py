@@ -0,0 +1,309 @@
+"""Exact nearest-neighbour search over TF-IDF + scaled-weight feature rows.
+
+Every model row is ``[tfidf terms..., scaled weight]``. For a query ``q`` and a
+training row ``x`` the squared euclidean distance splits into
+
+    |q_t|^2 + |x_t|^2 - 2 q_t . x_t + (q_w - x_w)^2
+
+The dot product is only non-zero for rows sharing at least one term with the
+query, so those candidates come from an inverted index (the transposed TF-IDF
+matrix). Only the postings of the query's high-impact terms are read; the
+contribution of the remaining terms is bounded by their summed maximum impact
+and by Cauchy-Schwarz on the unread part of each row (MaxScore-style pruning).
+For every other row the distance depends on the weight gap alone, so rows are
+scanned outwards from the query weight in weight order until the remaining
+rows provably cannot beat the current k-th neighbour.
+
+Rows whose result is not certain to match sklearn's brute-force search - ties
+at the k-th neighbour or a near tie in the distance-weighted vote - are
+answered by the wrapped ``KNeighborsClassifier`` itself, so labels are always
+identical to ``model.predict``.
+"""
+
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+import scipy.sparse
+from sklearn.neighbors import KNeighborsClassifier
+
+# Relative tolerance used to decide that two distances or two vote totals are
+# too close for the index and sklearn to be guaranteed to agree.
+TIE_TOLERANCE = 1e-9
+# Distances at or below NEAR_ZERO_DISTANCE are treated as duplicates of a
+# training row; every neighbour within CLEAR_DISTANCE must then agree on the
+# label (1 / CLEAR_DISTANCE * n_neighbors stays far below 1 / NEAR_ZERO_DISTANCE).
+NEAR_ZERO_DISTANCE = 1e-6
+CLEAR_DISTANCE = 1e-3
+
+
+class SparseNeighborIndex:
+    def __init__(self, model: KNeighborsClassifier, initial_window: Optional[int] = None) -> None:
+        if not self.supports(model):
+            raise ValueError("SparseNeighborIndex only supports euclidean brute-force KNN on sparse rows.")
+        self.model = model
+        self.n_neighbors = int(model.n_neighbors)
+        self.weights = model.weights
+        self.classes_ = model.classes_
+        self._y = np.asarray(model._y)
+
+        fit_X = model._fit_X.tocsr()
+        self.n_samples, n_features = fit_X.shape
+        self.n_terms = n_features - 1
+        self._terms = fit_X[:, : self.n_terms].tocsr()
+        self._postings = self._terms.T.tocsr()
+        self._term_df = np.diff(self._postings.indptr)
+        self._term_max = np.asarray(abs(self._postings).max(axis=1).todense()).ravel()
+        self._term_norms = np.asarray(self._terms.multiply(self._terms).sum(axis=1)).ravel()
+        self._row_weights = fit_X[:, self.n_terms].toarray().ravel()
+        # Rows without any term (norm 0) and rows with terms are kept in
+        # separate weight-ordered lists so that each gets a tight distance bound.
+        self._groups = []
+        for mask in (self._term_norms == 0, self._term_norms > 0):
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                order = rows[np.argsort(self._row_weights[rows], kind="stable")]
+                self._groups.append((self._row_weights[order], order, float(self._term_norms[rows].min())))
+        positive_norms = self._term_norms[self._term_norms > 0]
+        self._min_positive_term_norm = float(positive_norms.min()) if len(positive_norms) else 0.0
+        self._max_term_norm = float(positive_norms.max()) if len(positive_norms) else 0.0
+        self.initial_window = initial_window or max(4 * self.n_neighbors, 32)
+        self._local = threading.local()
+        self.fallback_rows = 0
+
+    @staticmethod
+    def supports(model: KNeighborsClassifier) -> bool:
+        return (
+            isinstance(model, KNeighborsClassifier)
+            and getattr(model, "_fit_method", None) == "brute"
+            and getattr(model, "effective_metric_", None) == "euclidean"
+            and model.weights in ("uniform", "distance")
+            and not model.outputs_2d_
+            and scipy.sparse.issparse(model._fit_X)
+        )
+
+    def _split(self, X) -> Tuple[scipy.sparse.csr_matrix, np.ndarray, np.ndarray]:
+        X = scipy.sparse.csr_matrix(X)
+        query_terms = X[:, : self.n_terms].tocsr()
+        query_weights = X[:, self.n_terms].toarray().ravel()
+        query_norms = np.asarray(query_terms.multiply(query_terms).sum(axis=1)).ravel()
+        return query_terms, query_weights, query_norms
+
+    def _prefix_bounds(self, prefix: np.ndarray, prefix_norm: np.ndarray) -> np.ndarray:
+        """Lower bound of ``|x_t|^2 - 2 q_t . x_t`` for rows matching only a term prefix.
+
+        The dot product is at most ``prefix`` (summed impacts) and at most
+        ``prefix_norm * |x_t|`` (Cauchy-Schwarz), with ``|x_t|^2`` anywhere in
+        the observed range of row norms.
+        """
+
+        low, high = self._min_positive_term_norm, self._max_term_norm
+        by_impact = low - 2.0 * prefix
+        root = np.clip(prefix_norm, np.sqrt(low), np.sqrt(high))
+        by_norm = root**2 - 2.0 * prefix_norm * root
+        return np.maximum(by_impact, by_norm)
+
+    def _row_dots(self, rows: np.ndarray, dense_query: np.ndarray) -> np.ndarray:
+        # Gather the CSR segments of ``rows`` directly; scipy's fancy row
+        # indexing costs more than the dot products for small candidate sets.
+        indptr = self._terms.indptr
+        starts = indptr[rows]
+        lengths = indptr[rows + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(len(rows))
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        positions = np.arange(total) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        products = self._terms.data[positions] * dense_query[self._terms.indices[positions]]
+        return np.bincount(owner, weights=products, minlength=len(rows))
+
+    def _scratch_mask(self) -> np.ndarray:
+        # One reusable "already scored" mask per thread; callers reset the
+        # entries they set, so no per-query O(n) allocation is needed.
+        mask = getattr(self._local, "mask", None)
+        if mask is None:
+            mask = self._local.mask = np.zeros(self.n_samples, dtype=bool)
+        return mask
+
+    def _search_row(self, query_terms, query_values, query_weight, query_norm, k):
+        """Return candidate rows and squared distances for one query, nearest first.
+
+        The result holds the k nearest rows plus every row tied with the k-th
+        one, so that the caller can tell whether the tie changes the vote.
+        """
+
+        # Order query terms so that frequent, low-impact terms come first.
+        # Postings are only read for the "essential" suffix; rows matching
+        # nothing but the prefix are bounded instead of scanned.
+        impact = query_values * self._term_max[query_terms]
+        order = np.argsort(impact / np.sqrt(np.maximum(self._term_df[query_terms], 1)), kind="stable")
+        query_terms, query_values, impact = query_terms[order], query_values[order], impact[order]
+        prefix = np.concatenate([[0.0], np.cumsum(impact)])
+        prefix_norm = np.sqrt(np.concatenate([[0.0], np.cumsum(query_values**2)]))
+        bounds = query_norm + self._prefix_bounds(prefix, prefix_norm)
+        dense_query = np.zeros(self.n_terms)
+        dense_query[query_terms] = query_values
+
+        postings = self._postings
+        essential = max(len(query_terms) - 1, 0)
+        windows = [self.initial_window] * len(self._groups)
+        centers = [int(np.searchsorted(sorted_weights, query_weight)) for sorted_weights, _, _ in self._groups]
+        scored = self._scratch_mask()
+        scored_rows, scored_d2 = [], []
+
+        def score(rows):
+            rows = rows[~scored[rows]]
+            if len(rows):
+                scored[rows] = True
+                d2 = query_norm + self._term_norms[rows] - 2.0 * self._row_dots(rows, dense_query)
+                d2 += (query_weight - self._row_weights[rows]) ** 2
+                scored_rows.append(rows)
+                scored_d2.append(d2)
+
+        try:
+            while True:
+                spans = []
+                for (sorted_weights, order, _), center, window in zip(self._groups, centers, windows):
+                    lo, hi = max(center - window, 0), min(center + window, len(order))
+                    spans.append((lo, hi))
+                    score(order[lo:hi])
+                covered = all(lo == 0 and hi == len(order) for (lo, hi), (_, order, _) in zip(spans, self._groups))
+
+                # Bound every row reachable from the essential postings: its exact
+                # essential dot product plus the most the prefix terms can add,
+                # limited by summed impacts and by Cauchy-Schwarz on the unread part.
+                starts = postings.indptr[query_terms[essential:]]
+                lengths = postings.indptr[query_terms[essential:] + 1] - starts
+                positions = np.arange(lengths.sum()) + np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                candidates, owner = np.unique(postings.indices[positions], return_inverse=True)
+                values = postings.data[positions]
+                partial = np.bincount(owner, weights=values * np.repeat(query_values[essential:], lengths))
+                unread = np.maximum(self._term_norms[candidates] - np.bincount(owner, weights=values**2), 0.0)
+                rest = np.minimum(prefix[essential], prefix_norm[essential] * np.sqrt(unread))
+                lower = query_norm + self._term_norms[candidates] - 2.0 * (partial + rest)
+                lower += (query_weight - self._row_weights[candidates]) ** 2
+                if len(candidates):
+                    seeds = min(k, len(candidates))
+                    score(candidates[np.argpartition(lower, seeds - 1)[:seeds]])
+
+                all_d2 = np.concatenate(scored_d2) if scored_d2 else np.empty(0)
+                if len(all_d2) < k:
+                    if covered:
+                        break
+                    windows = [window * 2 for window in windows]
+                    continue
+                kth = np.partition(all_d2, k - 1)[k - 1]
+                threshold = kth + 2 * TIE_TOLERANCE * max(kth, 1.0)
+                score(candidates[lower <= threshold])
+                if covered:
+                    break
+
+                expanded = False
+                term_gap2 = np.inf
+                for g, ((sorted_weights, order, min_norm), (lo, hi)) in enumerate(zip(self._groups, spans)):
+                    gaps = [np.inf]
+                    if lo > 0:
+                        gaps.append(query_weight - sorted_weights[lo - 1])
+                    if hi < len(order):
+                        gaps.append(sorted_weights[hi] - query_weight)
+                    gap2 = min(gaps) ** 2
+                    if min_norm > 0:
+                        term_gap2 = min(term_gap2, gap2)
+                    if query_norm + min_norm + gap2 <= threshold:
+                        windows[g] *= 2
+                        expanded = True
+                if expanded:
+                    continue
+                # Longest prefix whose matching rows outside the windows are
+                # still provably farther than the k-th neighbour.
+                required = int(np.flatnonzero(bounds + term_gap2 > threshold).max(initial=-1))
+                if required >= essential:
+                    break
+                essential = max(required, 0)
+        finally:
+            rows = np.concatenate(scored_rows) if scored_rows else np.empty(0, dtype=np.intp)
+            scored[rows] = False
+
+        d2 = np.maximum(np.concatenate(scored_d2), 0.0)
+        kth = np.partition(d2, k - 1)[k - 1]
+        keep = np.flatnonzero(d2 <= kth + TIE_TOLERANCE * max(kth, 1.0))
+        keep = keep[np.argsort(d2[keep], kind="stable")]
+        return rows[keep], d2[keep]
+
+    def kneighbors(self, X, n_neighbors: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(distances, indices)`` of the nearest training rows, nearest first.
+
+        Rows tied at the k-th distance are broken by position, which may differ
+        from the order sklearn's brute-force search would pick.
+        """
+
+        k = n_neighbors or self.n_neighbors
+        distances, indices = [], []
+        for rows, d2 in self._search(X, k):
+            indices.append(rows[:k])
+            distances.append(np.sqrt(d2[:k]))
+        return np.array(distances).reshape(-1, k), np.array(indices, dtype=np.intp).reshape(-1, k)
+
+    def _search(self, X, k: int):
+        if k > self.n_samples:
+            raise ValueError("n_neighbors cannot exceed the number of training rows.")
+        query_terms, query_weights, query_norms = self._split(X)
+        for i in range(query_terms.shape[0]):
+            start, end = query_terms.indptr[i], query_terms.indptr[i + 1]
+            yield self._search_row(
+                query_terms.indices[start:end], query_terms.data[start:end], query_weights[i], query_norms[i], k
+            )
+
+    def _vote_row(self, rows: np.ndarray, d2: np.ndarray, k: int) -> Optional[int]:
+        """Return the winning class index, or ``None`` if sklearn could disagree."""
+
+        labels = self._y[rows]
+        distances = np.sqrt(d2)
+        n_classes = len(self.classes_)
+
+        if self.weights == "distance" and distances[0] <= NEAR_ZERO_DISTANCE:
+            # sklearn turns exactly-zero distances into a mask vote, but the same
+            # duplicate row can come out as 0 or ~1e-8 depending on rounding. Any
+            # neighbour that close dominates the 1/d vote either way, so only
+            # trust the row when every near neighbour carries the same label.
+            near_labels = labels[distances <= CLEAR_DISTANCE]
+            return int(near_labels[0]) if (near_labels == near_labels[0]).all() else None
+
+        kth = d2[k - 1]
+        strict = d2 < kth - TIE_TOLERANCE * max(kth, 1.0)
+        if self.weights == "distance":
+            weights = 1.0 / distances
+        else:
+            weights = np.ones_like(distances)
+        base = np.bincount(labels[strict], weights=weights[strict], minlength=n_classes)
+
+        # The remaining slots are filled from the tie group in an order we cannot
+        # reproduce, so bound every class total over all possible selections.
+        slots = k - int(strict.sum())
+        tied_labels = labels[~strict]
+        tied_weight = weights[~strict].max() if slots else 0.0
+        tied_counts = np.bincount(tied_labels, minlength=n_classes)
+        upper = base + np.minimum(slots, tied_counts) * tied_weight
+        lower = base + np.maximum(0, slots - (len(tied_labels) - tied_counts)) * weights[~strict].min(initial=0.0)
+
+        winner = int(np.argmax(lower))
+        rivals = np.delete(upper, winner)
+        if rivals.size and lower[winner] - rivals.max() <= TIE_TOLERANCE * max(upper.max(), 1.0):
+            return None
+        return winner
+
+    def predict(self, X) -> np.ndarray:
+        X = scipy.sparse.csr_matrix(X)
+        winners = []
+        uncertain = []
+        for i, (rows, d2) in enumerate(self._search(X, self.n_neighbors)):
+            winner = self._vote_row(rows, d2, self.n_neighbors)
+            if winner is None:
+                uncertain.append(i)
+                winner = 0
+            winners.append(winner)
+        predictions = self.classes_[np.asarray(winners, dtype=np.intp)]
+        if uncertain:
+            self.fallback_rows += len(uncertain)
+            predictions[uncertain] = self.model.predict(X[uncertain])
+        return predictions
@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional
+
+
+class LocalPredictionCache:
+    """Bounded, thread-safe LRU cache whose entries expire after ``ttl_seconds``.
+
+    A ``maxsize`` of zero disables the cache and a ``ttl_seconds`` of zero keeps
+    entries until they are evicted by size.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float) -> None:
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, object]:
+        if not self.enabled:
+            return {}
+        found: Dict[Hashable, object] = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                expires_at, value = entry
+                if expires_at and expires_at <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = value
+        return found
+
+    def get(self, key: Hashable) -> Optional[object]:
+        return self.get_many((key,)).get(key)
+
+    def set_many(self, items: Dict[Hashable, object]) -> None:
+        if not self.enabled or not items:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else 0.0
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheTierStats:
+    """Hit/miss/error counters kept separately for each cache tier."""
+
+    def __init__(self, *tiers: str) -> None:
+        self._counts = {tier: {"hits": 0, "misses": 0, "errors": 0} for tier in tiers}
+        self._lock = threading.Lock()
+
+    def record(self, tier: str, hits: int = 0, misses: int = 0, errors: int = 0) -> None:
+        with self._lock:
+            counts = self._counts[tier]
+            counts["hits"] += hits
+            counts["misses"] += misses
+            counts["errors"] += errors
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {tier: dict(counts) for tier, counts in self._counts.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            for counts in self._counts.values():
+                for name in counts:
+                    counts[name] = 0
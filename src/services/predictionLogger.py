@@ -0,0 +1,159 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+from src.services.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundPredictionLogger:
+    """Buffer prediction events and write them to MLflow from a daemon thread.
+
+    ``log`` never blocks on the tracking server: events are sampled with
+    ``sample_rate`` and appended to a bounded deque, and when the deque is full
+    the oldest buffered event is dropped. Every ``flush_interval`` seconds (or
+    as soon as ``max_batch`` events are waiting) the buffered events are written
+    as a single run with one ``log_batch`` call and one JSON artifact.
+    """
+
+    def __init__(
+        self,
+        experiment_id: str,
+        run_name: str,
+        tags: Optional[Dict[str, str]] = None,
+        max_queue: int = 10000,
+        flush_interval: float = 10.0,
+        max_batch: int = 1000,
+        sample_rate: float = 1.0,
+        client: Optional[MlflowClient] = None,
+    ) -> None:
+        self.experiment_id = experiment_id
+        self.run_name = run_name
+        self.tags = dict(tags or {})
+        self.flush_interval = flush_interval
+        self.max_batch = max(max_batch, 1)
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.client = client or MlflowClient()
+        self._events: deque = deque(maxlen=max(max_queue, 1))
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._counts = {
+            "enqueued": 0,
+            "dropped_overflow": 0,
+            "dropped_sampled": 0,
+            "dropped_shutdown": 0,
+            "logged": 0,
+            "failed": 0,
+            "batches": 0,
+        }
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["queued"] = len(self._events)
+        return counts
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="mlflow-prediction-logger", daemon=True)
+            self._thread.start()
+
+    def log(self, event: dict) -> bool:
+        if self._stopped.is_set():
+            self._count("dropped_shutdown")
+            return False
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._count("dropped_sampled")
+            return False
+
+        event.setdefault("timestamp", time.time())
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self._counts["dropped_overflow"] += 1
+            self._events.append(event)
+            self._counts["enqueued"] += 1
+            queued = len(self._events)
+
+        self.start()
+        if queued >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def _drain(self) -> list:
+        with self._lock:
+            count = min(len(self._events), self.max_batch)
+            return [self._events.popleft() for _ in range(count)]
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            while True:
+                events = self._drain()
+                if not events:
+                    return
+                self._write(events)
+
+    def _write(self, events: list) -> None:
+        with stage_timer("mlflow_flush"):
+            self._write_run(events)
+
+    def _write_run(self, events: list) -> None:
+        now_ms = int(time.time() * 1000)
+        num_wods = sum(len(event["wods"]) for event in events)
+        cache_hits = sum(1 for event in events if event["cache_hit"])
+        clusters = {pred for event in events for pred in event["predictions"]}
+        try:
+            run = self.client.create_run(self.experiment_id, run_name=self.run_name)
+            run_id = run.info.run_id
+            self.client.log_batch(
+                run_id,
+                metrics=[
+                    Metric("num_events", len(events), now_ms, 0),
+                    Metric("num_wods", num_wods, now_ms, 0),
+                    Metric("cache_hit_rate", cache_hits / len(events), now_ms, 0),
+                    Metric("unique_clusters", len(clusters), now_ms, 0),
+                ],
+                params=[
+                    Param("first_event_at", str(events[0]["timestamp"])),
+                    Param("last_event_at", str(events[-1]["timestamp"])),
+                ],
+                tags=[RunTag(key, str(value)) for key, value in self.tags.items()],
+            )
+            self.client.log_dict(run_id, {"events": events}, "prediction_events.json")
+            self.client.set_terminated(run_id)
+        except Exception as exc:  # pragma: no cover - logging must not block inference
+            logger.warning("Failed to log %d prediction events to MLflow: %s", len(events), exc)
+            self._count("failed", len(events))
+            return
+        self._count("logged", len(events))
+        self._count("batches")
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        self.flush()
@@ -0,0 +1,319 @@
+"""Record-time prediction with the ``BertRegressor`` from ``notebooks/wod_record_predictor.ipynb``, for CPU serving.
+
+The notebook feeds ``wod``, ``man_setting`` and ``woman_setting`` to BERT as one
+string, each part followed by ``" [unsused1]"`` (spelled as in training). It
+regresses the pooled output onto ``log1p(median_record_seconds)``, standardized.
+``RecordTimeModel`` reverses that scaling and returns seconds.
+
+The served model is an export directory written by ``export``:
+
+- ``record_model.json``: max length, target mean/scale, whether the weights are int8;
+- ``config.json`` and tokenizer files (``save_pretrained``);
+- ``model.pt``: the state dict after ``torch.ao.quantization.quantize_dynamic``.
+  Every ``nn.Linear`` holds int8 weights with dynamically quantized
+  activations, which is where BERT spends its CPU time.
+
+Per request, texts are deduplicated and looked up in a bounded cache of pooled
+BERT outputs (``WOD_RECORD_EMBEDDING_CACHE_SIZE``). The rest are tokenized once,
+sorted by token count and run in batches of ``WOD_RECORD_BATCH_SIZE``. Each
+batch is padded only to its longest member, rounded up to a multiple of 8,
+instead of to the notebook's 512 tokens. ``WOD_RECORD_TORCH_THREADS`` sets
+torch's intra-op thread count. One forward pass runs at a time, so concurrent
+requests do not oversubscribe those threads.
+
+torch and transformers are optional. Install the CPU build of torch on the
+serving hosts; without them the endpoint answers 503.
+
+    python -m src.services.recordPredictor export checkpoint.pth models/record/0.1 \\
+        --config bert-base-uncased --target-mean 6.31 --target-scale 0.62
+    python -m src.services.recordPredictor random /tmp/record-tiny   # offline, randomly initialized
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import string
+import tempfile
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.services.config import env_int
+from src.services.metrics import stage_timer
+from src.services.predictionCache import LocalPredictionCache
+
+try:  # pragma: no cover - optional dependency guard
+    import torch
+    from torch import nn
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+except ImportError:  # pragma: no cover
+    torch = None  # type: ignore
+    nn = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+
+RECORD_MODEL_PATH = os.path.join(PROJECT_ROOT, os.getenv("WOD_RECORD_MODEL_PATH", "models/record"))
+RECORD_BATCH_SIZE = env_int("WOD_RECORD_BATCH_SIZE", 32, minimum=1)
+RECORD_TORCH_THREADS = env_int("WOD_RECORD_TORCH_THREADS", min(os.cpu_count() or 1, 4), minimum=1)
+EMBEDDING_CACHE_SIZE = env_int("WOD_RECORD_EMBEDDING_CACHE_SIZE", 10000)
+MAX_TEXTS = env_int("WOD_RECORD_MAX_TEXTS", 1000, minimum=1)
+
+METADATA_FILE = "record_model.json"
+WEIGHTS_FILE = "model.pt"
+SEPARATOR = " [unsused1]"
+PAD_MULTIPLE = 8
+
+
+def combine_text(wod: str, man_setting: Optional[str] = None, woman_setting: Optional[str] = None) -> str:
+    """The notebook's ``wod_info``: every present part followed by the separator token."""
+
+    return "".join(str(part) + SEPARATOR for part in (wod, man_setting, woman_setting) if part is not None)
+
+
+def dependencies_available() -> bool:
+    return torch is not None
+
+
+if torch is not None:
+
+    class BertRegressor(nn.Module):
+        """Notebook model; attribute names match its state dict (``Bert.*``, ``regressor.*``)."""
+
+        def __init__(self, config: "BertConfig", drop_rate: float = 0.2) -> None:
+            super().__init__()
+            self.Bert = BertModel(config)
+            self.regressor = nn.Sequential(
+                nn.Dropout(drop_rate),
+                nn.Linear(config.hidden_size, 256),
+                nn.ReLU(),
+                nn.Linear(256, 1),
+            )
+
+        def forward(self, input_ids, attention_masks):
+            return self.regressor(self.Bert(input_ids, attention_masks).pooler_output)
+
+
+def quantize(model: "BertRegressor") -> "BertRegressor":
+    """int8 dynamic quantization of every ``nn.Linear`` (attention, feed-forward, pooler and head)."""
+
+    return torch.ao.quantization.quantize_dynamic(model.eval(), {nn.Linear}, dtype=torch.qint8)
+
+
+@dataclass
+class RecordTimeModel:
+    model: "BertRegressor"
+    tokenizer: "BertTokenizerFast"
+    max_length: int
+    target_mean: float
+    target_scale: float
+    batch_size: int = RECORD_BATCH_SIZE
+    cache_size: int = EMBEDDING_CACHE_SIZE
+
+    def __post_init__(self) -> None:
+        self.model.eval()
+        self.embeddings = LocalPredictionCache(self.cache_size, 0)
+        self._lock = threading.Lock()
+        torch.set_num_threads(RECORD_TORCH_THREADS)
+
+    @classmethod
+    def load(cls, path: str = RECORD_MODEL_PATH, **kwargs) -> "RecordTimeModel":
+        if torch is None:
+            raise RuntimeError("Record-time prediction requires torch and transformers.")
+        with open(os.path.join(path, METADATA_FILE), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        model = BertRegressor(BertConfig.from_pretrained(path))
+        if metadata.get("quantized", True):
+            model = quantize(model)
+        # Packed int8 weights are not plain tensors, so this cannot be a weights_only load.
+        model.load_state_dict(torch.load(os.path.join(path, WEIGHTS_FILE), map_location="cpu", weights_only=False))
+        return cls(
+            model=model,
+            tokenizer=BertTokenizerFast.from_pretrained(path),
+            max_length=metadata["max_length"],
+            target_mean=metadata["target_mean"],
+            target_scale=metadata["target_scale"],
+            **kwargs,
+        )
+
+    def _encode_batches(self, texts: List[str]):
+        """Yield ``(positions, input_ids, attention_mask)`` for length-sorted, minimally padded batches."""
+
+        with stage_timer("record_tokenize"):
+            encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)["input_ids"]
+        order = sorted(range(len(texts)), key=lambda idx: len(encoded[idx]))
+        pad_id = self.tokenizer.pad_token_id
+        for start in range(0, len(order), self.batch_size):
+            positions = order[start : start + self.batch_size]
+            width = max(len(encoded[idx]) for idx in positions)
+            width = min(-(-width // PAD_MULTIPLE) * PAD_MULTIPLE, self.max_length)
+            input_ids = np.full((len(positions), width), pad_id, dtype=np.int64)
+            attention_mask = np.zeros((len(positions), width), dtype=np.int64)
+            for row, idx in enumerate(positions):
+                ids = encoded[idx]
+                input_ids[row, : len(ids)] = ids
+                attention_mask[row, : len(ids)] = 1
+            yield positions, torch.from_numpy(input_ids), torch.from_numpy(attention_mask)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Pooled BERT outputs, one row per text, from the cache where possible."""
+
+        unique = list(dict.fromkeys(texts))
+        found = self.embeddings.get_many(unique)
+        missing = [text for text in unique if text not in found]
+        if missing:
+            computed = {}
+            with self._lock, torch.inference_mode():
+                for positions, input_ids, attention_mask in self._encode_batches(missing):
+                    with stage_timer("record_forward"):
+                        pooled = self.model.Bert(input_ids, attention_mask).pooler_output.numpy()
+                    for row, idx in enumerate(positions):
+                        computed[missing[idx]] = pooled[row]
+            self.embeddings.set_many(computed)
+            found.update(computed)
+        return np.stack([found[text] for text in texts])
+
+    def predict_seconds(self, texts: Sequence[str]) -> np.ndarray:
+        embeddings = self.embed(texts)
+        with torch.inference_mode():
+            scaled = self.model.regressor(torch.from_numpy(embeddings)).numpy().ravel()
+        return np.expm1(scaled.astype(float) * self.target_scale + self.target_mean)
+
+
+def save(model: "BertRegressor", tokenizer, output_dir: str, max_length: int, target_mean: float, target_scale: float):
+    """Write the export directory served by ``RecordTimeModel.load``; ``model`` must already be quantized."""
+
+    os.makedirs(output_dir, exist_ok=True)
+    model.Bert.config.save_pretrained(output_dir)
+    tokenizer.save_pretrained(output_dir)
+    torch.save(model.state_dict(), os.path.join(output_dir, WEIGHTS_FILE))
+    metadata = {
+        "max_length": max_length,
+        "target_mean": target_mean,
+        "target_scale": target_scale,
+        "quantized": "int8-dynamic",
+        "torch": torch.__version__,
+    }
+    with open(os.path.join(output_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+
+def export(
+    checkpoint: str, output_dir: str, config: str, target_mean: float, target_scale: float, max_length: int = 512
+) -> None:
+    """Quantize a notebook checkpoint (``torch.save`` of the state dict or of ``{"model_state_dict": ...}``)."""
+
+    state = torch.load(checkpoint, map_location="cpu")
+    state = state.get("model_state_dict", state)
+    model = BertRegressor(BertConfig.from_pretrained(config))
+    model.load_state_dict(state)
+    save(quantize(model), BertTokenizerFast.from_pretrained(config), output_dir, max_length, target_mean, target_scale)
+
+
+def random_model(
+    output_dir: Optional[str] = None, texts: Sequence[str] = (), hidden_size: int = 64, layers: int = 2, seed: int = 0
+):
+    """Small randomly initialized regressor and WordPiece tokenizer, built without downloads.
+
+    The vocabulary covers every lowercase character (so any text tokenizes)
+    plus the words of ``texts``. With ``output_dir`` the quantized model is
+    also exported there.
+    """
+
+    torch.manual_seed(seed)
+    characters = string.ascii_lowercase + string.digits + string.punctuation
+    words = Counter(word for text in texts for word in re.findall(r"\w+", text.lower()))
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "unsused1"]
+    vocab += list(characters) + ["##" + char for char in characters]
+    vocab += sorted(word for word in words if len(word) > 1)
+    with tempfile.TemporaryDirectory() as work_dir:
+        vocab_path = os.path.join(work_dir, "vocab.txt")
+        with open(vocab_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(vocab) + "\n")
+        tokenizer = BertTokenizerFast(vocab_file=vocab_path)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=hidden_size,
+        num_hidden_layers=layers,
+        num_attention_heads=max(hidden_size // 64, 1),
+        intermediate_size=hidden_size * 4,
+        max_position_embeddings=512,
+    )
+    model = BertRegressor(config).eval()
+    if output_dir is not None:
+        save(quantize(model), tokenizer, output_dir, max_length=512, target_mean=6.0, target_scale=0.5)
+    return model, tokenizer
+
+
+_record_model: Optional[RecordTimeModel] = None
+_record_lock = threading.Lock()
+
+
+def get_record_model() -> RecordTimeModel:
+    """Load the export at ``WOD_RECORD_MODEL_PATH`` on first use; ``RuntimeError`` when unavailable."""
+
+    global _record_model
+    if _record_model is None:
+        with _record_lock:
+            if _record_model is None:
+                if not os.path.isfile(os.path.join(RECORD_MODEL_PATH, METADATA_FILE)):
+                    raise RuntimeError(f"No record-time model exported at {RECORD_MODEL_PATH}.")
+                _record_model = RecordTimeModel.load(RECORD_MODEL_PATH)
+                logger.info("Loaded record-time model from %s", RECORD_MODEL_PATH)
+    return _record_model
+
+
+def predictRecordSeconds(
+    wods: list[str], man_settings: Optional[list] = None, woman_settings: Optional[list] = None
+) -> list[float]:
+    if not wods or len(wods) > MAX_TEXTS:
+        raise ValueError(f"Between 1 and {MAX_TEXTS} workouts must be provided.")
+    for name, settings in (("man_settings", man_settings), ("woman_settings", woman_settings)):
+        if settings is not None and len(settings) != len(wods):
+            raise ValueError(f"The number of {name} must match the number of workouts.")
+    texts = [
+        combine_text(
+            wod,
+            man_settings[idx] if man_settings is not None else None,
+            woman_settings[idx] if woman_settings is not None else None,
+        )
+        for idx, wod in enumerate(wods)
+    ]
+    return get_record_model().predict_seconds(texts).tolist()
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Export the record-time BertRegressor for CPU serving.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Quantize a notebook checkpoint.")
+    export_parser.add_argument("checkpoint")
+    export_parser.add_argument("output_dir")
+    export_parser.add_argument("--config", default="bert-base-uncased", help="BERT config and tokenizer name or path.")
+    export_parser.add_argument("--target-mean", type=float, required=True, help="Scaler mean of log1p(seconds).")
+    export_parser.add_argument("--target-scale", type=float, required=True, help="Scaler scale of log1p(seconds).")
+    export_parser.add_argument("--max-length", type=int, default=512)
+    random_parser = subparsers.add_parser("random", help="Export a small randomly initialized model (offline).")
+    random_parser.add_argument("output_dir")
+    random_parser.add_argument("--hidden-size", type=int, default=64)
+    random_parser.add_argument("--layers", type=int, default=2)
+    random_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if torch is None:
+        parser.error("torch and transformers are required.")
+    if args.command == "export":
+        export(args.checkpoint, args.output_dir, args.config, args.target_mean, args.target_scale, args.max_length)
+    else:
+        random_model(args.output_dir, hidden_size=args.hidden_size, layers=args.layers, seed=args.seed)
+    print(f"Wrote {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
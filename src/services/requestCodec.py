@@ -0,0 +1,106 @@
+"""Request decoding and response encoding for ``POST /wod/cluster``.
+
+The handler reads the raw body and hands ``(wods, weights)`` straight to the
+service, which validates them once (``wodCluster._validate_inputs``). Two body
+formats are accepted:
+
+- ``application/json``: ``{"wods": [...], "weights": [...]}``, parsed with
+  ``orjson`` when it is installed;
+- ``application/vnd.apache.arrow.stream``: an Arrow IPC stream with a ``wod``
+  string column and a ``weight`` float column, for bulk callers. Weights reach
+  the service as a float64 array without a per-row Python object.
+
+Responses are assembled from pre-encoded label strings instead of going
+through ``jsonable_encoder``.
+"""
+
+import json
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+from src.services.wodCluster import InvalidInputError
+
+try:  # pragma: no cover - optional dependency guard
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+try:  # pragma: no cover - optional dependency guard
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None  # type: ignore
+
+JSON_CONTENT_TYPE = "application/json"
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _loads(body: bytes):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def decode_json(body: bytes) -> Tuple[list, list]:
+    try:
+        payload = _loads(body)
+    except ValueError as exc:
+        raise ValueError(f"Request body is not valid JSON: {exc}") from exc
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object with 'wods' and 'weights'.")
+    for field in ("wods", "weights"):
+        if field not in payload:
+            raise InvalidInputError(f"'{field}' is required.", (field,))
+    return payload["wods"], payload["weights"]
+
+
+def decode_arrow(body: bytes) -> Tuple[list, np.ndarray]:
+    if pa is None:
+        raise ValueError(f"{ARROW_CONTENT_TYPE} bodies require pyarrow.")
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except (pa.ArrowInvalid, OSError) as exc:
+        raise ValueError(f"Request body is not an Arrow IPC stream: {exc}") from exc
+    for column in ("wod", "weight"):
+        if column not in table.column_names:
+            raise ValueError(f"The Arrow stream needs a '{column}' column.")
+    weight = table.column("weight")
+    if not pa.types.is_floating(weight.type) and not pa.types.is_integer(weight.type):
+        raise ValueError("The 'weight' column must be numeric.")
+    # Nulls become NaN and are rejected by the finite-weights check.
+    weights = weight.cast(pa.float64()).to_numpy()
+    # Through NumPy: an order of magnitude faster than to_pylist() for string columns.
+    return table.column("wod").to_numpy().tolist(), weights
+
+
+def decode_cluster_request(body: bytes, content_type: str):
+    """Return ``(wods, weights)`` from a JSON or Arrow body; ``ValueError`` on malformed input."""
+
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type == ARROW_CONTENT_TYPE:
+        return decode_arrow(body)
+    if media_type in ("", JSON_CONTENT_TYPE) or media_type.endswith("+json"):
+        return decode_json(body)
+    raise ValueError(f"Unsupported content type '{media_type}'.")
+
+
+def encode_arrow_request(wods: Iterable[str], weights: Iterable[float]) -> bytes:
+    """Arrow IPC body for ``POST /wod/cluster``; used by bulk clients and the benchmarks."""
+
+    table = pa.table({"wod": pa.array(list(wods), pa.string()), "weight": pa.array(weights, pa.float64())})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class LabelEncoder:
+    """Serialize ``{"labels": [...]}`` from cluster ids with one join over pre-encoded labels."""
+
+    def __init__(self, labels: Dict[int, str], unknown: str = "Unknown") -> None:
+        self._encoded = {cluster: json.dumps(label, ensure_ascii=False) for cluster, label in labels.items()}
+        self._unknown = json.dumps(unknown)
+
+    def encode(self, clusters: Iterable[int]) -> bytes:
+        encoded, unknown = self._encoded, self._unknown
+        return ('{"labels":[' + ",".join([encoded.get(c, unknown) for c in clusters]) + "]}").encode("utf-8")
@@ -0,0 +1,242 @@
+"""Shadow inference: compare a candidate model version against the served one on live traffic.
+
+With ``WOD_CLUSTER_SHADOW_MODEL_PATH`` set (e.g. ``models/0.191``), a sample of
+answered ``/wod/cluster`` rows (``WOD_CLUSTER_SHADOW_SAMPLE_RATE``) is queued
+with the served predictions. A daemon thread re-runs them through the
+candidate. Nothing runs on the request path except the sampling decision and
+an append to a bounded deque. The shadow work is bounded three ways:
+
+- at most ``WOD_CLUSTER_SHADOW_QUEUE_SIZE`` rows wait; further rows are dropped;
+- rows are predicted in batches of at most ``WOD_CLUSTER_SHADOW_MAX_BATCH``;
+- the thread sleeps so that it predicts at most
+  ``WOD_CLUSTER_SHADOW_MAX_ROWS_PER_SECOND`` rows per second, which caps the
+  CPU (and GIL) time it can take from the served model at peak traffic.
+
+Agreement counts, the (served, shadow) confusion counts and the
+``wodfit_model_seconds`` latency histogram per version are exposed on
+``/wod/cluster/shadow/stats`` and ``/metrics``.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import scipy.sparse
+
+from src.services.config import env_float, env_int
+from src.services.metrics import observe_model, register_collector
+from src.services.modelArtifacts import ModelBundle, load_model_bundle, model_version
+
+logger = logging.getLogger(__name__)
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+
+SHADOW_MODEL_PATH = os.getenv("WOD_CLUSTER_SHADOW_MODEL_PATH")
+
+
+class ShadowEvaluator:
+    """Re-run sampled rows through a second model version on a background thread."""
+
+    def __init__(
+        self,
+        path: str,
+        primary_version: str,
+        sample_rate: float = 0.1,
+        max_queue: int = 1000,
+        max_batch: int = 256,
+        max_rows_per_second: float = 200.0,
+    ) -> None:
+        self.path = path
+        self.version = model_version(path)
+        self.primary_version = primary_version
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.max_batch = max(max_batch, 1)
+        self.max_rows_per_second = max_rows_per_second
+        self._bundle: Optional[ModelBundle] = None
+        self._rows: deque = deque()
+        self._max_queue = max(max_queue, 1)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._confusion: Dict[tuple, int] = {}
+        self._counts = {
+            "sampled": 0,
+            "dropped_overflow": 0,
+            "compared": 0,
+            "agreed": 0,
+            "failed": 0,
+        }
+
+    def submit(self, wods: Sequence[str], weights: Sequence[float], predictions: Sequence[int]) -> int:
+        """Queue a sample of one answered request; returns the number of rows queued."""
+
+        if self._stopped.is_set() or self.sample_rate <= 0.0:
+            return 0
+        rows = [
+            row
+            for row in zip(wods, weights, predictions)
+            if self.sample_rate >= 1.0 or random.random() < self.sample_rate
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            room = self._max_queue - len(self._rows)
+            self._rows.extend(rows[:room])
+            self._counts["sampled"] += min(len(rows), room)
+            self._counts["dropped_overflow"] += max(len(rows) - room, 0)
+            queued = len(self._rows)
+        self.start()
+        if queued >= self.max_batch:
+            self._wakeup.set()
+        return min(len(rows), max(room, 0))
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="shadow-inference", daemon=True)
+            self._thread.start()
+
+    def _drain(self) -> list:
+        with self._lock:
+            count = min(len(self._rows), self.max_batch)
+            return [self._rows.popleft() for _ in range(count)]
+
+    def _load(self) -> ModelBundle:
+        if self._bundle is None:
+            self._bundle = load_model_bundle(self.path)
+            logger.info("Loaded shadow model %s from %s", self.version, self.path)
+        return self._bundle
+
+    def _predict(self, wods: list, weights: np.ndarray) -> np.ndarray:
+        bundle = self._load()
+        features = scipy.sparse.hstack([bundle.vectorizer.transform(wods), bundle.scaler.transform(weights)])
+        return np.asarray(bundle.model.predict(features))
+
+    def process(self, rows: list) -> None:
+        wods = [wod for wod, _, _ in rows]
+        weights = np.asarray([weight for _, weight, _ in rows], dtype=float).reshape(-1, 1)
+        started = time.perf_counter()
+        try:
+            shadow = self._predict(wods, weights)
+        except Exception as exc:  # pragma: no cover - a broken candidate must not affect serving
+            logger.warning("Shadow prediction failed for %d rows: %s", len(rows), exc)
+            with self._lock:
+                self._counts["failed"] += len(rows)
+            return
+        observe_model(self.version, time.perf_counter() - started)
+        with self._lock:
+            for (_, _, primary), candidate in zip(rows, shadow.tolist()):
+                key = (int(primary), int(candidate))
+                self._confusion[key] = self._confusion.get(key, 0) + 1
+                self._counts["agreed"] += key[0] == key[1]
+            self._counts["compared"] += len(rows)
+
+    def _run(self) -> None:
+        try:
+            self._load()
+        except Exception as exc:  # pragma: no cover - retried by the first batch
+            logger.warning("Failed to load shadow model %s: %s", self.path, exc)
+        while not self._stopped.is_set():
+            rows = self._drain()
+            if not rows:
+                self._wakeup.wait(1.0)
+                self._wakeup.clear()
+                continue
+            started = time.perf_counter()
+            self.process(rows)
+            if self.max_rows_per_second > 0:
+                # Pace to the row budget: a batch of n rows takes at least n / budget seconds.
+                self._stopped.wait(max(len(rows) / self.max_rows_per_second - (time.perf_counter() - started), 0.0))
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            confusion = dict(self._confusion)
+            counts["queued"] = len(self._rows)
+        return {
+            "primary_version": self.primary_version,
+            "shadow_version": self.version,
+            "sample_rate": self.sample_rate,
+            **counts,
+            "agreement_rate": counts["agreed"] / counts["compared"] if counts["compared"] else None,
+            "confusion": [
+                {"primary": primary, "shadow": shadow, "rows": rows}
+                for (primary, shadow), rows in sorted(confusion.items())
+            ],
+        }
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+
+_shadow: Optional[ShadowEvaluator] = None
+
+
+def configure_shadow(primary_version: str) -> Optional[ShadowEvaluator]:
+    """Startup hook: create the evaluator from the environment; ``None`` when no shadow model is configured.
+
+    Only the server process calls this (``src.main``), so inference worker
+    processes and CLIs that import ``wodCluster`` never start a shadow thread.
+    """
+
+    global _shadow
+    if not SHADOW_MODEL_PATH or _shadow is not None:
+        return _shadow
+    path = os.path.join(PROJECT_ROOT, SHADOW_MODEL_PATH)
+    if not os.path.exists(path):
+        logger.warning("Shadow model %s does not exist; shadow inference is disabled.", path)
+        return None
+    _shadow = ShadowEvaluator(
+        path,
+        primary_version=primary_version,
+        sample_rate=env_float("WOD_CLUSTER_SHADOW_SAMPLE_RATE", 0.1),
+        max_queue=env_int("WOD_CLUSTER_SHADOW_QUEUE_SIZE", 1000, minimum=1),
+        max_batch=env_int("WOD_CLUSTER_SHADOW_MAX_BATCH", 256, minimum=1),
+        max_rows_per_second=env_float("WOD_CLUSTER_SHADOW_MAX_ROWS_PER_SECOND", 200.0),
+    )
+    # Load the candidate now rather than under the first sampled request's traffic.
+    _shadow.start()
+    return _shadow
+
+
+def get_shadow() -> Optional[ShadowEvaluator]:
+    return _shadow
+
+
+def get_shadow_stats() -> Optional[dict]:
+    if _shadow is None:
+        return None
+    return _shadow.stats()
+
+
+def shutdown_shadow() -> None:
+    if _shadow is not None:
+        _shadow.shutdown()
+
+
+def _collect_shadow_metrics():
+    if _shadow is None:
+        return
+    stats = _shadow.stats()
+    for result in ("sampled", "dropped_overflow", "compared", "agreed", "failed"):
+        yield "wodfit_shadow_rows_total", {"version": stats["shadow_version"], "result": result}, stats[result]
+
+
+register_collector(
+    "wodfit_shadow_rows_total",
+    "counter",
+    "Rows sampled for, dropped from, and compared by shadow inference.",
+    _collect_shadow_metrics,
+)
@@ -0,0 +1,239 @@
+"""Nearest historical workouts for a query, from the cluster model's training rows.
+
+The served ``KNeighborsClassifier`` already holds every training vector; this
+module keeps a search structure over them plus the source row of each vector,
+all loaded once per process. Small training sets are scored in one product
+against a dense transposed copy with precomputed row norms. From
+``WOD_CLUSTER_NEIGHBOR_INDEX_MIN_ROWS`` rows on, the pruned
+``SparseNeighborIndex`` is used, shared with ``wodCluster`` when it built one.
+
+Source rows live next to the model in ``similar_rows.json``: the workout text
+and mean weight of every training row, in training order, and a SHA-256 of the
+training matrix so that rows written for another model are rejected. The file
+is written by ``src.services.wodClusterTraining``. For an existing model, build
+it from the dataset the model was trained on; every row is checked against the
+training matrix:
+
+    python -m src.services.similarWods build models/0.214/model_vectorizer_scaler.dump wod_fortime_median_cluster.csv
+
+Without the file, results still carry the weight (recovered from the scaler),
+cluster and distance, with ``wod`` set to ``None``.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+from src.services import wodCluster
+from src.services.config import env_int
+from src.services.metrics import stage_timer
+from src.services.modelArtifacts import ModelBundle, load_model_bundle
+from src.services.neighborIndex import SparseNeighborIndex
+from src.services.wodPreprocessing import mean_weights
+
+logger = logging.getLogger(__name__)
+
+ROWS_FILE = "similar_rows.json"
+DEFAULT_K = 5
+MAX_K = env_int("WOD_CLUSTER_SIMILAR_MAX_K", 50, minimum=1)
+# Queries are scored in blocks so the dense (block x training rows) distance matrix stays small.
+BLOCK_CELLS = env_int("WOD_CLUSTER_SIMILAR_BLOCK_CELLS", 4_000_000, minimum=1)
+# Training matrices up to this many cells are kept as a dense transposed copy:
+# sparse @ dense is several times faster than sparse @ sparse for a near-dense result.
+DENSE_CELLS = env_int("WOD_CLUSTER_SIMILAR_DENSE_CELLS", 8_000_000)
+
+
+def fit_matrix_digest(bundle: ModelBundle) -> str:
+    fit_X = bundle.model._fit_X.tocsr()
+    digest = hashlib.sha256()
+    for array in (fit_X.indptr, fit_X.indices, fit_X.data):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def rows_path(model_path: str) -> str:
+    directory = model_path if os.path.isdir(model_path) else os.path.dirname(model_path)
+    return os.path.join(directory, ROWS_FILE)
+
+
+def write_rows(bundle: ModelBundle, wods: Sequence[str], weights: Sequence[float], path: str) -> None:
+    n_rows = bundle.model._fit_X.shape[0]
+    if len(wods) != n_rows or len(weights) != n_rows:
+        raise ValueError(f"Expected {n_rows} source rows, got {len(wods)}.")
+    payload = {
+        "version": bundle.version,
+        "fit_sha256": fit_matrix_digest(bundle),
+        "wods": [str(wod) for wod in wods],
+        "weights": [float(weight) for weight in weights],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def check_rows(bundle: ModelBundle, wods: Sequence[str], weights: Sequence[float]) -> None:
+    """Raise ``ValueError`` unless the rows vectorize to the model's training matrix."""
+
+    fit_X = bundle.model._fit_X.tocsr()
+    if len(wods) != fit_X.shape[0]:
+        raise ValueError(f"The model has {fit_X.shape[0]} training rows, the dataset {len(wods)}.")
+    features = scipy.sparse.hstack(
+        [bundle.vectorizer.transform(list(wods)), bundle.scaler.transform(np.asarray(weights, float).reshape(-1, 1))]
+    ).tocsr()
+    mismatched = np.flatnonzero(abs(features - fit_X).max(axis=1).toarray().ravel() > 1e-9)
+    if len(mismatched):
+        raise ValueError(f"{len(mismatched)} rows do not match the training matrix (first: row {mismatched[0]}).")
+
+
+@dataclass
+class SimilarWodIndex:
+    bundle: ModelBundle
+    wods: Optional[List[str]]
+    weights: np.ndarray
+    clusters: np.ndarray
+    fit_X: scipy.sparse.csr_matrix
+    fit_T: object  # transposed training matrix, dense when small enough
+    fit_sq_norms: np.ndarray
+    neighbor_index: Optional[SparseNeighborIndex] = None
+
+    @classmethod
+    def from_bundle(cls, bundle: ModelBundle, path: Optional[str] = None) -> "SimilarWodIndex":
+        fit_X = bundle.model._fit_X.tocsr()
+        wods = None
+        # Scaled weight column back to lb, for models without a rows file.
+        weights = bundle.scaler.inverse_transform(fit_X[:, -1].toarray()).ravel()
+        # A bundle directory (modelArtifacts export) shares the rows file of the model it came from.
+        candidates = [path] if path else [rows_path(bundle.path), os.path.join(os.path.dirname(bundle.path), ROWS_FILE)]
+        path = next((candidate for candidate in candidates if os.path.isfile(candidate)), None)
+        if path is not None:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("fit_sha256") != fit_matrix_digest(bundle):
+                logger.warning("Ignoring %s: it was written for a different model.", path)
+            else:
+                wods = payload["wods"]
+                weights = np.asarray(payload["weights"], dtype=float)
+        fit_T = fit_X.T.tocsr()
+        if fit_X.shape[0] * fit_X.shape[1] <= DENSE_CELLS:
+            fit_T = fit_T.toarray()
+        # Large training sets are searched with the pruned index instead of scoring every row.
+        neighbor_index = wodCluster._neighbor_index
+        if neighbor_index is None or neighbor_index.model is not bundle.model:
+            neighbor_index = None
+            if fit_X.shape[0] >= wodCluster.NEIGHBOR_INDEX_MIN_ROWS and SparseNeighborIndex.supports(bundle.model):
+                neighbor_index = SparseNeighborIndex(bundle.model)
+        return cls(
+            bundle=bundle,
+            wods=wods,
+            weights=weights,
+            clusters=np.asarray(bundle.model.classes_)[np.asarray(bundle.model._y)],
+            fit_X=fit_X,
+            fit_T=fit_T,
+            neighbor_index=neighbor_index,
+            fit_sq_norms=np.asarray(fit_X.multiply(fit_X).sum(axis=1)).ravel(),
+        )
+
+    def kneighbors(self, features, k: int):
+        """``(distances, indices)`` of the ``k`` nearest training rows per query, nearest first."""
+
+        if self.neighbor_index is not None:
+            return self.neighbor_index.kneighbors(features, k)
+
+        features = scipy.sparse.csr_matrix(features)
+        n_rows = self.fit_X.shape[0]
+        block = max(BLOCK_CELLS // n_rows, 1)
+        query_sq_norms = np.asarray(features.multiply(features).sum(axis=1)).ravel()
+        distances, indices = [], []
+        for start in range(0, features.shape[0], block):
+            dots = features[start : start + block] @ self.fit_T
+            if scipy.sparse.issparse(dots):
+                dots = dots.toarray()
+            d2 = query_sq_norms[start : start + block, None] + self.fit_sq_norms[None, :] - 2.0 * dots
+            np.maximum(d2, 0.0, out=d2)
+            top = np.argpartition(d2, k - 1, axis=1)[:, :k] if k < n_rows else np.tile(np.arange(n_rows), (len(d2), 1))
+            top_d2 = np.take_along_axis(d2, top, axis=1)
+            # Nearest first; equal distances by training row order.
+            order = np.lexsort((top, top_d2), axis=1)
+            indices.append(np.take_along_axis(top, order, axis=1))
+            distances.append(np.sqrt(np.take_along_axis(top_d2, order, axis=1)))
+        return np.vstack(distances), np.vstack(indices)
+
+    def describe(self, distances: np.ndarray, indices: np.ndarray) -> List[List[dict]]:
+        results = []
+        for row_distances, row_indices in zip(distances, indices):
+            matches = []
+            for distance, index in zip(row_distances.tolist(), row_indices.tolist()):
+                cluster = int(self.clusters[index])
+                matches.append(
+                    {
+                        "wod": self.wods[index] if self.wods is not None else None,
+                        "weight": float(self.weights[index]),
+                        "cluster": cluster,
+                        "label": wodCluster.CLUSTER_LABELS.get(cluster, "Unknown"),
+                        "distance": distance,
+                    }
+                )
+            results.append(matches)
+        return results
+
+
+_similar_index: Optional[SimilarWodIndex] = None
+_similar_lock = threading.Lock()
+
+
+def get_similar_index() -> SimilarWodIndex:
+    global _similar_index
+    bundle = wodCluster.get_model_bundle()
+    if _similar_index is None or _similar_index.bundle is not bundle:
+        with _similar_lock:
+            if _similar_index is None or _similar_index.bundle is not bundle:
+                _similar_index = SimilarWodIndex.from_bundle(bundle)
+                logger.info(
+                    "Loaded similar-workout index for model %s (%s source rows)",
+                    bundle.version,
+                    "with" if _similar_index.wods is not None else "without",
+                )
+    return _similar_index
+
+
+def findSimilarWods(wods: list[str], weights: list[float], k: int = DEFAULT_K) -> List[List[dict]]:
+    """Return the ``k`` nearest training workouts for every input workout."""
+
+    if not isinstance(k, int) or isinstance(k, bool) or not 1 <= k <= MAX_K:
+        raise ValueError(f"k must be an integer between 1 and {MAX_K}.")
+    with stage_timer("validate_inputs"):
+        validated_wods, validated_weights = wodCluster._validate_inputs(wods, weights)
+    index = get_similar_index()
+    features = wodCluster._prepare_features(validated_wods, validated_weights)
+    with stage_timer("similar_search"):
+        distances, indices = index.kneighbors(features, min(k, index.fit_X.shape[0]))
+    return index.describe(distances, indices)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Write the source rows used by the similar-workout endpoint.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Attach the training dataset to a model.")
+    build_parser.add_argument("model", help="Model dump, legacy directory or bundle.")
+    build_parser.add_argument("dataset", help="Training rows in model order (.csv or .parquet with wod, mean_weight).")
+    args = parser.parse_args(argv)
+
+    bundle = load_model_bundle(args.model)
+    frame = pd.read_csv(args.dataset) if args.dataset.endswith(".csv") else pd.read_parquet(args.dataset)
+    weights = frame["mean_weight"] if "mean_weight" in frame else mean_weights(frame["man_setting"])
+    check_rows(bundle, frame["wod"].tolist(), weights.tolist())
+    path = rows_path(args.model)
+    write_rows(bundle, frame["wod"].tolist(), weights.tolist(), path)
+    print(f"Wrote {len(frame)} source rows to {path}")
+
+
+if __name__ == "__main__":
+    main()
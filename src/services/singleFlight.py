@@ -0,0 +1,64 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Iterable
+
+ComputeFn = Callable[[list], Awaitable[Dict[Hashable, object]]]
+
+
+class SingleFlight:
+    """Coalesce concurrent computations of the same keys on one event loop.
+
+    ``run(keys, compute)`` calls ``compute`` only for keys no other caller is
+    already computing; keys already in flight are awaited instead, and every
+    caller receives the shared result (or exception). The computation runs as
+    its own task, so a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.computed = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, keys: Iterable[Hashable], compute: ComputeFn) -> Dict[Hashable, object]:
+        loop = asyncio.get_running_loop()
+        futures: Dict[Hashable, asyncio.Future] = {}
+        leading = []
+        for key in dict.fromkeys(keys):
+            future = self._inflight.get(key)
+            if future is None or future.get_loop() is not loop:
+                future = loop.create_future()
+                self._inflight[key] = future
+                leading.append(key)
+            else:
+                self.coalesced += 1
+            futures[key] = future
+
+        if leading:
+            self.computed += len(leading)
+            loop.create_task(self._lead(leading, compute, {key: futures[key] for key in leading}))
+
+        return {key: await asyncio.shield(future) for key, future in futures.items()}
+
+    async def _lead(self, keys: list, compute: ComputeFn, futures: Dict[Hashable, asyncio.Future]) -> None:
+        try:
+            results = await compute(keys)
+        except BaseException as exc:  # noqa: BLE001 - handed to every waiter
+            for key, future in futures.items():
+                self._release(key, future)
+                if not future.done():
+                    future.set_exception(exc)
+                    # Retrieved here so an unawaited failure is not reported at garbage collection.
+                    future.exception()
+            if not isinstance(exc, Exception):
+                raise
+            return
+        for key, future in futures.items():
+            self._release(key, future)
+            if not future.done():
+                future.set_result(results[key])
+
+    def _release(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
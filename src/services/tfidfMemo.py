@@ -0,0 +1,74 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from src.services.predictionCache import CacheTierStats, LocalPredictionCache
+from src.services.wodCanonical import WodCanonicalizer
+
+Row = Tuple[np.ndarray, np.ndarray]
+
+
+class TfidfRowMemo:
+    """Bounded memo from workout text to its TF-IDF row.
+
+    ``transform`` returns exactly what ``vectorizer.transform`` would: every row
+    is computed by the vectorizer itself and stored as its ``(indices, data)``
+    arrays, and TF-IDF rows do not depend on the other rows of the batch. Texts
+    repeated within a batch are vectorized once.
+
+    Entries are keyed by ``WodCanonicalizer`` text, so with a word analyzer
+    texts with the same tokens (case, whitespace, punctuation, stop words)
+    share one entry; the canonical text itself is what gets vectorized.
+    """
+
+    def __init__(self, vectorizer: TfidfVectorizer, maxsize: int) -> None:
+        self.vectorizer = vectorizer
+        self.n_features = len(vectorizer.vocabulary_)
+        self._cache = LocalPredictionCache(maxsize, 0)
+        self.stats = CacheTierStats("memo", "batch")
+        self.canonicalizer = WodCanonicalizer(vectorizer)
+
+    def rows(self, texts: Sequence[str]) -> Tuple[List[Row], np.ndarray]:
+        """``(indices, data)`` of each distinct canonical text and, per input text, the position of its row.
+
+        The row arrays are shared with the memo and must not be modified.
+        """
+
+        keys = self.canonicalizer.texts(texts)
+        positions: Dict[str, int] = {}
+        inverse = np.fromiter((positions.setdefault(key, len(positions)) for key in keys), np.intp, len(keys))
+        unique_keys = list(positions)
+        self.stats.record("batch", hits=len(keys) - len(unique_keys), misses=len(unique_keys))
+
+        rows: Dict[str, Row] = self._cache.get_many(unique_keys)  # type: ignore[assignment]
+        missing = [key for key in unique_keys if key not in rows]
+        self.stats.record("memo", hits=len(rows), misses=len(missing))
+        if missing:
+            computed = self.vectorizer.transform(missing).tocsr()
+            new_rows = {}
+            for i, key in enumerate(missing):
+                start, end = computed.indptr[i], computed.indptr[i + 1]
+                new_rows[key] = (computed.indices[start:end].copy(), computed.data[start:end].copy())
+            self._cache.set_many(new_rows)
+            rows.update(new_rows)
+        return [rows[key] for key in unique_keys], inverse
+
+    def transform(self, texts: Sequence[str]) -> scipy.sparse.csr_matrix:
+        unique_rows, inverse = self.rows(texts)
+        indptr = np.zeros(len(unique_rows) + 1, dtype=np.int32)
+        np.cumsum([len(indices) for indices, _ in unique_rows], out=indptr[1:])
+        if unique_rows:
+            indices = np.concatenate([indices for indices, _ in unique_rows])
+            data = np.concatenate([data for _, data in unique_rows])
+        else:
+            indices, data = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        unique = scipy.sparse.csr_matrix((data, indices, indptr), shape=(len(unique_rows), self.n_features))
+        return unique if len(unique_rows) == len(inverse) else unique[inverse]
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def snapshot(self) -> dict:
+        return {"size": len(self._cache), "maxsize": self._cache.maxsize, **self.stats.snapshot()}
@@ -0,0 +1,58 @@
+"""Canonical workout text and weights for cache keys and the TF-IDF memo.
+
+A word-analyzer ``TfidfVectorizer`` only sees the (lowercased) tokens matched
+by its ``token_pattern``, with stop words removed before n-grams are built.
+Joining exactly those tokens with single spaces therefore gives a text whose
+TF-IDF row, and so whose prediction, is identical to the original's, while
+"21-15-9 Thrusters (95 lb)" and "21 15 9  thrusters 95 LB" map to the same
+string. Vectorizers with another analyzer, a custom preprocessor/tokenizer
+or accent stripping leave the text as it is.
+
+Units inside the workout text are left alone: the model's vocabulary contains
+"lb" and number n-grams, so rewriting "43 kg" to "95 lb" would change the
+features. As in the notebook, kg loads are converted where they become the
+weight (``wodSettings.mean_setting_weight``).
+"""
+
+import re
+from typing import Optional, Sequence
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+class WodCanonicalizer:
+    """Map workout texts to a canonical form that ``vectorizer`` cannot tell apart from the original."""
+
+    def __init__(self, vectorizer: Optional[TfidfVectorizer] = None) -> None:
+        self.exact = (
+            vectorizer is not None
+            and vectorizer.analyzer == "word"
+            and vectorizer.preprocessor is None
+            and vectorizer.tokenizer is None
+            and vectorizer.strip_accents is None
+            and vectorizer.token_pattern is not None
+        )
+        if self.exact:
+            self._token_pattern = re.compile(vectorizer.token_pattern)
+            self._lowercase = bool(vectorizer.lowercase)
+            self._stop_words = vectorizer.get_stop_words() or frozenset()
+
+    def text(self, wod: str) -> str:
+        if not self.exact:
+            return wod
+        if self._lowercase:
+            wod = wod.lower()
+        stop_words = self._stop_words
+        return " ".join([token for token in self._token_pattern.findall(wod) if token not in stop_words])
+
+    def texts(self, wods: Sequence[str]) -> list[str]:
+        if not self.exact:
+            return list(wods)
+        # Batches repeat popular workouts; tokenize each distinct text once.
+        canonical = {wod: self.text(wod) for wod in set(wods)}
+        return [canonical[wod] for wod in wods]
+
+
+def canonical_weight(weight: float) -> float:
+    # -0.0 and 0.0 scale to the same feature but serialize differently.
+    return float(weight) + 0.0
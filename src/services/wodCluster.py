@@ -1,22 +1,36 @@
+import asyncio
+import atexit
 import hashlib
 import json
 import logging
 import os
-import pickle
-from typing import Iterable, Optional, Sequence, Tuple
+import threading
+import time
+from typing import Awaitable, Callable, Iterable, Optional, Sequence, Tuple
 
 import mlflow
 import numpy as np
-import scipy
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.preprocessing import StandardScaler
+
+from src.services.circuitBreaker import CircuitBreaker
+from src.services.config import env_bool, env_float, env_int
+from src.services.featureBuilder import Float32Neighbors, build_features
+from src.services.metrics import observe_batch, observe_model, register_collector, stage_timer
+from src.services.modelArtifacts import ModelBundle, load_model_bundle, model_version
+from src.services.neighborIndex import SparseNeighborIndex
+from src.services.predictionCache import CacheTierStats, LocalPredictionCache
+from src.services.predictionLogger import BackgroundPredictionLogger
+from src.services.shadowInference import get_shadow
+from src.services.singleFlight import SingleFlight
+from src.services.tfidfMemo import TfidfRowMemo
+from src.services.wodCanonical import WodCanonicalizer, canonical_weight
 
 try:  # pragma: no cover - optional dependency guard
     import redis
+    import redis.asyncio as redis_asyncio
     from redis.exceptions import RedisError
 except ImportError:  # pragma: no cover
     redis = None  # type: ignore
+    redis_asyncio = None  # type: ignore
     RedisError = Exception  # type: ignore
 
 logger = logging.getLogger(__name__)
@@ -24,25 +38,68 @@ logger = logging.getLogger(__name__)
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))         # .../src/services
 PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))  # .../WodCluster
 
-MODEL_PATH = os.path.join(PROJECT_ROOT, "models/0.214/model_vectorizer_scaler.dump")
-
-with open(MODEL_PATH, "rb") as f:
-    loaded_model = pickle.load(f)
-    wod_cluster: KNeighborsClassifier = loaded_model["model"]
-    vectorizer: TfidfVectorizer = loaded_model["vectorizer"]
-    scaler: StandardScaler = loaded_model["scaler"]
-
+# WOD_CLUSTER_MODEL_PATH accepts a pickle dump, a legacy three-pickle directory
+# (models/0.191) or a memory-mappable bundle written by src.services.modelArtifacts.
+MODEL_PATH = os.path.join(
+    PROJECT_ROOT,
+    os.getenv("WOD_CLUSTER_MODEL_PATH", "models/0.214/model_vectorizer_scaler.dump"),
+)
+MODEL_VERSION = model_version(MODEL_PATH)
+
+CLUSTER_LABELS = {
+    0: "Endurance",
+    1: "Cardio",
+    2: "Strength",
+    3: "Volume",
+}
+
+_model_bundle: Optional[ModelBundle] = None
+_model_lock = threading.Lock()
+
+# "auto" builds the sparse neighbour index once the training set has at least
+# WOD_CLUSTER_NEIGHBOR_INDEX_MIN_ROWS rows; below that brute force is faster.
+NEIGHBOR_INDEX_MODE = os.getenv("WOD_CLUSTER_NEIGHBOR_INDEX", "auto").strip().lower()
+NEIGHBOR_INDEX_MIN_ROWS = env_int("WOD_CLUSTER_NEIGHBOR_INDEX_MIN_ROWS", 20000)
+# The index answers a single row several times faster, but its per-row search loses
+# to one brute-force matrix product beyond a few rows (benchmarks.neighbor_index:
+# 21ms vs 14ms for 8 rows over 22k training rows). Larger calls use model.predict.
+NEIGHBOR_INDEX_MAX_BATCH = env_int("WOD_CLUSTER_NEIGHBOR_INDEX_MAX_BATCH", 4)
+
+_neighbor_index: Optional[SparseNeighborIndex] = None
+
+# Memo of TF-IDF rows per workout text; 0 disables it (in-batch dedup still applies).
+TFIDF_MEMO_SIZE = env_int("WOD_CLUSTER_TFIDF_MEMO_SIZE", 20000)
+_tfidf_memo: Optional[TfidfRowMemo] = None
+
+# "float32" builds float32 feature rows for Float32Neighbors (same labels, see featureBuilder).
+FEATURE_DTYPE = os.getenv("WOD_CLUSTER_FEATURE_DTYPE", "float64").strip().lower()
+_feature_dtype = np.float64
+_float32_model: Optional[Float32Neighbors] = None
 
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI")
 MLFLOW_EXPERIMENT_NAME = os.getenv("MLFLOW_EXPERIMENT_NAME", "wodfit-ml")
 MLFLOW_RUN_NAME = os.getenv("MLFLOW_RUN_NAME", "wod-cluster-prediction")
 
 _mlflow_enabled = False
+_prediction_logger: Optional[BackgroundPredictionLogger] = None
 
 if MLFLOW_TRACKING_URI:
     mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
     try:
-        mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+        _experiment = mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+        _prediction_logger = BackgroundPredictionLogger(
+            experiment_id=_experiment.experiment_id,
+            run_name=MLFLOW_RUN_NAME,
+            tags={
+                "model_path": MODEL_PATH,
+                "model_version": MODEL_VERSION,
+            },
+            max_queue=env_int("WOD_CLUSTER_MLFLOW_QUEUE_SIZE", 10000, minimum=1),
+            flush_interval=env_float("WOD_CLUSTER_MLFLOW_FLUSH_INTERVAL", 10.0),
+            max_batch=env_int("WOD_CLUSTER_MLFLOW_MAX_BATCH", 1000, minimum=1),
+            sample_rate=env_float("WOD_CLUSTER_MLFLOW_SAMPLE_RATE", 1.0),
+        )
+        atexit.register(_prediction_logger.shutdown)
         _mlflow_enabled = True
     except Exception as exc:  # pragma: no cover - remote MLflow connection failure
         logger.warning("Failed to configure MLflow tracking: %s", exc)
@@ -63,67 +120,174 @@ def _parse_cache_ttl(value: Optional[str]) -> int:
 REDIS_URL = os.getenv("REDIS_URL")
 CACHE_TTL_SECONDS = _parse_cache_ttl(os.getenv("WOD_CLUSTER_CACHE_TTL"))
 
+REDIS_CONNECT_TIMEOUT = env_float("WOD_CLUSTER_REDIS_CONNECT_TIMEOUT", 0.25)
+REDIS_TIMEOUT = env_float("WOD_CLUSTER_REDIS_TIMEOUT", 0.5)
+REDIS_MAX_CONNECTIONS = env_int("WOD_CLUSTER_REDIS_MAX_CONNECTIONS", 20, minimum=1)
+# /cluster looks up Redis on the event loop and only sends cache misses to the executor.
+ASYNC_CACHE_ENABLED = env_bool("WOD_CLUSTER_ASYNC_CACHE", True)
+
+# Shared by the sync and async clients: after repeated failures Redis is skipped
+# for a while instead of every request paying the connect timeout.
+_redis_breaker = CircuitBreaker(
+    failure_threshold=env_int("WOD_CLUSTER_REDIS_FAILURE_THRESHOLD", 3, minimum=1),
+    reset_timeout=env_float("WOD_CLUSTER_REDIS_RESET_TIMEOUT", 30.0),
+)
+
 _cache_client: Optional["redis.Redis"] = None
+# One pooled asyncio client per event loop, created on first use in that loop.
+_async_cache_client: Optional["redis_asyncio.Redis"] = None
+_async_cache_loop: Optional[asyncio.AbstractEventLoop] = None
 
 if REDIS_URL and redis is not None:
     try:
-        _cache_client = redis.Redis.from_url(REDIS_URL)
+        _cache_client = redis.Redis.from_url(
+            REDIS_URL, socket_connect_timeout=REDIS_CONNECT_TIMEOUT, socket_timeout=REDIS_TIMEOUT
+        )
     except (RedisError, ValueError) as exc:  # pragma: no cover - connection error at import time
         logger.error("Failed to create Redis client: %s", exc)
         _cache_client = None
 
+LOCAL_CACHE_SIZE = env_int("WOD_CLUSTER_LOCAL_CACHE_SIZE", 10000)
+LOCAL_CACHE_TTL_SECONDS = env_int("WOD_CLUSTER_LOCAL_CACHE_TTL", min(CACHE_TTL_SECONDS, 300))
+
+_local_cache = LocalPredictionCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TTL_SECONDS)
+# Predictions pinned by the cache warm-up (src.services.cacheWarmup); never evicted.
+_warm_predictions: dict[str, int] = {}
+_cache_stats = CacheTierStats("warm", "local", "redis")
+_single_flight = SingleFlight()
+
+
+def get_model_bundle() -> ModelBundle:
+    """Load the model on first use so that importing this module stays cheap."""
+
+    global _model_bundle, _tfidf_memo
+    if _model_bundle is None:
+        with _model_lock:
+            if _model_bundle is None:
+                bundle = load_model_bundle(MODEL_PATH)
+                _build_neighbor_index(bundle)
+                _tfidf_memo = TfidfRowMemo(bundle.vectorizer, TFIDF_MEMO_SIZE)
+                _configure_feature_dtype(bundle)
+                if _prediction_logger is not None:
+                    _prediction_logger.tags["model_class"] = bundle.model.__class__.__name__
+                logger.info("Loaded WOD cluster model %s from %s", bundle.version, MODEL_PATH)
+                _model_bundle = bundle
+    return _model_bundle
+
+
+def _build_neighbor_index(bundle: ModelBundle) -> None:
+    global _neighbor_index
+    _neighbor_index = None
+    if NEIGHBOR_INDEX_MODE in ("off", "false", "0"):
+        return
+    model = bundle.model
+    if not SparseNeighborIndex.supports(model):
+        if NEIGHBOR_INDEX_MODE in ("on", "true", "1"):
+            logger.warning("Neighbour index requested but %s is not supported.", model.__class__.__name__)
+        return
+    if NEIGHBOR_INDEX_MODE == "auto" and model._fit_X.shape[0] < NEIGHBOR_INDEX_MIN_ROWS:
+        return
+    _neighbor_index = SparseNeighborIndex(model)
+    logger.info("Built sparse neighbour index over %d training rows", _neighbor_index.n_samples)
+
+
+def _configure_feature_dtype(bundle: ModelBundle) -> None:
+    global _feature_dtype, _float32_model
+    _feature_dtype, _float32_model = np.float64, None
+    if FEATURE_DTYPE != "float32":
+        return
+    if _neighbor_index is not None or not Float32Neighbors.supports(bundle.model):
+        logger.warning("float32 features need a brute-force sparse KNN model without the neighbour index; using float64.")
+        return
+    _feature_dtype, _float32_model = np.float32, Float32Neighbors(bundle.model)
+
+
+def _predict_model(features) -> np.ndarray:
+    bundle = get_model_bundle()
+    if _neighbor_index is not None and features.shape[0] <= NEIGHBOR_INDEX_MAX_BATCH:
+        return _neighbor_index.predict(features)
+    return bundle.model.predict(features)
+
+
+def __getattr__(name: str):
+    # Keep ``wod_cluster``/``vectorizer``/``scaler`` importable as module attributes.
+    if name == "wod_cluster":
+        return get_model_bundle().model
+    if name == "vectorizer":
+        return get_model_bundle().vectorizer
+    if name == "scaler":
+        return get_model_bundle().scaler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class InvalidInputError(ValueError):
+    """A ``ValueError`` that knows which request field it is about, e.g. ``("wods", 0)``."""
+
+    def __init__(self, message: str, loc: Sequence = ()) -> None:
+        super().__init__(message)
+        self.loc = tuple(loc)
+
 
 def _ensure_iterable(name: str, values: Iterable) -> Sequence:
     if isinstance(values, (list, tuple)):
         return list(values)
     if isinstance(values, np.ndarray):
         return values.tolist()
-    raise ValueError(f"{name} must be provided as a list.")
+    raise InvalidInputError(f"{name} must be provided as a list.", (name,))
 
 
 def _validate_wods(wods: Sequence[str]) -> list[str]:
     if not wods:
-        raise ValueError("At least one workout description must be provided.")
+        raise InvalidInputError("At least one workout description must be provided.", ("wods",))
 
     cleaned_wods: list[str] = []
     for idx, wod in enumerate(wods):
+        # Numbers are accepted as text, as the former ``List[str]`` request model coerced them.
+        if isinstance(wod, (int, float)):
+            wod = str(wod)
         if not isinstance(wod, str):
-            raise ValueError(f"wods[{idx}] must be a string.")
+            raise InvalidInputError(f"wods[{idx}] must be a string.", ("wods", idx))
         cleaned = wod.strip()
         if not cleaned:
-            raise ValueError("Workout descriptions cannot be empty strings.")
+            raise InvalidInputError("Workout descriptions cannot be empty strings.", ("wods", idx))
         cleaned_wods.append(cleaned)
 
     return cleaned_wods
 
 
 def _validate_weights(weights: Sequence[float], expected_length: int) -> np.ndarray:
-    if not weights:
-        raise ValueError("At least one workout weight must be provided.")
+    if len(weights) == 0:
+        raise InvalidInputError("At least one workout weight must be provided.", ("weights",))
     if len(weights) != expected_length:
-        raise ValueError("The number of weights must match the number of workouts.")
+        raise InvalidInputError("The number of weights must match the number of workouts.", ("weights",))
 
     try:
         weights_array = np.asarray(weights, dtype=float)
     except (TypeError, ValueError) as exc:
-        raise ValueError("Weights must be numeric values.") from exc
+        raise InvalidInputError("Weights must be numeric values.", ("weights",)) from exc
+
+    if weights_array.ndim != 1:
+        raise InvalidInputError("Weights must be a flat list of numbers.", ("weights",))
 
-    if not np.isfinite(weights_array).all():
-        raise ValueError("Weights must be finite numbers.")
+    finite = np.isfinite(weights_array)
+    if not finite.all():
+        raise InvalidInputError("Weights must be finite numbers.", ("weights", int(np.argmin(finite))))
 
     return weights_array.reshape(-1, 1)
 
 
 def _validate_inputs(wods: Iterable[str], weights: Iterable[float]) -> Tuple[list[str], np.ndarray]:
     validated_wods = _validate_wods(_ensure_iterable("wods", wods))
-    validated_weights = _validate_weights(_ensure_iterable("weights", weights), len(validated_wods))
+    # Arrays (e.g. decoded from an Arrow body) are checked as they are, without a round trip through a list.
+    if not (isinstance(weights, np.ndarray) and weights.ndim == 1):
+        weights = _ensure_iterable("weights", weights)
+    validated_weights = _validate_weights(weights, len(validated_wods))
     return validated_wods, validated_weights
 
 
-def _prepare_features(validated_wods: list[str], validated_weights: np.ndarray):
-    tfidf_vec = vectorizer.transform(validated_wods)
-    scaled_weights = scaler.transform(validated_weights)
-    return scipy.sparse.hstack([tfidf_vec, scaled_weights])
+def _prepare_features(validated_wods: list[str], validated_weights: np.ndarray, dtype=np.float64):
+    bundle = get_model_bundle()
+    return build_features(_tfidf_memo, bundle.scaler, validated_wods, validated_weights, dtype)
 
 
 def preprocess(wods: list[str], weights: list[float]):
@@ -139,91 +303,430 @@ def preprocess(wods: list[str], weights: list[float]):
     return _prepare_features(validated_wods, validated_weights)
 
 
-def _build_cache_key(wods: list[str], weights: list[float]) -> str:
-    payload = json.dumps({"wods": wods, "weights": weights}, sort_keys=True, separators=(",", ":")).encode("utf-8")
+def get_canonicalizer() -> WodCanonicalizer:
+    get_model_bundle()
+    return _tfidf_memo.canonicalizer
+
+
+def _build_cache_key(wod: str, weight: float) -> str:
+    """Key of one row; ``wod`` must already be canonical (see ``_build_cache_keys``)."""
+
+    payload = json.dumps([wod, canonical_weight(weight)], separators=(",", ":")).encode("utf-8")
     digest = hashlib.sha256(payload).hexdigest()
-    return f"wod-cluster:{digest}"
+    return f"wod-cluster:{MODEL_VERSION}:item:{digest}"
 
 
-def _fetch_cached_predictions(cache_key: str) -> Optional[list[int]]:
-    if _cache_client is None:
-        return None
-    try:
-        cached = _cache_client.get(cache_key)
-    except RedisError as exc:  # pragma: no cover - network failure
-        logger.warning("Redis get failed for key %s: %s", cache_key, exc)
-        return None
-    if cached is None:
-        return None
+def _build_cache_keys(wods: Sequence[str], weights: Sequence[float]) -> list[str]:
+    # Workouts the vectorizer cannot tell apart share a key, and so a cached prediction.
+    canonical = get_canonicalizer().texts(wods)
+    return [_build_cache_key(wod, weight) for wod, weight in zip(canonical, weights)]
+
+
+def _decode_cached_prediction(cache_key: str, cached) -> Optional[int]:
     if isinstance(cached, (bytes, bytearray, memoryview)):
         cached = bytes(cached).decode("utf-8")
     try:
-        data = json.loads(cached)
-    except (TypeError, json.JSONDecodeError):
-        logger.debug("Invalid JSON payload in cache for key %s", cache_key)
+        return int(cached)
+    except (TypeError, ValueError):
+        logger.debug("Invalid cached prediction for key %s: %r", cache_key, cached)
         return None
-    if isinstance(data, list):
-        return data
-    logger.debug("Unexpected cache payload type for key %s: %s", cache_key, type(data))
-    return None
 
 
-def _store_cached_predictions(cache_key: str, predictions: list[int]) -> None:
-    if _cache_client is None:
+def _redis_failed(operation: str, n_keys: int, exc: Exception) -> None:
+    logger.warning("Redis %s failed for %d keys: %s", operation, n_keys, exc)
+    _cache_stats.record("redis", errors=1)
+    _redis_breaker.record_failure()
+
+
+def _remember_redis_hits(keys: list[str], cached_values: list) -> dict[str, int]:
+    _redis_breaker.record_success()
+    redis_hits = {}
+    for key, cached in zip(keys, cached_values):
+        if cached is None:
+            continue
+        prediction = _decode_cached_prediction(key, cached)
+        if prediction is not None:
+            redis_hits[key] = prediction
+    _cache_stats.record("redis", hits=len(redis_hits), misses=len(keys) - len(redis_hits))
+    _local_cache.set_many(redis_hits)
+    return redis_hits
+
+
+def _fetch_local_predictions(cache_keys: list[str]) -> Tuple[dict, list[str]]:
+    unique_keys = list(dict.fromkeys(cache_keys))
+    with stage_timer("local_cache_get"):
+        found = {}
+        if _warm_predictions:
+            found = {key: _warm_predictions[key] for key in unique_keys if key in _warm_predictions}
+            _cache_stats.record("warm", hits=len(found), misses=len(unique_keys) - len(found))
+            unique_keys = [key for key in unique_keys if key not in found]
+        local = _local_cache.get_many(unique_keys)
+    _cache_stats.record("local", hits=len(local), misses=len(unique_keys) - len(local))
+    found.update(local)
+    return found, [key for key in unique_keys if key not in local]
+
+
+def pin_predictions(predictions: dict[str, int]) -> None:
+    """Serve ``predictions`` from memory for the life of the process (cache warm-up)."""
+
+    _warm_predictions.update(predictions)
+
+
+def _fetch_cached_predictions(cache_keys: list[str]) -> list[Optional[int]]:
+    found, remaining = _fetch_local_predictions(cache_keys)
+    if remaining and _cache_client is not None and _redis_breaker.allow():
+        try:
+            with stage_timer("redis_get"):
+                pipeline = _cache_client.pipeline(transaction=False)
+                pipeline.mget(remaining)
+                (cached_values,) = pipeline.execute()
+        except RedisError as exc:  # pragma: no cover - network failure
+            _redis_failed("mget", len(remaining), exc)
+        else:
+            found.update(_remember_redis_hits(remaining, cached_values))
+
+    return [found.get(key) for key in cache_keys]
+
+
+def _store_cached_predictions(predictions: dict[str, int]) -> None:
+    if not predictions:
+        return
+    _local_cache.set_many(predictions)
+    if _cache_client is None or not _redis_breaker.allow():
         return
     try:
-        payload = json.dumps(predictions)
+        with stage_timer("redis_set"):
+            pipeline = _cache_client.pipeline(transaction=False)
+            _queue_cache_writes(pipeline, predictions)
+            pipeline.execute()
+    except RedisError as exc:  # pragma: no cover - network failure
+        _redis_failed("set", len(predictions), exc)
+    else:
+        _redis_breaker.record_success()
+
+
+def _queue_cache_writes(pipeline, predictions: dict[str, int]) -> None:
+    for cache_key, prediction in predictions.items():
         if CACHE_TTL_SECONDS > 0:
-            _cache_client.setex(cache_key, CACHE_TTL_SECONDS, payload)
+            pipeline.setex(cache_key, CACHE_TTL_SECONDS, prediction)
         else:
-            _cache_client.set(cache_key, payload)
+            pipeline.set(cache_key, prediction)
+
+
+def _get_async_cache_client() -> Optional["redis_asyncio.Redis"]:
+    global _async_cache_client, _async_cache_loop
+    if not REDIS_URL or redis_asyncio is None:
+        return None
+    loop = asyncio.get_running_loop()
+    if _async_cache_client is None or _async_cache_loop is not loop:
+        try:
+            # Blocking pool: when all connections are busy callers wait up to the
+            # socket timeout for one instead of failing immediately.
+            pool = redis_asyncio.BlockingConnectionPool.from_url(
+                REDIS_URL,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=REDIS_TIMEOUT,
+                socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                socket_timeout=REDIS_TIMEOUT,
+            )
+        except ValueError as exc:  # pragma: no cover - malformed URL
+            logger.error("Failed to create async Redis client: %s", exc)
+            return None
+        _async_cache_client = redis_asyncio.Redis(connection_pool=pool)
+        _async_cache_loop = loop
+    return _async_cache_client
+
+
+async def close_async_cache_client() -> None:
+    global _async_cache_client, _async_cache_loop
+    client, _async_cache_client, _async_cache_loop = _async_cache_client, None, None
+    if client is not None:
+        await client.aclose(close_connection_pool=True)
+
+
+async def _fetch_cached_predictions_async(cache_keys: list[str]) -> list[Optional[int]]:
+    found, remaining = _fetch_local_predictions(cache_keys)
+    client = _get_async_cache_client() if remaining else None
+    if client is not None and _redis_breaker.allow():
+        try:
+            with stage_timer("redis_get"):
+                cached_values = await client.mget(remaining)
+        except RedisError as exc:  # pragma: no cover - network failure
+            _redis_failed("mget", len(remaining), exc)
+        else:
+            found.update(_remember_redis_hits(remaining, cached_values))
+
+    return [found.get(key) for key in cache_keys]
+
+
+async def _store_cached_predictions_async(predictions: dict[str, int]) -> None:
+    if not predictions:
+        return
+    _local_cache.set_many(predictions)
+    client = _get_async_cache_client()
+    if client is None or not _redis_breaker.allow():
+        return
+    try:
+        with stage_timer("redis_set"):
+            pipeline = client.pipeline(transaction=False)
+            _queue_cache_writes(pipeline, predictions)
+            await pipeline.execute()
     except RedisError as exc:  # pragma: no cover - network failure
-        logger.warning("Redis set failed for key %s: %s", cache_key, exc)
+        _redis_failed("set", len(predictions), exc)
+    else:
+        _redis_breaker.record_success()
+
+
+def get_cache_stats() -> dict:
+    return {
+        "tiers": _cache_stats.snapshot(),
+        "warm_size": len(_warm_predictions),
+        "local_size": len(_local_cache),
+        "local_maxsize": _local_cache.maxsize,
+        "redis_enabled": _cache_client is not None,
+        "redis_circuit": _redis_breaker.snapshot(),
+        "singleflight": {"computed": _single_flight.computed, "coalesced": _single_flight.coalesced},
+        "tfidf_memo": _tfidf_memo.snapshot() if _tfidf_memo is not None else None,
+    }
+
+
+def clear_local_caches() -> None:
+    """Drop in-process cached predictions and TF-IDF rows; Redis is left untouched."""
+
+    _local_cache.clear()
+    if _tfidf_memo is not None:
+        _tfidf_memo.clear()
 
 
 def _log_prediction_event(wods: list[str], weights: list[float], predictions: list[int], cache_hit: bool) -> None:
-    if not _mlflow_enabled:
+    if _prediction_logger is None:
         return
 
-    try:
-        with mlflow.start_run(run_name=MLFLOW_RUN_NAME, nested=True):
-            mlflow.log_params(
-                {
-                    "cache_hit": cache_hit,
-                    "num_wods": len(wods),
-                }
-            )
-            mlflow.log_metric("unique_clusters", len(set(predictions)))
-            mlflow.set_tags(
-                {
-                    "model_path": MODEL_PATH,
-                    "model_class": wod_cluster.__class__.__name__,
-                }
-            )
-            mlflow.log_dict(
-                {
-                    "wods": wods,
-                    "weights": weights,
-                    "predictions": predictions,
-                },
-                "prediction_payload.json",
-            )
-    except Exception as exc:  # pragma: no cover - logging must not block inference
-        logger.warning("Failed to log prediction to MLflow: %s", exc)
+    with stage_timer("mlflow_enqueue"):
+        _prediction_logger.log(
+            {
+                "cache_hit": cache_hit,
+                "wods": wods,
+                "weights": weights,
+                "predictions": predictions,
+            }
+        )
 
 
-def predictCluster(wods: list[str], weights: list[float]):
-    validated_wods, validated_weights = _validate_inputs(wods, weights)
+def _shadow_event(wods: list[str], weights: list[float], predictions: list[int]) -> None:
+    # Configured by the server's startup hook only, so CLIs and inference workers never shadow.
+    shadow = get_shadow()
+    if shadow is None:
+        return
+
+    with stage_timer("shadow_enqueue"):
+        shadow.submit(wods, weights, predictions)
+
+
+def get_prediction_logger_stats() -> Optional[dict]:
+    if _prediction_logger is None:
+        return None
+    return _prediction_logger.stats()
+
+
+def shutdown_prediction_logger() -> None:
+    if _prediction_logger is not None:
+        _prediction_logger.shutdown()
+
+
+# Computes the labels of validated cache misses: (wods, (n, 1) weights) -> labels.
+ComputeRowsFn = Callable[[list[str], np.ndarray], list[int]]
+
+
+def _compute_predictions(validated_wods: list[str], validated_weights: np.ndarray) -> list[int]:
+    started = time.perf_counter()
+    processed = _prepare_features(validated_wods, validated_weights, _feature_dtype)
+    with stage_timer("model_predict"):
+        if _float32_model is None:
+            predictions = _predict_model(processed).tolist()
+        else:
+            labels, uncertain = _float32_model.predict(processed)
+            if len(uncertain):
+                exact = _prepare_features([validated_wods[i] for i in uncertain], validated_weights[uncertain])
+                labels[uncertain] = _predict_model(exact)
+            predictions = labels.tolist()
+    observe_model(MODEL_VERSION, time.perf_counter() - started)
+    return predictions
+
+
+def _predict_validated(
+    validated_wods: list[str], validated_weights: np.ndarray, compute: Optional[ComputeRowsFn] = None
+) -> Tuple[list[int], list[bool]]:
+    observe_batch(len(validated_wods))
     normalized_weights = validated_weights.reshape(-1).astype(float).tolist()
-    cache_key = _build_cache_key(validated_wods, normalized_weights)
+    with stage_timer("cache_key"):
+        cache_keys = _build_cache_keys(validated_wods, normalized_weights)
+
+    preds = _fetch_cached_predictions(cache_keys)
+    cached = [pred is not None for pred in preds]
+    missing = [idx for idx, hit in enumerate(cached) if not hit]
+
+    if missing:
+        compute = compute or _compute_predictions
+        computed = compute([validated_wods[idx] for idx in missing], validated_weights[missing])
+        for idx, pred in zip(missing, computed):
+            preds[idx] = pred
+        _store_cached_predictions({cache_keys[idx]: preds[idx] for idx in missing})
+
+    return preds, cached
+
+
+def predictClusterBatch(
+    requests: Sequence[Tuple[list[str], list[float]]], compute: Optional[ComputeRowsFn] = None
+) -> list[list[int]]:
+    """Predict several independent requests with one feature/predict pass.
+
+    Every request is validated on its own, the rows are concatenated so that
+    cache misses from all requests share a single ``_prepare_features`` and
+    ``wod_cluster.predict`` call, and the predictions are sliced back per request.
+    ``compute`` replaces that call for the misses (``InferencePool.compute``
+    sends them to a worker process); caching and logging stay in this process.
+    """
 
-    cached_predictions = _fetch_cached_predictions(cache_key)
-    if cached_predictions is not None:
-        _log_prediction_event(validated_wods, normalized_weights, cached_predictions, cache_hit=True)
-        return cached_predictions
+    with stage_timer("validate_inputs"):
+        validated = [_validate_inputs(wods, weights) for wods, weights in requests]
+    if not validated:
+        return []
 
-    processed = _prepare_features(validated_wods, validated_weights)
-    preds = wod_cluster.predict(processed).tolist()
-    _store_cached_predictions(cache_key, preds)
-    _log_prediction_event(validated_wods, normalized_weights, preds, cache_hit=False)
+    all_wods = [wod for wods, _ in validated for wod in wods]
+    all_weights = np.vstack([weights for _, weights in validated])
+    preds, cached = _predict_validated(all_wods, all_weights, compute)
+
+    results: list[list[int]] = []
+    offset = 0
+    for wods, weights in validated:
+        end = offset + len(wods)
+        request_preds = preds[offset:end]
+        request_weights = weights.reshape(-1).astype(float).tolist()
+        _log_prediction_event(wods, request_weights, request_preds, cache_hit=all(cached[offset:end]))
+        _shadow_event(wods, request_weights, request_preds)
+        results.append(request_preds)
+        offset = end
+    return results
+
+
+def predictCluster(wods: list[str], weights: list[float], compute: Optional[ComputeRowsFn] = None):
+    return predictClusterBatch([(wods, weights)], compute)[0]
+
+
+def computeClusterBatch(requests: Sequence[Tuple[list[str], list[float]]]) -> list[list[int]]:
+    """Like ``predictClusterBatch`` but without validation, caching or prediction logging.
+
+    Used for the misses of ``predictClusterAsync``, which has already validated
+    the rows and owns the caching.
+    """
+
+    if not requests:
+        return []
+    computed = _compute_predictions(
+        [wod for wods, _ in requests for wod in wods],
+        np.concatenate([np.asarray(weights, dtype=float) for _, weights in requests]).reshape(-1, 1),
+    )
+    results: list[list[int]] = []
+    offset = 0
+    for wods, _ in requests:
+        results.append(computed[offset : offset + len(wods)])
+        offset += len(wods)
+    return results
+
+
+def computeCluster(wods: list[str], weights: list[float]) -> list[int]:
+    return computeClusterBatch([(wods, weights)])[0]
+
+
+ComputeFn = Callable[[list[str], list[float]], Awaitable[list[int]]]
+
+
+async def _compute_in_executor(wods: list[str], weights: list[float]) -> list[int]:
+    return await asyncio.get_running_loop().run_in_executor(None, computeCluster, wods, weights)
+
+
+async def predictClusterAsync(
+    wods: list[str], weights: list[float], compute: Optional[ComputeFn] = None
+) -> list[int]:
+    """``predictCluster`` for the event loop.
+
+    Cache hits (local, then Redis through the pooled asyncio client) are served
+    without leaving the loop. Only the misses are passed to ``compute`` (by
+    default ``computeCluster`` in the default executor); a miss another request
+    is already computing is awaited instead of computed twice.
+    """
+
+    with stage_timer("validate_inputs"):
+        validated_wods, validated_weights = _validate_inputs(wods, weights)
+    observe_batch(len(validated_wods))
+    normalized_weights = validated_weights.reshape(-1).astype(float).tolist()
+    if _model_bundle is None:
+        # Keys depend on the vectorizer; wait for the model without blocking the loop.
+        await asyncio.get_running_loop().run_in_executor(None, get_model_bundle)
+    with stage_timer("cache_key"):
+        cache_keys = _build_cache_keys(validated_wods, normalized_weights)
+
+    preds = await _fetch_cached_predictions_async(cache_keys)
+    missing = [idx for idx, pred in enumerate(preds) if pred is None]
+
+    if missing:
+        compute = compute or _compute_in_executor
+        rows = {cache_keys[idx]: (validated_wods[idx], normalized_weights[idx]) for idx in missing}
+
+        async def compute_keys(keys: list[str]) -> dict[str, int]:
+            computed = await compute([rows[key][0] for key in keys], [rows[key][1] for key in keys])
+            predictions = dict(zip(keys, computed))
+            # Stored before the keys leave the single-flight table, so that a
+            # request arriving in between finds them in the local cache.
+            await _store_cached_predictions_async(predictions)
+            return predictions
+
+        shared = await _single_flight.run(rows, compute_keys)
+        for idx in missing:
+            preds[idx] = shared[cache_keys[idx]]
+
+    _log_prediction_event(validated_wods, normalized_weights, preds, cache_hit=not missing)
+    _shadow_event(validated_wods, normalized_weights, preds)
     return preds
+
+
+def _collect_cache_metrics():
+    for tier, counts in _cache_stats.snapshot().items():
+        for result, value in counts.items():
+            yield "wodfit_cache_requests_total", {"tier": tier, "result": result}, value
+    if _tfidf_memo is not None:
+        for tier, counts in _tfidf_memo.stats.snapshot().items():
+            for result in ("hits", "misses"):
+                yield "wodfit_cache_requests_total", {"tier": f"tfidf_{tier}", "result": result}, counts[result]
+    # Misses of predictClusterAsync: computed here or shared with a request already computing them.
+    yield "wodfit_cache_requests_total", {"tier": "singleflight", "result": "hits"}, _single_flight.coalesced
+    yield "wodfit_cache_requests_total", {"tier": "singleflight", "result": "misses"}, _single_flight.computed
+
+
+def _collect_circuit_metrics():
+    snapshot = _redis_breaker.snapshot()
+    for state in ("closed", "open", "half_open"):
+        yield "wodfit_redis_circuit_state", {"state": state}, int(snapshot["state"] == state)
+
+
+def _collect_logger_metrics():
+    stats = get_prediction_logger_stats()
+    if stats is None:
+        return
+    for name, value in stats.items():
+        yield "wodfit_mlflow_events", {"state": name}, value
+
+
+register_collector(
+    "wodfit_cache_requests_total", "counter", "Cache lookups by tier and result.", _collect_cache_metrics
+)
+register_collector(
+    "wodfit_mlflow_events", "gauge", "Prediction logger counters and current queue length.", _collect_logger_metrics
+)
+register_collector(
+    "wodfit_redis_circuit_state",
+    "gauge",
+    "Redis circuit breaker state (1 for the current state).",
+    _collect_circuit_metrics,
+)
@@ -0,0 +1,252 @@
+"""Cluster-count selection and WOD cluster model training, as a reproducible CLI.
+
+Follows ``notebooks/wod_cluster.ipynb``:
+
+1. ``make_vector``: TF-IDF of the workout text plus the standardized mean
+   weight (times ``alpha``) and median record columns,
+2. fit KMeans (and optionally a Gaussian mixture) for every candidate ``k``
+   and keep the candidate with the best silhouette score,
+3. train the serving KNN (TF-IDF 1-3 grams, 1000 features, English stop
+   words + standardized weight, ``k=8``, distance weights) on those labels and
+   pickle it as the ``{"model", "vectorizer", "scaler"}`` dump that
+   ``src.services.wodCluster`` loads, with the ``similar_rows.json`` source
+   rows used by ``src.services.similarWods``.
+
+The feature matrix is built once per run. The (algorithm, k, alpha) candidates
+are fanned out over a process pool, and each worker receives the matrix once
+through the pool initializer. Silhouette scores are exact (O(n²)) up to
+``--silhouette-sample`` rows; larger corpora are scored on a seeded random
+sample. Every random step takes ``--seed``, and the selection report is
+written next to the dump.
+
+Cluster ids are whatever the clustering assigns. Check ``clusters`` in the
+report before mapping them to names in ``CLUSTER_LABELS``.
+
+    python -m src.services.wodClusterTraining wod_fortime_median.parquet -o models/0.215/model_vectorizer_scaler.dump \\
+        --k 3 4 5 6 --alpha 0.5 1 2 --workers 4
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+import sklearn
+from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import silhouette_score
+from sklearn.mixture import GaussianMixture
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+
+from src.services.modelArtifacts import ModelBundle, model_version
+from src.services.similarWods import rows_path, write_rows
+from src.services.wodPreprocessing import add_mean_weight
+
+MIN_RECORD_SECONDS = 240
+DEFAULT_SILHOUETTE_SAMPLE = 5000
+ALGORITHMS = ("kmeans", "gmm")
+
+Candidate = Tuple[str, int, float]
+
+# Set once per worker process by _init_worker.
+_base_features: Optional[scipy.sparse.csr_matrix] = None
+_silhouette_sample: Optional[int] = None
+_seed = 0
+_dense_cache: Dict[float, np.ndarray] = {}
+
+
+def load_dataset(path: str, min_record_seconds: float = MIN_RECORD_SECONDS) -> pd.DataFrame:
+    """Read a ``wodPreprocessing`` output (Parquet or CSV) and apply the notebook's record filter."""
+
+    frame = pd.read_csv(path) if path.endswith(".csv") else pd.read_parquet(path)
+    frame = frame[frame["median_record_seconds"] > min_record_seconds]
+    if "mean_weight" not in frame:
+        frame = add_mean_weight(frame)
+    return frame.reset_index(drop=True)
+
+
+def make_vector(wods: Iterable[str], weights: pd.Series, records: pd.Series) -> scipy.sparse.csr_matrix:
+    """Notebook ``make_vector`` with ``alpha=1``; the weight is the second to last column."""
+
+    tfidf = TfidfVectorizer(ngram_range=(1, 1), max_features=None).fit_transform(wods)
+    weights_scaled = StandardScaler().fit_transform(np.asarray(weights, dtype=float).reshape(-1, 1))
+    records_scaled = StandardScaler().fit_transform(np.asarray(records, dtype=float).reshape(-1, 1))
+    return scipy.sparse.hstack([tfidf, weights_scaled, records_scaled], format="csr")
+
+
+def with_alpha(features: scipy.sparse.csr_matrix, alpha: float) -> scipy.sparse.csr_matrix:
+    if alpha == 1.0:
+        return features
+    scale = np.ones(features.shape[1])
+    scale[-2] = alpha
+    return features @ scipy.sparse.diags(scale, format="csr")
+
+
+def _init_worker(features: scipy.sparse.csr_matrix, silhouette_sample: Optional[int], seed: int) -> None:
+    global _base_features, _silhouette_sample, _seed
+    _base_features, _silhouette_sample, _seed = features, silhouette_sample, seed
+    _dense_cache.clear()
+
+
+def _silhouette(features, labels: np.ndarray) -> float:
+    if len(np.unique(labels)) < 2:
+        return float("nan")
+    sample = _silhouette_sample if _silhouette_sample and _silhouette_sample < features.shape[0] else None
+    return float(silhouette_score(features, labels, sample_size=sample, random_state=_seed))
+
+
+def evaluate_candidate(candidate: Candidate) -> dict:
+    """Fit one (algorithm, k, alpha) candidate on the worker's matrix and score it."""
+
+    algorithm, k, alpha = candidate
+    features = with_alpha(_base_features, alpha)
+    started = time.perf_counter()
+    if algorithm == "kmeans":
+        labels = KMeans(n_clusters=k, max_iter=500, random_state=_seed).fit_predict(features)
+    elif algorithm == "gmm":
+        if alpha not in _dense_cache:
+            _dense_cache[alpha] = features.toarray()
+        features = _dense_cache[alpha]
+        labels = GaussianMixture(n_components=k, max_iter=500, random_state=_seed, init_params="kmeans").fit_predict(
+            features
+        )
+    else:
+        raise ValueError(f"Unknown clustering algorithm: {algorithm}")
+    fit_seconds = time.perf_counter() - started
+    score = _silhouette(features, labels)
+    return {
+        "algorithm": algorithm,
+        "k": k,
+        "alpha": alpha,
+        "silhouette": score,
+        "sizes": np.bincount(labels, minlength=k).tolist(),
+        "fit_seconds": round(fit_seconds, 3),
+        "silhouette_seconds": round(time.perf_counter() - started - fit_seconds, 3),
+        "labels": labels.tolist(),
+    }
+
+
+def sweep(
+    features: scipy.sparse.csr_matrix,
+    candidates: List[Candidate],
+    workers: int = 1,
+    silhouette_sample: Optional[int] = DEFAULT_SILHOUETTE_SAMPLE,
+    seed: int = 0,
+) -> List[dict]:
+    """Score every candidate, in a process pool when ``workers > 1``; results keep the candidate order."""
+
+    initargs = (features, silhouette_sample, seed)
+    if workers <= 1:
+        _init_worker(*initargs)
+        return [evaluate_candidate(candidate) for candidate in candidates]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        return list(pool.map(evaluate_candidate, candidates))
+
+
+def best_result(results: List[dict]) -> dict:
+    scored = [result for result in results if not np.isnan(result["silhouette"])]
+    if not scored:
+        raise ValueError("No candidate produced at least two clusters.")
+    return max(scored, key=lambda result: result["silhouette"])
+
+
+def train_classifier(wods: pd.Series, weights: pd.Series, labels: np.ndarray, n_neighbors: int = 8) -> dict:
+    """Notebook cell that trains the served model; returns the dump dict."""
+
+    vectorizer = TfidfVectorizer(ngram_range=(1, 3), max_features=1000, stop_words="english")
+    tfidf = vectorizer.fit_transform(wods)
+    scaler = StandardScaler()
+    weight_scaled = scaler.fit_transform(np.asarray(weights, dtype=float).reshape(-1, 1))
+    model = KNeighborsClassifier(n_neighbors=n_neighbors, weights="distance")
+    model.fit(scipy.sparse.hstack([tfidf, weight_scaled]), labels)
+    return {"model": model, "vectorizer": vectorizer, "scaler": scaler}
+
+
+def cluster_summary(frame: pd.DataFrame, labels: np.ndarray) -> List[dict]:
+    grouped = frame.assign(cluster=labels).groupby("cluster")
+    summary = grouped.agg(
+        size=("wod", "size"),
+        mean_weight=("mean_weight", "median"),
+        median_record_seconds=("median_record_seconds", "median"),
+    )
+    examples = grouped["wod"].apply(lambda wods: wods.head(3).tolist())
+    return [
+        {
+            "cluster": int(cluster),
+            "size": int(row["size"]),
+            "mean_weight": float(row["mean_weight"]),
+            "median_record_seconds": float(row["median_record_seconds"]),
+            "examples": examples[cluster],
+        }
+        for cluster, row in summary.iterrows()
+    ]
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Select the cluster count and train the WOD cluster model.")
+    parser.add_argument("dataset", help="wodPreprocessing output (.parquet or .csv).")
+    parser.add_argument("-o", "--output", required=True, help="Dump path, e.g. models/0.215/model_vectorizer_scaler.dump")
+    parser.add_argument("--k", type=int, nargs="+", default=[4])
+    parser.add_argument("--alpha", type=float, nargs="+", default=[1.0], help="Weight column multipliers.")
+    parser.add_argument("--algorithm", choices=ALGORITHMS, nargs="+", default=["kmeans"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--silhouette-sample",
+        type=int,
+        default=DEFAULT_SILHOUETTE_SAMPLE,
+        help="Score on this many sampled rows when the corpus is larger (0 = always exact).",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-record-seconds", type=float, default=MIN_RECORD_SECONDS)
+    parser.add_argument("--n-neighbors", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    frame = load_dataset(args.dataset, args.min_record_seconds)
+    started = time.perf_counter()
+    features = make_vector(frame["wod"], frame["mean_weight"], frame["median_record_seconds"])
+    candidates = [(algorithm, k, alpha) for algorithm in args.algorithm for k in args.k for alpha in args.alpha]
+    results = sweep(features, candidates, args.workers, args.silhouette_sample or None, args.seed)
+    best = best_result(results)
+    for result in results:
+        print(
+            f"{result['algorithm']:>6} k={result['k']:<3} alpha={result['alpha']:<5g} "
+            f"silhouette={result['silhouette']:.4f} sizes={result['sizes']}"
+        )
+    print(f"Selected {best['algorithm']} k={best['k']} alpha={best['alpha']:g}")
+
+    labels = np.asarray(best["labels"])
+    dump = train_classifier(frame["wod"], frame["mean_weight"], labels, args.n_neighbors)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "wb") as f:
+        pickle.dump(dump, f)
+    # Source rows for the similar-workout endpoint.
+    bundle = ModelBundle(path=args.output, version=model_version(args.output), **dump)
+    write_rows(bundle, frame["wod"].tolist(), frame["mean_weight"].tolist(), rows_path(args.output))
+
+    report = {
+        "dataset": args.dataset,
+        "rows": int(len(frame)),
+        "features": int(features.shape[1]),
+        "seed": args.seed,
+        "silhouette_sample": args.silhouette_sample or None,
+        "versions": {"sklearn": sklearn.__version__, "numpy": np.__version__},
+        "seconds": round(time.perf_counter() - started, 3),
+        "selected": {key: best[key] for key in ("algorithm", "k", "alpha", "silhouette")},
+        "candidates": [{key: value for key, value in result.items() if key != "labels"} for result in results],
+        "clusters": cluster_summary(frame, labels),
+    }
+    report_path = os.path.join(os.path.dirname(os.path.abspath(args.output)), "selection.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Wrote {args.output} and {report_path}")
+
+
+if __name__ == "__main__":
+    main()
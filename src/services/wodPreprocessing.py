@@ -0,0 +1,145 @@
+"""Chunked, vectorized version of the notebook dataset preparation.
+
+Reproduces ``notebooks/wod_data_preprocessing.ipynb`` (crawler CSVs ->
+``wod_fortime_median``) and the ``mean_weight`` column of
+``notebooks/wod_cluster.ipynb`` with column-wise string/regex operations and
+groupby transforms instead of per-row ``apply`` lambdas:
+
+1. drop rows without ``wod``/``athlete``/``comment`` and keep "for time" WODs,
+2. parse ``m:ss`` records from the comments into ``record_seconds``,
+3. drop per-WOD IQR outliers (``0.5 * IQR`` fences, as in the notebook),
+4. take the per-date median record, one row per date, newest first,
+5. add ``mean_weight`` from ``man_setting`` (kg converted to lb).
+
+Crawler CSVs are read ``chunk_size`` rows at a time and only the columns the
+later steps need are kept, so memory grows with the number of "for time"
+records rather than the size of the crawl. The result is written as Parquet.
+
+    python -m src.services.wodPreprocessing wod_data2024.csv wod_data2025.csv -o wod_fortime_median.parquet
+"""
+
+import argparse
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+import pandas as pd
+
+from src.services.config import env_int
+from src.services.wodSettings import mean_setting_weight
+
+DEFAULT_CHUNK_SIZE = env_int("WOD_PREPROCESS_CHUNK_SIZE", 100_000, minimum=1)
+
+REQUIRED_COLUMNS = ("wod", "athlete", "comment")
+RECORD_COLUMNS = ["date", "wod", "man_setting", "woman_setting", "record_seconds"]
+MEDIAN_COLUMNS = ["date", "wod", "man_setting", "woman_setting", "median_record_seconds"]
+
+_RECORD = r"(\d+):(\d+)"
+# One pass over the notebook's two kg rewrites and its lb findall (see wodSettings):
+# "<n>[ -]kg" -> round(n * 2.2) lb, "<n>[ -]*lb" -> n.
+_SETTING_WEIGHT = r"(?P<value>\d+(?:\.\d+)?)(?:(?P<kg>[\s\-]?kg)|[\s\-]*lb)"
+# "2.5.5kg": the notebook's rewrite glues "2." onto the converted "12 lb"; those rows use the row-wise rules.
+_DOTTED_CHAIN = r"\d\.\d+\."
+OUTLIER_WHISKER = 0.5
+
+
+def record_seconds(comments: pd.Series) -> pd.Series:
+    """First ``m:ss`` in each comment as seconds (``pd.to_timedelta("00:m:ss")``), NaN when none."""
+
+    parts = comments.astype("string").str.extract(_RECORD)
+    minutes = pd.to_numeric(parts[0])
+    seconds = pd.to_numeric(parts[1])
+    return (minutes * 60 + seconds).astype("Int64")
+
+
+def filter_records(frame: pd.DataFrame) -> pd.DataFrame:
+    """Notebook steps 1-2 on one chunk: returns ``RECORD_COLUMNS`` for "for time" comments with a record."""
+
+    frame = frame.dropna(subset=list(REQUIRED_COLUMNS))
+    frame = frame[frame["wod"].str.contains("for time", case=False)]
+    seconds = record_seconds(frame["comment"])
+    frame = frame.loc[seconds.notna(), RECORD_COLUMNS[:-1]]
+    return frame.assign(record_seconds=seconds.dropna().astype(np.int64))
+
+
+def remove_outliers(records: pd.DataFrame, whisker: float = OUTLIER_WHISKER) -> pd.DataFrame:
+    """Drop records outside ``[Q1 - whisker * IQR, Q3 + whisker * IQR]`` of their WOD."""
+
+    # Quantiles on timedeltas, like the notebook's ``record`` column, so the fences round identically.
+    record = pd.to_timedelta(records["record_seconds"], unit="s")
+    grouped = record.groupby(records["wod"])
+    q1 = grouped.transform("quantile", 0.25)
+    q3 = grouped.transform("quantile", 0.75)
+    iqr = q3 - q1
+    outlier = (record < q1 - whisker * iqr) | (record > q3 + whisker * iqr)
+    return records[~outlier]
+
+
+def median_by_date(records: pd.DataFrame) -> pd.DataFrame:
+    """One row per date with its median record, newest date first."""
+
+    medians = records.assign(median_record_seconds=records.groupby("date")["record_seconds"].transform("median"))
+    medians = medians[MEDIAN_COLUMNS].drop_duplicates(subset=["date"]).sort_values(by="date", ascending=False)
+    return medians.reset_index(drop=True)
+
+
+def mean_weights(settings: pd.Series) -> pd.Series:
+    """Vectorized ``wodSettings.mean_setting_weight``: mean lb load per setting, 0 when none."""
+
+    text = settings.astype(str)
+    matches = text.str.extractall(_SETTING_WEIGHT)
+    if matches.empty:
+        return pd.Series(0.0, index=settings.index)
+    values = matches["value"].astype(float)
+    weights = values.where(matches["kg"].isna(), np.round(values * 2.2))
+    weights = weights.groupby(level=0).mean().reindex(settings.index, fill_value=0.0)
+
+    dotted = text.str.contains(_DOTTED_CHAIN)
+    if dotted.any():
+        weights[dotted] = text[dotted].map(mean_setting_weight)
+    return weights
+
+
+def add_mean_weight(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.assign(mean_weight=mean_weights(frame["man_setting"]))
+
+
+def read_records(
+    paths: Union[str, Iterable[str]], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """Yield ``filter_records`` of each chunk of the given crawler CSVs."""
+
+    if isinstance(paths, str):
+        paths = [paths]
+    usecols = sorted(set(RECORD_COLUMNS[:-1]) | set(REQUIRED_COLUMNS))
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_size):
+            yield filter_records(chunk)
+
+
+def preprocess_csv(
+    paths: Union[str, Iterable[str]], chunk_size: int = DEFAULT_CHUNK_SIZE, whisker: float = OUTLIER_WHISKER
+) -> pd.DataFrame:
+    """Crawler CSVs -> ``MEDIAN_COLUMNS`` plus ``mean_weight``."""
+
+    chunks = list(read_records(paths, chunk_size))
+    records = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=RECORD_COLUMNS)
+    return add_mean_weight(median_by_date(remove_outliers(records, whisker)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the per-date median record dataset from crawler CSVs.")
+    parser.add_argument("csv_files", nargs="+")
+    parser.add_argument("-o", "--output", default="wod_fortime_median.parquet")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    medians = preprocess_csv(args.csv_files, args.chunk_size)
+    if args.output.endswith(".csv"):
+        medians.to_csv(args.output, index=False)
+    else:
+        medians.to_parquet(args.output, index=False)
+    print(f"{len(medians)} dates written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
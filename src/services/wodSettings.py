@@ -0,0 +1,28 @@
+import re
+from typing import Optional
+
+import numpy as np
+
+# Same rules as notebooks/wod_cluster.ipynb, which produced the training weights:
+# "60 kg"/"60-kg" -> "60kg" -> "132 lb", then the mean of every "<n> lb" value.
+_KG_SPACING = re.compile(r"(\d+(?:\.\d+)?)[\s\-]?kg")
+_KG_VALUE = re.compile(r"(\d+(?:\.\d+)?)kg")
+_LB_VALUE = re.compile(r"(\d+(?:\.\d+)?)(?:[\s\-]*lb)")
+
+
+def convert_kg_to_lb(text: str) -> str:
+    def replacer(match):
+        kg = float(match.group(1))
+        lb = round(kg * 2.2)
+        return f"{lb} lb"
+
+    return _KG_VALUE.sub(replacer, _KG_SPACING.sub(r"\1kg", text))
+
+
+def mean_setting_weight(setting: Optional[str]) -> float:
+    """Return the mean load in lb mentioned in a crawled setting, or 0 when none is."""
+
+    # pandas reads empty settings as NaN, which the notebook turned into "nan".
+    text = convert_kg_to_lb(str(setting))
+    weights = [float(w) for w in _LB_VALUE.findall(text) if w]
+    return float(np.mean(weights)) if weights else 0.0
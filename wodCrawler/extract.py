@@ -0,0 +1,149 @@
+import argparse
+import csv
+import os
+import re
+import sys
+
+import paths
+import store
+from lxml import html
+
+# Rx 댓글 판별 규칙 (규칙을 바꾸면 저장된 HTML 을 parse_snapshots 로 다시 파싱)
+RX_COMMENT_PATTERN = re.compile(r"\brx\b|\brx['’]?d\b", re.IGNORECASE)
+
+
+def is_rx_comment(content_text, pattern=RX_COMMENT_PATTERN):
+    return pattern.search(content_text) is not None
+
+
+def split_setting(setting_text):
+    """
+    '♀ 65 lb\n♂ 95 lb' or '♀ 65 lb ♂ 95 lb' -> (man_setting, woman_setting)
+    """
+    if '\n' in setting_text:
+        woman_setting_text, man_setting_text = setting_text.split('\n', 1)
+        man_setting_text = man_setting_text[2:]
+        woman_setting_text = woman_setting_text[2:]
+    else:
+        woman_setting_text, man_setting_text = setting_text.split('♂', 1)
+        woman_setting_text = woman_setting_text.replace('♀', '').strip()
+        man_setting_text = man_setting_text.strip()
+    return man_setting_text, woman_setting_text
+
+
+def _first(tree, xpath):
+    found = tree.xpath(xpath)
+    if not found:
+        raise LookupError(f"no element matches {xpath}")
+    return found[0]
+
+
+def _inner_html(element):
+    return (element.text or '') + ''.join(html.tostring(child, encoding='unicode') for child in element)
+
+
+def _setting_xpath(tree, p_start):
+    for name in ('article_p' + str(p_start), 'article_p' + str(p_start+1)):
+        if '♀' in _inner_html(_first(tree, paths.xpaths[name])):
+            return paths.xpaths[name]
+    return ''
+
+
+def is_rest_day(tree):
+    return 'Rest Day' in _inner_html(_first(tree, paths.xpaths['article_p1']))
+
+
+def parse_comments(tree, pattern=RX_COMMENT_PATTERN):
+    comment_data = []
+    for block in tree.xpath(paths.xpaths['comments']):
+        try:
+            athlete_text = ' '.join(_first(block, paths.xpaths['comment_athlete']).itertext()).strip()
+            content_text = ' '.join(_first(block, paths.xpaths['comment_content']).itertext()).strip()
+        except LookupError:
+            continue
+        if is_rx_comment(content_text, pattern):
+            comment_data.append((athlete_text, content_text))
+    return comment_data
+
+
+def parse_article(page, pattern=RX_COMMENT_PATTERN):
+    """
+    Same result as functioins.scrape_article, computed from the page HTML (or an
+    lxml tree) in one pass: (date, wod, man_setting, woman_setting, comments),
+    or 0 for a rest day. Raises LookupError when an expected element is missing.
+    """
+    tree = html.fromstring(page) if isinstance(page, (str, bytes)) else page
+
+    if is_rest_day(tree):
+        return 0
+
+    if _first(tree, paths.xpaths['article_p1']).text_content().strip().endswith(":"):
+        wod_xpaths = [paths.xpaths['article_p1'], paths.xpaths['article_p2']]
+        setting_xpath = _setting_xpath(tree, 3)
+    else:
+        wod_xpaths = [paths.xpaths['article_p1']]
+        setting_xpath = _setting_xpath(tree, 2)
+
+    # WOD 본문
+    wod_text = ''
+    for xpath in wod_xpaths:
+        wod_text += ' ' + ''.join(_first(tree, xpath).itertext()).strip()
+    wod_text = wod_text.strip().replace('\n', ' ')
+
+    # Setting
+    if setting_xpath:
+        setting_text = ''.join(_first(tree, setting_xpath).itertext()).strip()
+        man_setting_text, woman_setting_text = split_setting(setting_text)
+    else:
+        man_setting_text, woman_setting_text = '', ''
+
+    # 날짜 (Selenium .text 처럼 공백 정리)
+    date_text = ' '.join(_first(tree, paths.xpaths['date']).text_content().split())
+
+    return date_text, wod_text, man_setting_text, woman_setting_text, parse_comments(tree, pattern)
+
+
+def snapshot_path(snapshot_dir, url):
+    return os.path.join(snapshot_dir, url.rstrip('/').rsplit('/', 1)[-1] + '.html')
+
+
+def parse_snapshots(snapshot_dir, base_url=None, pattern=RX_COMMENT_PATTERN):
+    """
+    Yield (url, result) for every saved <yymmdd>.html page in snapshot_dir, no browser needed.
+    """
+    base_url = (base_url or paths.urls['base']).rstrip('/')
+    for name in sorted(os.listdir(snapshot_dir), reverse=True):
+        if not name.endswith('.html'):
+            continue
+        url = f"{base_url}/{name[:-len('.html')]}"
+        with open(os.path.join(snapshot_dir, name), 'rb') as f:
+            page = f.read()
+        try:
+            yield url, parse_article(page, pattern)
+        except (LookupError, ValueError) as e:
+            print(f"Error on {name}: {e}", file=sys.stderr)
+            yield url, None
+
+
+if __name__ == "__main__":
+    # python extract.py snapshots/ -o wod_data_reparsed.csv
+    parser = argparse.ArgumentParser(description="Re-parse saved article pages into the crawler CSV schema")
+    parser.add_argument("snapshot_dir")
+    parser.add_argument("-o", "--output", default="wod_data_snapshots.csv")
+    parser.add_argument("--base-url", default=None)
+    args = parser.parse_args()
+
+    articles = 0
+    with open(args.output, mode="w", newline='', encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=store.CSV_FIELDS)
+        writer.writeheader()
+        for url, result in parse_snapshots(args.snapshot_dir, args.base_url):
+            if not result:
+                continue
+            date, wod, man_setting, woman_setting, comments = result
+            for athlete, comment in comments or [('', '')]:
+                writer.writerow({"date": date, "wod": wod, "man_setting": man_setting,
+                                 "woman_setting": woman_setting, "athlete": athlete,
+                                 "comment": comment, "url": url})
+            articles += 1
+    print(f"✅ {articles} articles written to {args.output}")
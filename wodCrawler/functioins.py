@@ -1,10 +1,13 @@
 import csv
 import time
 import os
+import extract
 import paths
 import re
+import store
 from lxml import html
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -67,6 +70,58 @@ def get_articles(driver, max_links=2300, scroll_pause=2, target_year=None, desce
 
     return sorted_links
 
+
+ARCHIVE_ANCHORS_JS = "return Array.from(document.querySelectorAll('#archives h3 a')).slice(arguments[0]).map(a => a.href);"
+ARCHIVE_COUNT_JS = "return document.querySelectorAll('#archives h3 a').length;"
+
+# article 링크 증분 수집 (최신 글부터 내려가다 이미 저장된 URL 에 닿으면 멈춤)
+def get_articles_incremental(driver, known=(), max_links=2300, target_year=None, stop_after=3,
+                             timeout=10, poll=0.2, base_url=None):
+    """
+    Scroll the archive (newest first) and collect only new article links.
+
+    Each scroll reads just the anchors appended since the last one and waits until
+    the anchor count grows (up to `timeout` seconds) instead of a fixed sleep.
+    Stops once `stop_after` links were already in `known` (e.g. the checkpoint store)
+    or older than `target_year`, when the page stops growing, or at `max_links`.
+    """
+    base_url = base_url or paths.urls['base']
+    prefix = str(target_year)[-2:] if target_year else None
+    links = []
+    seen = set()
+    read = 0
+    stop_hits = 0
+
+    while True:
+        for href in driver.execute_script(ARCHIVE_ANCHORS_JS, read):
+            read += 1
+            if not href or not href.startswith(base_url) or href in seen:
+                continue
+            seen.add(href)
+
+            date = extract_date_from_url(href)
+            if href in known or (prefix and 0 <= date < int(prefix) * 10000):
+                stop_hits += 1
+                continue
+            if prefix is None or str(date).zfill(6).startswith(prefix):
+                links.append(href)
+
+        print(f"Collected {len(links)} new links so far... ({read} anchors read)")
+
+        if len(links) >= max_links or stop_hits >= stop_after:
+            break
+
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=poll).until(
+                lambda d: d.execute_script(ARCHIVE_COUNT_JS) > read
+            )
+        except TimeoutException:
+            # 더 이상 로드되는 글이 없음
+            break
+
+    return sorted(links, key=extract_date_from_url, reverse=True)[:max_links]
+
 def get_setting_xpath(driver, p_start):
     first_p = 'article_p' + str(p_start)
     second_p = 'article_p' + str(p_start+1)
@@ -126,7 +181,7 @@ def get_comments_with_athletes(driver):
                 content_html = content_elem.get_attribute("outerHTML")
                 content_text = ' '.join(html.fromstring(content_html).itertext()).strip()
 
-                if re.search(r"\brx\b|\brx['’]?d\b", content_text, re.IGNORECASE):
+                if extract.is_rx_comment(content_text):
                     comment_data.append((athlete_text, content_text))
 
             except Exception:
@@ -163,14 +218,7 @@ def scrape_article(driver, url):
             setting_html = setting_elem.get_attribute("outerHTML")
             setting_tree = html.fromstring(setting_html)
             setting_text = ''.join(setting_tree.itertext()).strip()
-            if '\n' in setting_text:
-                woman_setting_text, man_setting_text = setting_text.split('\n', 1)
-                man_setting_text = man_setting_text[2:]
-                woman_setting_text = woman_setting_text[2:]
-            else:
-                woman_setting_text, man_setting_text = setting_text.split('♂', 1)
-                woman_setting_text = woman_setting_text.replace('♀', '').strip()
-                man_setting_text = man_setting_text.strip()
+            man_setting_text, woman_setting_text = extract.split_setting(setting_text)
         else:
             man_setting_text, woman_setting_text = '', ''
 
@@ -188,6 +236,31 @@ def scrape_article(driver, url):
         return "", "", "", "", []
 
 
+# page_source 한 번만 가져와서 lxml 로 파싱 (요소마다 WebDriver 왕복하지 않음)
+def scrape_article_source(driver, url, snapshot_dir=None):
+    try:
+        driver.get(url)
+        wait_for_element(driver, By.XPATH, paths.xpaths['article_p1'])
+        page_source = driver.page_source
+        tree = html.fromstring(page_source)
+
+        # 댓글이 아직 없을 때만 기다렸다가 한 번 더 가져옴
+        if not extract.is_rest_day(tree) and not tree.xpath(paths.xpaths['comments']):
+            wait_for_element(driver, By.XPATH, paths.xpaths['comments'])
+            page_source = driver.page_source
+            tree = html.fromstring(page_source)
+
+        if snapshot_dir:
+            with open(extract.snapshot_path(snapshot_dir, url), mode="w", encoding="utf-8") as f:
+                f.write(page_source)
+
+        return extract.parse_article(tree)
+
+    except Exception as e:
+        print(f"Error on {url}: {e}")
+        return "", "", "", "", []
+
+
 def load_checkpoint(filename="wod_data.csv"):
     if not os.path.exists(filename):
         return set()
@@ -195,6 +268,15 @@ def load_checkpoint(filename="wod_data.csv"):
         return set(row["url"] for row in csv.DictReader(f))
 
 
+# Checkpoint: SQLite store (처음 실행 시 기존 연도별 CSV 를 한 번 가져옴)
+def open_checkpoint(year, store_path=store.DEFAULT_STORE):
+    checkpoint = store.CrawlStore(store_path)
+    imported = checkpoint.import_legacy_csvs(year)
+    if imported:
+        print(f"▶ Imported {imported} rows from existing CSVs into {store_path}.")
+    return checkpoint
+
+
 def save_to_csv(data, filename="wod_data.csv"):
     file_exists = os.path.exists(filename)
     with open(filename, mode="a", newline='', encoding="utf-8") as f:
@@ -205,10 +287,13 @@ def save_to_csv(data, filename="wod_data.csv"):
             writer.writerow(row)
 
 
-def crawl(year):
+def crawl(year, store_path=store.DEFAULT_STORE, snapshot_dir=None, incremental=False):
     csv_file = 'wod_data' + str(year) + '.csv'
+    checkpoint = open_checkpoint(year, store_path)
     driver = setup_driver(headless=False)
     base_url = paths.urls['workout']
+    if snapshot_dir:
+        os.makedirs(snapshot_dir, exist_ok=True)
 
     try:
         print("▶ Opening main workout page...")
@@ -216,50 +301,35 @@ def crawl(year):
         wait_for_element(driver, By.ID, "archives")
 
         print("▶ Scrolling to load workouts...")
-        workout_links = get_articles(driver, max_links=2300, target_year=year)
+        if incremental:
+            workout_links = get_articles_incremental(driver, known=checkpoint, max_links=2300, target_year=year)
+        else:
+            workout_links = get_articles(driver, max_links=2300, target_year=year)
 
-        # Checkpoint 로딩
-        done_urls = load_checkpoint(filename='wod_data2025.csv')
-        for i in range(2025-year):
-            checkpoint = 'wod_data' + str(2024-i) + '.csv'
-            done_urls.update(load_checkpoint(filename=checkpoint))
-        print(f"▶ {len(done_urls)} already scraped URLs loaded from checkpoint.")
+        print(f"▶ {len(checkpoint)} already scraped URLs in {store_path}.")
 
         count = 0
         for link in workout_links:
 
-            if link in done_urls:
+            if link in checkpoint:
                 continue
 
-            result = scrape_article(driver, link)
+            result = scrape_article_source(driver, link, snapshot_dir)
 
             if result == 0:
                 continue
 
-            date, wod, man_setting, woman_setting, comments = result
-
-            if not comments:
-                comments = [('', '')]
-
-            rows_to_save = []
-            for athlete, comment in comments:
-                rows_to_save.append({
-                    "date": date,
-                    "wod": wod,
-                    "man_setting": man_setting,
-                    "woman_setting": woman_setting,
-                    "athlete": athlete,
-                    "comment": comment,
-                    "url": link
-                })
-            save_to_csv(rows_to_save, filename=csv_file)
+            checkpoint.add_article(link, *result)
             print(f"[{count+1}] ✅ Scraped: {link}")
             time.sleep(0.5)
             count += 1
 
     finally:
         driver.quit()
+        # 중간에 멈춰도 저장된 만큼은 CSV 로 내보냄
+        rows = checkpoint.export_csv(csv_file, year=year)
+        checkpoint.close()
 
-    print("✅✅✅ Done. All data saved to wod_data.csv ✅✅✅")
+    print(f"✅✅✅ Done. {rows} rows saved to {csv_file} ✅✅✅")
 
 
@@ -0,0 +1,43 @@
+import functools
+import os
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class _ArticleHandler(SimpleHTTPRequestHandler):
+    # 기사 URL 은 /250503 처럼 확장자가 없으므로 250503.html 로 응답
+    def translate_path(self, path):
+        translated = super().translate_path(path)
+        if not os.path.splitext(translated)[1] and os.path.isfile(translated + ".html"):
+            return translated + ".html"
+        return translated
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory=FIXTURES_DIR, host="127.0.0.1", port=0):
+    """
+    Serve saved article pages (e.g. wodCrawler/fixtures/250503.html as /250503)
+    from a background thread. Returns (server, base_url); call server.shutdown() to stop.
+    """
+    handler = functools.partial(_ArticleHandler, directory=directory)
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    # python local_server.py [directory] [port]
+    directory = sys.argv[1] if len(sys.argv) > 1 else FIXTURES_DIR
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    server, base_url = serve_directory(directory, port=port)
+    print(f"▶ Serving {directory} at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
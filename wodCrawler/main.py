@@ -1,6 +1,23 @@
+import argparse
+
 import functioins
+import parallel
 import paths
 
 
 if __name__ == "__main__":
-    functioins.crawl(year=2025)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Crawl CrossFit workouts into wod_data<year>.csv")
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--workers", type=int, default=1, help="browser drivers; 1 keeps the sequential crawl")
+    parser.add_argument("--rate", type=float, default=2.0, help="max page loads per second across all workers")
+    parser.add_argument("--snapshot-dir", default=None,
+                        help="also save each article page here for offline re-parsing (extract.py)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="stop scrolling the archive once already scraped URLs are reached")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        parallel.crawl_parallel(year=args.year, workers=args.workers, rate=args.rate, snapshot_dir=args.snapshot_dir,
+                                incremental=args.incremental)
+    else:
+        functioins.crawl(year=args.year, snapshot_dir=args.snapshot_dir, incremental=args.incremental)
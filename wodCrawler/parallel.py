@@ -0,0 +1,197 @@
+import os
+import queue
+import threading
+import time
+
+import functioins
+import paths
+import store
+from selenium.webdriver.common.by import By
+
+# scrape_article 이 실패했을 때 돌려주는 값
+FAILED_RESULT = ("", "", "", "", [])
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: at most `rate` requests per second on average,
+    with bursts of up to `capacity` requests.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# 저장은 writer 스레드 하나만
+# writer 가 죽으면 worker 들이 rows_queue.put 에서 영원히 멈추므로 예외는 여기서 처리
+def _writer(rows_queue, checkpoint, stats, lock):
+    while True:
+        item = rows_queue.get()
+        if item is None:
+            try:
+                checkpoint.flush()
+            except Exception as e:
+                unsaved = checkpoint.discard_pending()
+                print(f"⚠️ writer could not save {len(unsaved)} articles: {e}")
+                with lock:
+                    stats["saved"] -= len(unsaved)
+                    stats["failed"].extend(unsaved)
+            return
+        link, result = item
+        try:
+            checkpoint.add_article(link, *result)
+        except Exception as e:
+            # A failed batch flush keeps the article buffered for the next flush;
+            # anything else means it never reached the store.
+            print(f"⚠️ writer failed on {link}: {e}")
+            try:
+                buffered = link in checkpoint
+            except Exception:
+                buffered = False
+            if not buffered:
+                with lock:
+                    stats["failed"].append(link)
+                continue
+        stats["saved"] += 1
+        print(f"[{stats['saved']}] ✅ Scraped: {link}")
+
+
+def _worker(worker_id, url_queue, rows_queue, bucket, driver_factory, retries, stats, lock, snapshot_dir=None):
+    driver = None
+    try:
+        while True:
+            link = url_queue.get()
+            if link is None:
+                return
+
+            result = FAILED_RESULT
+            for _ in range(retries + 1):
+                try:
+                    if driver is None:
+                        driver = driver_factory()
+                    bucket.acquire()
+                    result = functioins.scrape_article_source(driver, link, snapshot_dir)
+                except Exception as e:
+                    print(f"⚠️ worker {worker_id} failed on {link}: {e}")
+                    result = FAILED_RESULT
+                if result != FAILED_RESULT:
+                    break
+                # 브라우저가 죽었을 수도 있으니 새 드라이버로 재시도
+                if driver is not None:
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+                    driver = None
+
+            if result == 0:
+                with lock:
+                    stats["skipped"] += 1
+            elif result == FAILED_RESULT:
+                with lock:
+                    stats["failed"].append(link)
+            else:
+                rows_queue.put((link, result))
+    finally:
+        if driver is not None:
+            driver.quit()
+
+
+def crawl_links(links, checkpoint, workers=4, rate=2.0, driver_factory=None, retries=1, snapshot_dir=None):
+    """
+    Scrape `links` into `checkpoint` (a store.CrawlStore) with `workers` browser
+    drivers fed from one URL queue.
+
+    Page loads across all workers are limited to `rate` per second by a shared
+    token bucket, and every article goes through a single writer thread. A URL that still fails after `retries`
+    retries (each with a fresh driver) is reported in the returned "failed" list.
+    With `snapshot_dir`, each page source is also saved there as <yymmdd>.html.
+    """
+    driver_factory = driver_factory or functioins.setup_driver
+    url_queue = queue.Queue()
+    rows_queue = queue.Queue(maxsize=workers * 4)
+    bucket = TokenBucket(rate)
+    stats = {"saved": 0, "skipped": 0, "failed": []}
+    lock = threading.Lock()
+
+    for link in links:
+        url_queue.put(link)
+    for _ in range(workers):
+        url_queue.put(None)
+
+    writer = threading.Thread(target=_writer, args=(rows_queue, checkpoint, stats, lock), name="csv-writer")
+    writer.start()
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(i, url_queue, rows_queue, bucket, driver_factory, retries, stats, lock, snapshot_dir),
+            name=f"crawl-worker-{i}",
+        )
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rows_queue.put(None)
+    writer.join()
+    return stats
+
+
+def crawl_parallel(year, workers=4, rate=2.0, headless=True, store_path=store.DEFAULT_STORE, snapshot_dir=None,
+                   incremental=False):
+    csv_file = 'wod_data' + str(year) + '.csv'
+    base_url = paths.urls['workout']
+    if snapshot_dir:
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    checkpoint = functioins.open_checkpoint(year, store_path)
+    try:
+        # 링크 수집은 드라이버 하나로
+        driver = functioins.setup_driver(headless=headless)
+        try:
+            print("▶ Opening main workout page...")
+            driver.get(base_url)
+            functioins.wait_for_element(driver, By.ID, "archives")
+
+            print("▶ Scrolling to load workouts...")
+            if incremental:
+                workout_links = functioins.get_articles_incremental(driver, known=checkpoint, max_links=2300,
+                                                                    target_year=year)
+            else:
+                workout_links = functioins.get_articles(driver, max_links=2300, target_year=year)
+        finally:
+            driver.quit()
+
+        links = [link for link in workout_links if link not in checkpoint]
+        print(f"▶ Scraping {len(links)} articles with {workers} workers ({rate}/s)...")
+        stats = crawl_links(links, checkpoint, workers=workers, rate=rate,
+                            driver_factory=lambda: functioins.setup_driver(headless=headless),
+                            snapshot_dir=snapshot_dir)
+    finally:
+        rows = checkpoint.export_csv(csv_file, year=year)
+        checkpoint.close()
+
+    for link in stats["failed"]:
+        print(f"❌ Failed: {link}")
+    print(f"✅✅✅ Done. {stats['saved']} new articles, {rows} rows in {csv_file}, "
+          f"{stats['skipped']} rest days, {len(stats['failed'])} failed ✅✅✅")
+    return stats
@@ -0,0 +1,258 @@
+import argparse
+import csv
+import datetime
+import os
+import re
+import sqlite3
+import threading
+import time
+
+CSV_FIELDS = ["date", "wod", "man_setting", "woman_setting", "athlete", "comment", "url"]
+DEFAULT_STORE = "wod_data.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    year INTEGER,
+    date TEXT,
+    wod TEXT,
+    man_setting TEXT,
+    woman_setting TEXT,
+    scraped_at REAL
+);
+CREATE TABLE IF NOT EXISTS comments (
+    article_id INTEGER NOT NULL REFERENCES articles(id),
+    position INTEGER NOT NULL,
+    athlete TEXT,
+    comment TEXT,
+    PRIMARY KEY (article_id, position)
+);
+CREATE INDEX IF NOT EXISTS articles_year ON articles(year);
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    rows INTEGER,
+    imported_at REAL
+);
+"""
+
+
+def url_year(url):
+    """
+    /250503 -> 2025, None when the URL has no 6-digit date.
+    """
+    match = re.search(r'/(\d{2})\d{4}$', url)
+    return 2000 + int(match.group(1)) if match else None
+
+
+def article_year(url, date=None):
+    """
+    Year of an article for per-year exports: from its URL, else from its date
+    text ("Saturday 250503" or "2025-05-03"); None when neither has one.
+    """
+    year = url_year(url)
+    if year is not None or not date:
+        return year
+    match = re.search(r'\b(\d{4})-\d{2}-\d{2}\b', date)
+    if match:
+        return int(match.group(1))
+    match = re.search(r'\b(\d{2})\d{4}\b', date)
+    return 2000 + int(match.group(1)) if match else None
+
+
+class CrawlStore:
+    """
+    SQLite store of scraped articles, one row per URL (unique index) plus its comments.
+
+    `url in store` is a primary-key lookup, so resuming does not re-read old data.
+    Articles are buffered and written `batch_size` at a time in one transaction;
+    call flush() or close() to write the rest.
+    """
+
+    def __init__(self, path=DEFAULT_STORE, batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        # parallel 크롤러의 writer 스레드에서도 쓰므로 lock 으로 보호
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def __contains__(self, url):
+        with self._lock:
+            if url in self._pending:
+                return True
+            return self._conn.execute("SELECT 1 FROM articles WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0] + len(self._pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_article(self, url, date, wod, man_setting, woman_setting, comments):
+        with self._lock:
+            self._pending[url] = (date, wod, man_setting, woman_setting, list(comments), time.time())
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def add_rows(self, rows):
+        """
+        Add rows in the crawler CSV schema (one per comment, as written by save_to_csv).
+        """
+        articles = {}
+        for row in rows:
+            article = articles.setdefault(row["url"], (row, []))
+            if row.get("athlete") or row.get("comment"):
+                article[1].append((row.get("athlete", ""), row.get("comment", "")))
+        for url, (row, comments) in articles.items():
+            self.add_article(url, row["date"], row["wod"], row["man_setting"], row["woman_setting"], comments)
+
+    def flush(self):
+        """
+        Write the buffered articles in one transaction. If it fails, the batch
+        stays buffered (and is retried by the next flush) and the error is raised.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            try:
+                with self._conn:
+                    for url, (date, wod, man_setting, woman_setting, comments, scraped_at) in pending.items():
+                        year = article_year(url, date)
+                        if year is None:
+                            print(f"⚠️ no year in {url} or {date!r}; it is left out of per-year exports")
+                        cursor = self._conn.execute(
+                            "INSERT OR IGNORE INTO articles (url, year, date, wod, man_setting, woman_setting,"
+                            " scraped_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (url, year, date, wod, man_setting, woman_setting, scraped_at),
+                        )
+                        if cursor.rowcount == 0:
+                            continue
+                        self._conn.executemany(
+                            "INSERT INTO comments (article_id, position, athlete, comment) VALUES (?, ?, ?, ?)",
+                            [(cursor.lastrowid, i, athlete, comment) for i, (athlete, comment) in enumerate(comments)],
+                        )
+            except Exception:
+                pending.update(self._pending)
+                self._pending = pending
+                raise
+
+    def discard_pending(self):
+        """
+        Drop the buffered articles and return their URLs, e.g. after a flush keeps failing.
+        They are not in the store, so the next crawl scrapes them again.
+        """
+        with self._lock:
+            urls, self._pending = list(self._pending), {}
+        return urls
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def import_csv(self, path, force=False):
+        """
+        One-time import of a crawler CSV; files already imported are skipped unless force=True.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            done = self._conn.execute("SELECT 1 FROM imports WHERE path = ?", (key,)).fetchone()
+        if (done and not force) or not os.path.exists(path):
+            return 0
+
+        count = 0
+        batch = []
+        with open(path, mode="r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                if not row.get("url"):
+                    continue
+                # 같은 URL 의 댓글 행은 연속으로 저장되어 있음
+                if batch and batch[-1]["url"] != row["url"] and len(batch) >= self.batch_size:
+                    self.add_rows(batch)
+                    batch = []
+                batch.append(row)
+                count += 1
+        self.add_rows(batch)
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO imports (path, rows, imported_at) VALUES (?, ?, ?)", (key, count, time.time())
+            )
+        return count
+
+    def import_legacy_csvs(self, year, directory="."):
+        """
+        Import wod_data<year>.csv ... wod_data<this year>.csv, the files crawl() used as its checkpoint.
+        """
+        total = 0
+        for y in range(year, datetime.date.today().year + 1):
+            total += self.import_csv(os.path.join(directory, 'wod_data' + str(y) + '.csv'))
+        return total
+
+    def iter_rows(self, year=None):
+        self.flush()
+        query = (
+            "SELECT a.date, a.wod, a.man_setting, a.woman_setting, c.athlete, c.comment, a.url"
+            " FROM articles a LEFT JOIN comments c ON c.article_id = a.id"
+        )
+        params = ()
+        if year is not None:
+            query += " WHERE a.year = ?"
+            params = (year,)
+        query += " ORDER BY a.id, c.position"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for date, wod, man_setting, woman_setting, athlete, comment, url in rows:
+            yield {
+                "date": date,
+                "wod": wod,
+                "man_setting": man_setting,
+                "woman_setting": woman_setting,
+                "athlete": athlete or "",
+                "comment": comment or "",
+                "url": url,
+            }
+
+    def export_csv(self, path, year=None):
+        """
+        Write articles in the crawler CSV schema (one row per comment, insertion order).
+        """
+        count = 0
+        with open(path, mode="w", newline='', encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for row in self.iter_rows(year):
+                writer.writerow(row)
+                count += 1
+        return count
+
+
+if __name__ == "__main__":
+    # python store.py import wod_data2024.csv wod_data2025.csv
+    # python store.py export wod_data2025.csv --year 2025
+    parser = argparse.ArgumentParser(description="Crawler checkpoint store")
+    parser.add_argument("--store", default=DEFAULT_STORE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    import_parser = sub.add_parser("import")
+    import_parser.add_argument("csv_files", nargs="+")
+    import_parser.add_argument("--force", action="store_true")
+    export_parser = sub.add_parser("export")
+    export_parser.add_argument("csv_file")
+    export_parser.add_argument("--year", type=int)
+    args = parser.parse_args()
+
+    with CrawlStore(args.store) as store:
+        if args.command == "import":
+            for csv_file in args.csv_files:
+                print(f"▶ {csv_file}: {store.import_csv(csv_file, force=args.force)} rows imported")
+        else:
+            print(f"▶ {store.export_csv(args.csv_file, year=args.year)} rows exported to {args.csv_file}")